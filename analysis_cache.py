@@ -0,0 +1,146 @@
+# analysis_cache.py
+
+import time
+import asyncio
+import itertools
+import numpy as np
+from collections import OrderedDict
+import config
+from minhash import MinHasher, MinHashLSH, normalize_headline
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def _numbers(key):
+    return {token for token in key.split() if any(ch.isdigit() for ch in token)}
+
+
+class AnalysisCache:
+    """
+    Aynı hikayenin farklı kaynaklardan kısa süre içinde tekrar gelmesi durumunda önceki LLM analizini yeniden kullanır.
+    1. Birebir arama: normalleştirilmiş başlık anahtarıyla.
+    2. Yakın kopya arama: MinHash imzaları üzerinde LSH ile; tahmini Jaccard benzerliği eşiği geçen başlıklar.
+    3. Embedding arama (vektör verildiyse): kosinüs benzerliği çok yüksek olan, farklı kelimelerle yazılmış kopyalar.
+    Kayıtlar `ttl` saniye geçerlidir ve en fazla `max_entries` kayıt tutulur (en eski kullanılan silinir).
+    Analizi hâlâ süren bir başlık için gelen kopyalar, yeni bir LLM çağrısı yapmak yerine o analizin bitmesini bekler.
+    """
+
+    def __init__(self, ttl=None, max_entries=None, similarity_threshold=None, num_perm=None):
+        self.ttl = ttl or config.ANALYSIS_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or config.ANALYSIS_CACHE_MAX_ENTRIES
+        self.similarity_threshold = similarity_threshold or config.ANALYSIS_CACHE_SIMILARITY
+        self.embedding_threshold = config.ANALYSIS_CACHE_EMBEDDING_SIMILARITY
+        num_perm = num_perm or config.MINHASH_NUM_PERM
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.lsh = MinHashLSH(num_perm=num_perm, threshold=self.similarity_threshold)
+        # kayıt ID -> {"key", "headline", "created_at", "vector", "result", "future"}
+        self._entries = OrderedDict()
+        self._by_key = {}
+        self._ids = itertools.count()
+        self.stats = {"exact_hits": 0, "near_hits": 0, "embedding_hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        self.lsh.remove(entry_id)
+        if self._by_key.get(entry["key"]) == entry_id:
+            del self._by_key[entry["key"]]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        # Kayıtlar oluşturulma sırasıyla tutulduğu için en eskiden başlayıp ilk taze kayıtta durmak yeterli.
+        while self._entries:
+            entry_id, entry = next(iter(self._entries.items()))
+            if entry["created_at"] >= cutoff or entry["future"] is not None:
+                break
+            self._drop(entry_id)
+            self.stats["expired"] += 1
+
+    def lookup(self, headline, vector=None):
+        """
+        Başlığın kendisi veya yakın bir kopyası önbellekteyse (kayıt, "exact" | "near" | "embedding", benzerlik)
+        döndürür, yoksa (None, None, 0.0). Kayıt sonucu `wait` ile alınır.
+        Haberin embedding'i verilirse MinHash'in yakalayamadığı (farklı kelimelerle yazılmış) kopyalar da aranır.
+        """
+        self._expire()
+        key = normalize_headline(headline)
+        entry_id = self._by_key.get(key)
+        if entry_id is not None:
+            self.stats["exact_hits"] += 1
+            return self._entries[entry_id], "exact", 1.0
+
+        # Sayıları farklı başlıklar (ör. "50 baz puan" / "25 baz puan") benzer olsa da aynı hikaye sayılmaz.
+        numbers = _numbers(key)
+        for entry_id, similarity in self.lsh.query(self.hasher.signature(headline)):
+            if _numbers(self._entries[entry_id]["key"]) == numbers:
+                self.stats["near_hits"] += 1
+                return self._entries[entry_id], "near", similarity
+
+        if vector is not None:
+            match = self._embedding_match(vector, numbers)
+            if match is not None:
+                self.stats["embedding_hits"] += 1
+                return match[0], "embedding", match[1]
+
+        self.stats["misses"] += 1
+        return None, None, 0.0
+
+    def _embedding_match(self, vector, numbers):
+        candidates = [e for e in self._entries.values() if e["vector"] is not None and _numbers(e["key"]) == numbers]
+        if not candidates:
+            return None
+        similarities = np.stack([e["vector"] for e in candidates]) @ _unit(vector)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.embedding_threshold:
+            return None
+        return candidates[best], float(similarities[best])
+
+    async def wait(self, entry):
+        """Kaydın sonucunu döndürür; analiz hâlâ sürüyorsa bitmesini bekler. Analiz başarısız olduysa None döner."""
+        if entry["future"] is not None:
+            return await asyncio.shield(entry["future"])
+        return entry["result"]
+
+    def reserve(self, headline, vector=None):
+        """Analizine başlanan başlığı 'devam ediyor' olarak kaydeder; eşzamanlı kopyalar bu kaydı bekler."""
+        entry_id = next(self._ids)
+        key = normalize_headline(headline)
+        self._entries[entry_id] = {"key": key, "headline": headline, "created_at": time.monotonic(),
+                                   "vector": _unit(vector) if vector is not None else None,
+                                   "result": None, "future": asyncio.get_running_loop().create_future()}
+        self._by_key[key] = entry_id
+        self.lsh.insert(entry_id, self.hasher.signature(headline))
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+        return entry_id
+
+    def complete(self, entry_id, result):
+        """Analiz sonucunu kaydeder ve bekleyen kopyaları uyandırır. result None ise kayıt silinir."""
+        entry = self._entries.get(entry_id)
+        future = entry["future"] if entry else None
+        if entry is not None:
+            entry["future"] = None
+            entry["created_at"] = time.monotonic()
+            if result is None:
+                self._drop(entry_id)
+            else:
+                entry["result"] = result
+                self._entries.move_to_end(entry_id)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def hit_rate(self):
+        hits = self.stats["exact_hits"] + self.stats["near_hits"] + self.stats["embedding_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def stats_line(self):
+        s = self.stats
+        return (f"Analiz önbelleği: {len(self._entries)} kayıt | birebir {s['exact_hits']}, yakın kopya {s['near_hits']}, "
+                f"embedding {s['embedding_hits']}, "
+                f"ıskalama {s['misses']} | isabet oranı %{self.hit_rate() * 100:.1f}")
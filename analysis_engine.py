@@ -2,133 +2,248 @@
 
 
 import os
-import pandas as pd
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.docstore.document import Document
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-import config
 import re
-import requests
-from binance.client import Client as BinanceClient
-from deep_translator import GoogleTranslator
+import config
+from price_service import get_price_service
+from translation_service import get_translation_service
+from telegram_delivery import get_telegram_delivery
+from metrics import get_metrics
+
+metrics = get_metrics()
+
+# langchain, chromadb ve Gemini istemcileri ağır modüllerdir; başlangıcı hızlandırmak için
+# sadece ilgili bileşen ilk kez oluşturulurken içe aktarılırlar.
+
+def get_gemini_api_key():
+    api_key = os.getenv(config.GEMINI_API_KEY_ENV)
+    if not api_key:
+        raise ValueError("HATA: GEMINI_API_KEY ortam değişkeni bulunamadı! Lütfen .env dosyasını veya Render ayarlarını kontrol edin.")
+    return api_key
+
+def create_llm(api_key):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=config.LLM_MODEL, temperature=0.2, google_api_key=api_key)
+
+def create_analyst_embeddings(api_key):
+    # Önbellekli embedding: canlı akışta eklenen haberler ve sorgular da aynı önbelleği kullanır.
+    from embedding_cache import create_embeddings
+    return create_embeddings(api_key)
+
+def _chroma_client():
+    """`config.CHROMA_SERVER_HOST` ayarlıysa Chroma sunucusuna bağlanan istemciyi, değilse None döndürür."""
+    if not config.CHROMA_SERVER_HOST:
+        return None
+    import chromadb
+    return chromadb.HttpClient(host=config.CHROMA_SERVER_HOST, port=config.CHROMA_SERVER_PORT)
+
+def _vector_store_location():
+    if config.VECTOR_BACKEND == "mmap":
+        return config.MMAP_STORE_DIR
+    if config.CHROMA_SERVER_HOST:
+        return f"http://{config.CHROMA_SERVER_HOST}:{config.CHROMA_SERVER_PORT}"
+    return config.CHROMA_DB_PATH
 
-def initialize_analyst_components():
+def _chroma(embeddings):
+    # Bölümleme açıksa (config.VECTOR_PARTITIONING) dönem koleksiyonlarını tek veritabanı gibi sunan sarmalayıcı,
+    # config.VECTOR_BACKEND "mmap" ise kompakt yerel depo döner.
+    from vector_partitions import open_store
+    client = _chroma_client() if config.VECTOR_BACKEND != "mmap" else None
+    return open_store(embeddings, client=client)
+
+def vector_store_exists():
+    if config.VECTOR_BACKEND == "mmap":
+        from mmap_store import store_exists
+        return store_exists()
+    client = _chroma_client()
+    if client is None:
+        return os.path.exists(config.CHROMA_DB_PATH)
+    from vector_partitions import store_exists
+    try:
+        return store_exists(client)
+    except Exception:
+        return False
+
+def open_vector_store(embeddings):
+    """Mevcut vektör veritabanını (disk klasörü veya Chroma sunucusu) açar."""
+    print(f"Mevcut vektör veritabanı '{_vector_store_location()}' adresinden yükleniyor...")
+    vector_store = _chroma(embeddings)
+    print("Veritabanı başarıyla yüklendi.")
+    return vector_store
+
+def build_vector_store(embeddings):
+    """Vektör veritabanını arşivden sıfırdan oluşturur. Arşiv yoksa FileNotFoundError fırlatır."""
+    import knowledge_store
+    from document_builder import iter_knowledge_base_documents
+    from embedding_scheduler import EmbeddingScheduler
+    # Chroma klasörü boş bir veritabanıyla oluşmasın diye önce arşivin varlığını kontrol ediyoruz.
+    if not knowledge_store.knowledge_base_exists():
+        raise FileNotFoundError(config.KNOWLEDGE_BASE_CSV)
+    print(f"UYARI: Henüz bir veritabanı bulunamadı. '{config.KNOWLEDGE_BASE_CSV}' dosyasından oluşturulacak...")
+    vector_store = _chroma(embeddings)
+    EmbeddingScheduler(embeddings).embed_and_store_stream(vector_store, iter_knowledge_base_documents())
+    print(f"Yeni veritabanı '{_vector_store_location()}' adresinde başarıyla oluşturuldu.")
+    return vector_store
+
+def create_retriever(vector_store, use_hot_index=None):
+    """
+    Retriever'ı kurar. `use_hot_index` açıksa (varsayılan: config.HOT_INDEX_ENABLED) son günlerin vektörleri
+    belleğe alınır ve retriever önce bu sıcak indeksi arar; indekse `retriever.index` ile erişilir.
+    """
+    if use_hot_index is None:
+        use_hot_index = config.HOT_INDEX_ENABLED
+    if not use_hot_index:
+        return vector_store.as_retriever(search_type="mmr", search_kwargs={"k": config.RETRIEVER_K})
+    from recency_index import RecencyIndex, HotRetriever
+    hot_index = RecencyIndex()
+    hot_index.load(vector_store)
+    return HotRetriever(index=hot_index, vector_store=vector_store, k=config.RETRIEVER_K,
+                        min_similarity=config.HOT_INDEX_MIN_SIMILARITY)
+
+def initialize_analyst_components(use_hot_index=None):
     """
     Vektör veritabanını, LLM'i ve retriever'ı kurar.
     Farklı amaçlar için yeniden kullanılabilecek temel RAG bileşenlerini döndürür.
+    Veritabanı yoksa arşivden senkron olarak oluşturulur; canlı sistem bunun yerine
+    startup.AnalystRuntime ile veritabanını arka planda kurar.
     """
     print("RAG sistem bileşenleri başlatılıyor...")
     
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("HATA: GEMINI_API_KEY ortam değişkeni bulunamadı! Lütfen .env dosyasını veya Render ayarlarını kontrol edin.")
-
-    embeddings = GoogleGenerativeAIEmbeddings(model=config.EMBEDDING_MODEL, google_api_key=api_key)
-    llm = ChatGoogleGenerativeAI(model=config.LLM_MODEL, temperature=0.2, google_api_key=api_key)
+    api_key = get_gemini_api_key()
+    embeddings = create_analyst_embeddings(api_key)
+    llm = create_llm(api_key)
     
-    if os.path.exists(config.CHROMA_DB_PATH):
-        print(f"Mevcut vektör veritabanı '{config.CHROMA_DB_PATH}' klasöründen yükleniyor...")
-        vector_store = Chroma(persist_directory=config.CHROMA_DB_PATH, embedding_function=embeddings)
-        print("Veritabanı başarıyla yüklendi.")
+    if vector_store_exists():
+        vector_store = open_vector_store(embeddings)
     else:
-        print(f"UYARI: Henüz bir veritabanı bulunamadı. '{config.KNOWLEDGE_BASE_CSV}' dosyasından oluşturulacak...")
         try:
-            df = pd.read_csv(config.KNOWLEDGE_BASE_CSV)
-            
-            documents = [
-                Document(
-                    # Boş içerik durumunda çökmemesi için varsayılan bir metin sağlıyoruz.
-                    page_content=str(row['rag_content']) if pd.notna(row['rag_content']) else "Content not available",
-                    metadata={
-                        'source': row.get('source', 'N/A'), 
-                        'title': row.get('headline', 'N/A'), 
-                        # Metadata'da tarih gibi karmaşık nesneler sorun çıkarabildiği için string'e çeviriyoruz.
-                        'publish_date': str(row.get('timestamp', 'N/A'))
-                    }
-                ) 
-                for index, row in df.iterrows()
-            ]
-            vector_store = Chroma.from_documents(
-                documents=documents, 
-                embedding=embeddings, 
-                persist_directory=config.CHROMA_DB_PATH
-            )
-            print(f"Yeni veritabanı '{config.CHROMA_DB_PATH}' klasöründe başarıyla oluşturuldu.")
+            vector_store = build_vector_store(embeddings)
         except FileNotFoundError:
              print(f"HATA: '{config.KNOWLEDGE_BASE_CSV}' dosyası bulunamadı. Lütfen önce veri toplama ve işleme script'lerini çalıştırın.")
              exit()
 
-
-    retriever = vector_store.as_retriever(search_type="mmr", search_kwargs={"k": 10})
+    retriever = create_retriever(vector_store, use_hot_index)
     
     print("\nTemel RAG bileşenleri hazır.")
     print("="*50)
     return llm, retriever, vector_store
 
 # --- Diğer Yardımcı Fonksiyonlar ---
+@metrics.timed("price_read")
+def get_asset_price(asset="BTC"):
+    """
+    Varlığın son fiyatını, arka planda güncellenen PriceService anlık görüntüsünden okur (ağ çağrısı yok).
+    Servis başlatılmamışsa (ör. tek seferlik script'ler) fiyatlar bir kez doğrudan çekilir.
+    """
+    service = get_price_service()
+    if not service.is_running() and service.get_price(asset) is None:
+        service.refresh()
+    return service.format_price(asset)
+
 def get_btc_price():
-    """Anlık BTC/USDT fiyatını çeker."""
-    try:
-        client = BinanceClient()
-        ticker = client.get_symbol_ticker(symbol="BTCUSDT")
-        price = float(ticker['price'])
-        return f"${price:,.2f}"
-    except Exception as e:
-        print(f"UYARI: Anlık BTC fiyatı çekilemedi. Hata: {e}")
-        return "Price N/A"
+    """Anlık BTC/USDT fiyatını döndürür."""
+    return get_asset_price("BTC")
 
 def translate_to_turkish(text: str) -> str:
     """Verilen metni Türkçe'ye çevirir."""
     if not text:
         return "Çeviri için metin mevcut değil."
-    try:
-        # deep-translator kütüphanesini kullanarak çeviri yapıyoruz.
-        return GoogleTranslator(source='en', target='tr').translate(text)
-    except Exception as e:
-        print(f"UYARI: Metin çevrilemedi. Hata: {e}")
-        return "Çeviri yapılamadı."
+    # Çeviriler tek bir paylaşılan istemciyle yapılır ve önbelleğe alınır;
+    # aynı başlık farklı kaynaklardan tekrar geldiğinde Google'a tekrar gidilmez.
+    translated = get_translation_service().translate_sync(text)
+    return translated if translated else "Çeviri yapılamadı."
 
 def send_telegram_message(message):
-    """Belirtilen mesajı Telegram'a gönderir."""
-    TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-    CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-    
-    if not TOKEN or not CHAT_ID:
-        print("\n>> UYARI: Telegram bilgileri eksik. Mesaj gönderilemedi.")
-        return
-    try:
-        url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-        payload = {'chat_id': CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-        response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            print("\n>>> ALARM TELEGRAM'A BAŞARIYLA GÖNDERİLDİ <<<")
-        else:
-            print(f"\n>> HATA: Telegram'a mesaj gönderilemedi. Durum Kodu: {response.status_code}, Cevap: {response.text}")
-    except Exception as e:
-        print(f"\n>> HATA: Telegram mesajı gönderilirken bir sorun oluştu: {e}")
+    """
+    Belirtilen mesajı (senkron olarak) yapılandırılmış tüm Telegram chat'lerine gönderir.
+    Paylaşılan bağlantı havuzunu, hız sınırlarını ve tekrar denemeyi kullanır.
+    Canlı sistem bunun yerine TelegramDelivery'nin asenkron kuyruğunu kullanır.
+    """
+    return get_telegram_delivery().send_sync(message)
+
+# Rapor alanları: "Direction: X", "**Direction:** X" ve "**Direction**: X" yazımlarının hepsi kabul edilir.
+_FIELD_PREFIX = r"\**\s*{name}\s*\**\s*:\s*\**\s*\[?\s*"
+# Akış sırasında değerin yarım gelmesini (ör. "1" ardından "0") önlemek için değerden sonra bir ayraç görülmesi beklenir.
+_DIRECTION_RE = re.compile(_FIELD_PREFIX.format(name="Direction") + r"([A-Za-z]+)(?=[^A-Za-z])", re.IGNORECASE)
+_IMPACT_RE = re.compile(_FIELD_PREFIX.format(name="Impact Score") + r"(\d+)(?=\D)", re.IGNORECASE)
+_CONFIDENCE_RE = re.compile(_FIELD_PREFIX.format(name="Confidence Score") + r"(\d+)(?=\D)", re.IGNORECASE)
+_ANALYSIS_RE = re.compile(r"\**\s*Analysis\s*\**\s*:\s*\**\s*(.*)", re.IGNORECASE | re.DOTALL)
+
+
+class ReportStreamParser:
+    """
+    LLM raporunu parça parça (streaming) okuyan artımlı ayrıştırıcı.
+    Direction, Impact Score ve Confidence Score göründükleri anda çıkarılır; `verdict()` haberin
+    alarm kriterlerini karşıladığını ("alarm"), artık karşılayamayacağını ("reject") ya da
+    henüz belli olmadığını (None) söyler. Böylece üretim analiz cümlesi beklenmeden durdurulabilir.
+    """
+
+    def __init__(self, confidence_threshold=None, impact_threshold=None):
+        self.confidence_threshold = confidence_threshold or config.CONFIDENCE_THRESHOLD
+        self.impact_threshold = impact_threshold or config.IMPACT_THRESHOLD
+        self.text = ""
+        self.direction = None
+        self.impact = None
+        self.confidence = None
+
+    def feed(self, chunk):
+        """Yeni metin parçasını ekler ve güncel kararı döndürür."""
+        self.text += chunk
+        self._scan()
+        return self.verdict()
+
+    def finish(self):
+        """Akış bittiğinde metnin sonundaki değeri de okuyabilmek için çağrılır."""
+        self.text += "\n"
+        self._scan()
+
+    def _scan(self):
+        if self.direction is None:
+            match = _DIRECTION_RE.search(self.text)
+            if match:
+                self.direction = match.group(1)
+        if self.impact is None:
+            match = _IMPACT_RE.search(self.text)
+            if match:
+                self.impact = int(match.group(1))
+        if self.confidence is None:
+            match = _CONFIDENCE_RE.search(self.text)
+            if match:
+                self.confidence = int(match.group(1))
 
+    @property
+    def complete(self):
+        return self.direction is not None and self.impact is not None and self.confidence is not None
+
+    def verdict(self):
+        if self.direction is not None and self.direction.lower() == "neutral":
+            return "reject"
+        if self.impact is not None and self.impact < self.impact_threshold:
+            return "reject"
+        if self.confidence is not None and self.confidence < self.confidence_threshold:
+            return "reject"
+        return "alarm" if self.complete else None
+
+    def analysis(self):
+        match = _ANALYSIS_RE.search(self.text)
+        return match.group(1).strip() if match else ""
+
+    def report(self):
+        """Şu ana kadar bilinen alanları `parse_analyst_report` ile aynı anahtarlarla döndürür."""
+        fields = {"direction": self.direction, "impact": self.impact, "confidence": self.confidence}
+        report = {key: value for key, value in fields.items() if value is not None}
+        report["analysis"] = self.analysis()
+        return report
+
+
+@metrics.timed("parse")
 def parse_analyst_report(report_text):
     """LLM'den gelen metin raporunu ayrıştırır."""
-    # Bu fonksiyon, LLM'den gelen raporun formatındaki küçük değişikliklere karşı
-    # daha dayanıklı ve verimli olacak şekilde iyileştirildi.
-    try:
-        # Tek bir derlenmiş regex ile tüm alanları yakalamak daha verimlidir.
-        # re.DOTALL, '.' karakterinin yeni satırları da eşleştirmesini sağlar.
-        pattern = re.compile(
-            r"\s*\*{0,2}Direction\*{0,2}:\s*(.+?)\s+"
-            r"\*{0,2}Impact Score\*{0,2}:\s*(\d+)\s+"
-            r"\*{0,2}Confidence Score\*{0,2}:\s*(\d+)\s+"
-            r"\*{0,2}Analysis\*{0,2}:\s*(.*)",
-            re.IGNORECASE | re.DOTALL
-        )
-        match = pattern.search(report_text)
-        if not match:
-            print(f"AYRIŞTIRMA HATASI: Rapor beklenen formatta değil. Rapor: {report_text[:200]}...")
-            return None
-
-        return {"direction": match.group(1).strip(), "impact": int(match.group(2)), "confidence": int(match.group(3)), "analysis": match.group(4).strip()}
-    except (IndexError, ValueError) as e:
-        print(f"AYRIŞTIRMA HATASI: Raporun bir kısmı ayrıştırılamadı. Hata: {e}")
+    # Akış ayrıştırıcısıyla aynı alan kuralları kullanılır; alanlar tek tek arandığı için
+    # "**Direction:** Positive" gibi farklı markdown yazımları da ayrıştırılır.
+    parser = ReportStreamParser()
+    parser.feed(report_text or "")
+    parser.finish()
+    if not parser.complete:
+        print(f"AYRIŞTIRMA HATASI: Rapor beklenen formatta değil. Rapor: {str(report_text)[:200]}...")
         return None
+    return parser.report()
@@ -15,7 +15,8 @@ def main():
     
     # Temel RAG bileşenlerini yüklüyoruz (LLM ve veritabanı retriever'ı)
     print("Analistin beyni (vektör veritabanı) yükleniyor... Lütfen bekleyin.")
-    llm, retriever, _ = initialize_analyst_components()
+    # Sohbet soruları tüm arşivi kapsadığı için sıcak (son günler) indeks yerine tüm koleksiyon aranır.
+    llm, retriever, _ = initialize_analyst_components(use_hot_index=False)
 
     # Bu betiğe özel sohbet zincirini oluşturuyoruz.
     chat_prompt = ChatPromptTemplate.from_template(config.CHAT_PROMPT)
@@ -0,0 +1,765 @@
+# benchmark.py
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.llms import LLM
+import config
+import knowledge_store
+
+# Çevrimdışı performans ölçümü: canlı sistemin kendi işleyicisi (main.analyze_news_on_arrival) arşivden
+# okunan haberlerle beslenir; Gemini, çeviri, fiyat ve Telegram yerine gecikmesi ayarlanabilen,
+# deterministik yerel taklitler kullanılır. Böylece kod değişikliklerinin etkisi ağ ve kota
+# dalgalanmalarından bağımsız olarak, aynı girdiyle tekrar tekrar ölçülebilir.
+#
+#   python benchmark.py replay --limit 500 --rate 5
+#   python benchmark.py replay --speedup 120 --llm-latency 2.0
+#   python benchmark.py replay --rate 20 --processes 1,2,4   (sharded_main ile çok süreçli ölçeklenme)
+#   python benchmark.py rebuild --sizes 1000,5000,20000
+
+RAW_COLUMNS = ["id", "timestamp", "headline", "summary", "source", "symbols"]
+
+
+def _seed(text):
+    return int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "little")
+
+
+def _jitter(latency, key):
+    """Ortalama `latency` etrafında ±%50 sapan, ama aynı anahtar için her çalıştırmada aynı olan gecikme."""
+    if latency <= 0:
+        return 0.0
+    return latency * (0.5 + (_seed(key) % 1000) / 1000.0)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta bayt cinsindendir.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Ölçüm ---
+class LatencyRecorder:
+    """Aşama adı -> süre (sn) örneklerini thread-safe olarak toplar ve yüzdelik özetini çıkarır."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage, func):
+        """Senkron veya asenkron bir fonksiyonu, her çağrının süresini `stage` altında kaydedecek şekilde sarar."""
+        if asyncio.iscoroutinefunction(func):
+            async def timed_async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self):
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+        result = {}
+        for stage, values in samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) if values else (0.0, 0.0, 0.0)
+            result[stage] = {"count": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+                             "max": float(max(values)) if values else 0.0}
+        return result
+
+    def report(self):
+        lines = [f"  {'aşama':<40} {'adet':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)"]
+        for stage, s in self.summary().items():
+            lines.append(f"  {stage:<40} {s['count']:>6} {s['p50'] * 1000:>8.1f} {s['p95'] * 1000:>8.1f} "
+                         f"{s['p99'] * 1000:>8.1f} {s['max'] * 1000:>8.1f}")
+        return "\n".join(lines)
+
+
+class DepthSampler:
+    """Analiz kuyruğu, Telegram kuyruğu ve write-behind tamponunun doluluğunu periyodik olarak örnekler."""
+
+    def __init__(self, probes, interval=0.05):
+        self.probes = probes
+        self.interval = interval
+        self.samples = {name: [] for name in probes}
+
+    async def run(self):
+        while True:
+            for name, probe in self.probes.items():
+                self.samples[name].append(probe())
+            await asyncio.sleep(self.interval)
+
+    def summary(self):
+        return {name: {"max": max(values, default=0), "mean": float(np.mean(values)) if values else 0.0,
+                       "p95": float(np.percentile(values, 95)) if values else 0.0}
+                for name, values in self.samples.items()}
+
+
+# --- Yerel taklitler ---
+class FakeEmbeddings(Embeddings):
+    """
+    Metnin kelimelerinden türetilen deterministik vektörler üretir (kelime başına sabit rastgele vektörlerin toplamı).
+    Ortak kelimesi çok olan metinlerin vektörleri de birbirine yakın olur; böylece kopya tespiti ve bağlam arama
+    gerçekçi sonuçlar verir. Her istek `latency` (±%50) kadar bekler.
+    """
+
+    def __init__(self, dim=64, latency=0.0, recorder=None):
+        self.dim = dim
+        self.latency = latency
+        self.recorder = recorder
+        self.requests = 0
+        self.texts = 0
+        self._token_vectors = {}
+
+    def _token_vector(self, token):
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            vector = np.random.default_rng(_seed(token)).standard_normal(self.dim)
+            self._token_vectors[token] = vector
+        return vector
+
+    def _vector(self, text):
+        from minhash import normalize_headline
+        tokens = normalize_headline(text).split() or [str(text)]
+        vector = np.sum([self._token_vector(t) for t in tokens], axis=0)
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        start = time.perf_counter()
+        self.requests += 1
+        self.texts += len(texts)
+        time.sleep(_jitter(self.latency, texts[0] if texts else ""))
+        vectors = [self._vector(t) for t in texts]
+        if self.recorder:
+            self.recorder.record("embedding (model isteği)", time.perf_counter() - start)
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _prompt_headline(prompt):
+    """Analiz isteminden haber başlığını çıkarır; rapor bağlamdan bağımsız olarak sadece başlığa göre üretilir."""
+    marker = "USER INPUT"
+    if marker not in prompt:
+        return prompt
+    for line in prompt.rsplit(marker, 1)[1].splitlines()[1:]:
+        if line.strip():
+            return line.strip()
+    return prompt
+
+
+def fake_report(headline, alarm_ratio):
+    """Başlığa göre deterministik, `parse_analyst_report` ile ayrıştırılabilen bir analiz raporu üretir."""
+    rng = random.Random(_seed(headline))
+    if rng.random() < alarm_ratio:
+        direction = rng.choice(["Positive", "Negative"])
+        impact, confidence = rng.randint(config.IMPACT_THRESHOLD, 10), rng.randint(config.CONFIDENCE_THRESHOLD, 10)
+    else:
+        direction = rng.choice(["Positive", "Negative", "Neutral"])
+        impact, confidence = rng.randint(1, config.IMPACT_THRESHOLD - 1), rng.randint(1, 10)
+    # Gemini'nin istemdeki şablona uyarak ürettiği markdown biçimi.
+    return (f"**STRUCTURED ANALYSIS REPORT:**\n**Direction:** {direction}\n**Impact Score:** {impact}\n"
+            f"**Confidence Score:** {confidence}\n**Analysis:** Catalyst-Signal. Benchmark report: the headline is scored "
+            f"deterministically from its text so that repeated runs produce identical verdicts, and this sentence "
+            f"stands in for the free-text justification that follows the scores.")
+
+
+class FakeAnalystLLM(LLM):
+    """Gemini yerine geçen deterministik LLM. Her çağrı `latency` (±%50) kadar sürer."""
+
+    latency: float = 0.0
+    alarm_ratio: float = 0.1
+    recorder: object = None
+
+    @property
+    def _llm_type(self):
+        return "benchmark-fake"
+
+    def _respond(self, prompt):
+        return fake_report(_prompt_headline(prompt), self.alarm_ratio)
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        start = time.perf_counter()
+        time.sleep(_jitter(self.latency, prompt))
+        if self.recorder:
+            self.recorder.record("llm (model isteği)", time.perf_counter() - start)
+        return self._respond(prompt)
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        start = time.perf_counter()
+        await asyncio.sleep(_jitter(self.latency, prompt))
+        if self.recorder:
+            self.recorder.record("llm (model isteği)", time.perf_counter() - start)
+        return self._respond(prompt)
+
+    async def _astream(self, prompt, stop=None, run_manager=None, **kwargs):
+        """Raporu küçük parçalar halinde verir: sürenin ~%40'ı ilk parçaya kadar, kalanı parçalara eşit dağılır."""
+        from langchain_core.outputs import GenerationChunk
+        text = self._respond(prompt)
+        total = _jitter(self.latency, prompt)
+        pieces = [text[i:i + 8] for i in range(0, len(text), 8)]
+        start = time.perf_counter()
+        try:
+            await asyncio.sleep(total * 0.4)
+            for piece in pieces:
+                yield GenerationChunk(text=piece)
+                await asyncio.sleep(total * 0.6 / len(pieces))
+        finally:
+            # Erken durdurulan akışlar da (kapatıldıkları ana kadar) ölçülür.
+            if self.recorder:
+                self.recorder.record("llm (model isteği)", time.perf_counter() - start)
+
+
+class FakeTranslator:
+    """deep_translator.GoogleTranslator yerine geçer; satır yapısını koruyarak deterministik 'çeviri' döndürür."""
+
+    def __init__(self, latency=0.0, recorder=None):
+        self.latency = latency
+        self.recorder = recorder
+        self.requests = 0
+
+    def translate(self, text):
+        start = time.perf_counter()
+        self.requests += 1
+        time.sleep(_jitter(self.latency, text))
+        if self.recorder:
+            self.recorder.record("çeviri (servis isteği)", time.perf_counter() - start)
+        return "\n".join(f"[TR] {line}" for line in str(text).split("\n"))
+
+
+def _fake_price(asset):
+    return 10 + _seed(asset) % 100000 / 10
+
+
+class FakeBinanceClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def get_symbol_ticker(self, symbols):
+        time.sleep(_jitter(self.latency, symbols))
+        return [{"symbol": pair, "price": str(_fake_price(pair))} for pair in json.loads(symbols)]
+
+
+class FakeAlpacaPriceClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def get_stock_latest_trade(self, request):
+        symbols = request.symbol_or_symbols
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        time.sleep(_jitter(self.latency, symbols))
+        return {symbol: SimpleNamespace(price=_fake_price(symbol)) for symbol in symbols}
+
+
+def make_embeddings(latency, recorder=None, cache_path=None):
+    """Taklit modeli, canlı sistemdeki gibi SQLite önbelleğiyle (CachedEmbeddings) sarar."""
+    from embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(FakeEmbeddings(latency=latency, recorder=recorder), "benchmark-fake", cache_path=cache_path)
+
+
+# --- Veri ---
+_ASSET_SYMBOLS = [["BTCUSD"], ["ETHUSD"], ["SOLUSD"], ["XRPUSD"], ["BNBUSD"], ["SPY"], ["QQQ"], ["BTCUSD", "ETHUSD"]]
+_OTHER_SYMBOLS = [["AAPL"], ["TSLA"], ["NVDA"], ["AMZN"]]
+_TEMPLATES = [
+    "SEC approves spot {asset} ETF applications from {firm}",
+    "{firm} files lawsuit against {asset} developers over token sale",
+    "{asset} exchange hacked, {num} million dollars drained from hot wallet",
+    "Fed signals rate cut of {num} basis points at next FOMC meeting",
+    "CPI rises {num}% year over year, above economist expectations",
+    "{firm} to acquire {asset} mining firm in {num} million dollar deal",
+    "{asset} mainnet upgrade goes live after {num} month delay",
+    "{asset} price prediction: could it hit new highs this week?",
+    "Top gainers and losers: {asset} up {num}% in morning trade",
+    "Treasury yields climb as nonfarm payrolls beat forecasts by {num}k",
+    "{firm} CEO says {asset} adoption will accelerate in {num} years",
+    "Sanctions on {firm} widen as war risk lifts {asset} volatility",
+]
+_FIRMS = ["BlackRock", "Fidelity", "Grayscale", "MicroStrategy", "Coinbase", "Binance", "Ark Invest", "Tesla"]
+_SOURCES = ["benzinga", "coindesk", "reuters", "bloomberg"]
+
+
+def synthetic_corpus(n, days=45, duplicate_ratio=0.1, seed=7):
+    """
+    Arşivle aynı sütunlara sahip deterministik sentetik haberler üretir (en yeni haber şimdiki zamanda).
+    Haberlerin bir kısmı önceki başlıkların başka kaynaktan yeniden yayınıdır; kopya önbelleği de ölçülür.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    offsets = sorted(rng.uniform(0, days * 86400) for _ in range(n))
+    rows = []
+    for i, offset in enumerate(offsets):
+        if rows and rng.random() < duplicate_ratio:
+            original = rng.choice(rows[-50:])
+            headline = rng.choice(["BREAKING: {}", "{} - report", "UPDATE: {}"]).format(original["headline"])
+            symbols = original["symbols"].split(",") if original["symbols"] else []
+        else:
+            symbols = rng.choice(_ASSET_SYMBOLS + _OTHER_SYMBOLS + [[]])
+            asset = symbols[0][:3] if symbols else "Bitcoin"
+            headline = rng.choice(_TEMPLATES).format(asset=asset, firm=rng.choice(_FIRMS), num=rng.randint(2, 95))
+        rows.append({
+            "id": 10_000_000 + i,
+            "timestamp": str(pd.Timestamp(now - timedelta(seconds=days * 86400 - offset)).floor("s")),
+            "headline": headline,
+            "summary": f"{headline}. Market participants reacted as analysts weighed the implications for the sector.",
+            "source": rng.choice(_SOURCES),
+            "symbols": ",".join(symbols),
+        })
+    return pd.DataFrame(rows, columns=RAW_COLUMNS)
+
+
+def load_corpus(n, synthetic=False, shift_to_now=True):
+    """
+    Arşivin en yeni `n` haberini zaman sırasıyla döndürür; arşiv yoksa veya `synthetic` ise sentetik veri üretir.
+    `shift_to_now` açıksa zaman damgaları en yeni haber şimdiye denk gelecek şekilde kaydırılır
+    (sıcak indeks ve zaman pencereleri canlı sistemdeki gibi çalışsın diye).
+    """
+    if not synthetic and knowledge_store.knowledge_base_exists():
+        df = knowledge_store.to_csv_frame(knowledge_store.read_knowledge_base(columns=RAW_COLUMNS))
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, format='mixed')
+        df = df.dropna(subset=['id', 'headline', 'timestamp']).sort_values('timestamp').tail(n)
+        if len(df) < n:
+            print(f"UYARI: Arşivde sadece {len(df)} haber var (istenen: {n}).")
+        if shift_to_now and len(df):
+            df['timestamp'] = df['timestamp'] + (pd.Timestamp.now(tz="UTC") - df['timestamp'].max())
+        # Arşivin kendi yazdığı biçimde (ör. "2024-05-01 13:45:00+00:00") bırakılır.
+        df['timestamp'] = df['timestamp'].dt.floor("s").astype(str)
+        return df.reset_index(drop=True)
+    print(f"Arşiv kullanılmıyor; {n} sentetik haber üretiliyor.")
+    return synthetic_corpus(n)
+
+
+def write_knowledge_base(df, path):
+    """Ham haberleri (RAW_COLUMNS) `rag_content` ekleyerek CSV arşiv formatında yazar."""
+    from document_builder import build_rag_content
+    df = df.copy()
+    df['rag_content'] = build_rag_content(df)
+    df[knowledge_store.KB_COLUMNS].to_csv(path, index=False)
+
+
+def news_item(row):
+    """Arşiv satırını Alpaca'nın canlı akıştan verdiği haber nesnesinin alanlarıyla taklit eder."""
+    timestamp = pd.Timestamp(row['timestamp'])
+    return SimpleNamespace(id=int(row['id']), headline=row['headline'], summary=row['summary'] if isinstance(row['summary'], str) else "",
+                           source=row['source'], symbols=knowledge_store.parse_symbols(row['symbols']),
+                           created_at=timestamp.to_pydatetime())
+
+
+def arrival_schedule(timestamps, rate=None, speedup=60.0, max_gap=5.0):
+    """
+    Her haberin replay başlangıcına göre gönderilme anını (sn) döndürür.
+    `rate` verilirse sabit hız (haber/sn), verilmezse kayıtlı varış aralıkları `speedup` kat hızlandırılır
+    (tek bir boşluk en fazla `max_gap` saniye sürer).
+    """
+    if rate:
+        return [i / rate for i in range(len(timestamps))]
+    times = pd.to_datetime(pd.Series(timestamps), utc=True, format='mixed')
+    gaps = times.diff().dt.total_seconds().fillna(0).clip(lower=0) / speedup
+    return list(np.cumsum(gaps.clip(upper=max_gap)))
+
+
+@contextlib.contextmanager
+def quiet(enabled):
+    """Canlı sistemin haber başına yazdırdığı çıktıları (thread'lerdekiler dahil) bastırır."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# --- Replay modu ---
+def configure_fakes(workdir, args, recorder=None):
+    """
+    Dosya yollarını geçici klasöre alır, Gemini, çeviri ve fiyat istemcilerini taklitlere yönlendirir ve
+    `main` modülünü içe aktarır. (main, fiyat servisi) döndürür.
+    """
+    config.CHROMA_DB_PATH = os.path.join(workdir, "chroma_db")
+    config.LIVE_BUFFER_CSV = os.path.join(workdir, "live_buffer.csv")
+    config.TRANSLATION_CACHE_PATH = os.path.join(workdir, "translation_cache.sqlite")
+    config.EMBEDDING_CACHE_PATH = os.path.join(workdir, "embedding_cache.sqlite")
+    config.KNOWLEDGE_BASE_FORMAT = "csv"
+    config.KNOWLEDGE_BASE_CSV = os.path.join(workdir, "knowledge_base.csv")
+    config.EMBEDDING_REQUESTS_PER_MINUTE = args.requests_per_minute
+    config.PRICE_POLL_SECONDS = args.price_poll
+    config.LLM_STREAMING = not args.no_streaming
+    os.environ.setdefault(config.GEMINI_API_KEY_ENV, "benchmark")
+
+    import analysis_engine
+    analysis_engine.get_gemini_api_key = lambda: "benchmark"
+    analysis_engine.create_llm = lambda api_key: FakeAnalystLLM(latency=args.llm_latency, alarm_ratio=args.alarm_ratio,
+                                                                recorder=recorder)
+    analysis_engine.create_analyst_embeddings = lambda api_key: make_embeddings(args.embed_latency, recorder)
+
+    from price_service import get_price_service
+    prices = get_price_service()
+    prices._binance = FakeBinanceClient(args.price_latency)
+    prices._alpaca = FakeAlpacaPriceClient(args.price_latency)
+
+    import main
+    main.translator._client = FakeTranslator(args.translate_latency, recorder)
+    return main, prices
+
+
+def start_telegram_stand_in(args):
+    """Yerel Telegram taklidini başlatır ve bot ayarlarını ortam değişkenleriyle ona yönlendirir."""
+    from telegram_delivery import TelegramStandIn
+    chats = [str(-1000 - i) for i in range(args.chats)]
+    stand_in = TelegramStandIn(latency=args.telegram_latency).start()
+    os.environ[config.TELEGRAM_BOT_TOKEN_ENV] = "BENCHMARK"
+    os.environ[config.TELEGRAM_CHAT_ID_ENV] = ",".join(chats)
+    os.environ[config.TELEGRAM_API_BASE_ENV] = stand_in.url
+    return stand_in
+
+
+def prepare_live_environment(workdir, args, recorder):
+    """
+    Canlı sistemin tüm dış bağımlılıklarını yerel taklitlere yönlendirir ve `main` modülünü içe aktarır.
+    Dosya yolları geçici klasöre alınır; gerçek veritabanı ve önbelleklere dokunulmaz.
+    """
+    stand_in = start_telegram_stand_in(args)
+    main, prices = configure_fakes(workdir, args, recorder)
+    main.translator.translate = recorder.wrap("çeviri (alarm yolunda)", main.translator.translate)
+    main.retrieve_by_vector = recorder.wrap("bağlam arama", main.retrieve_by_vector)
+    main.run_llm_analysis = recorder.wrap("analiz (arama + llm + ayrıştırma)", main.run_llm_analysis)
+    main.send_alarm = recorder.wrap("alarm hazırlama (fiyat + çeviri)", main.send_alarm)
+
+    analyze_news_item = main.analyze_news_item
+
+    async def timed_analyze_news_item(data, received_at, assets=()):
+        recorder.record("kuyrukta bekleme", time.monotonic() - received_at)
+        start = time.perf_counter()
+        try:
+            return await analyze_news_item(data, received_at, assets)
+        finally:
+            recorder.record("işçi süresi (haber başına)", time.perf_counter() - start)
+            recorder.record("uçtan uca (varış -> analiz sonu)", time.monotonic() - received_at)
+
+    main.analyze_news_item = timed_analyze_news_item
+    return main, stand_in, prices
+
+
+async def replay(main, items, schedule, recorder, sampler):
+    """Haberleri takvime göre canlı işleyiciye verir, tüm analizler ve teslimatlar bitene kadar bekler."""
+    sampler_task = asyncio.create_task(sampler.run())
+    start = time.monotonic()
+    for item, offset in zip(items, schedule):
+        delay = start + offset - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # İşleyici kuyruk doluyken beklediği için replay takvimin gerisine düşebilir (websocket okuyucusunun gecikmesi).
+        recorder.record("akış gecikmesi (takvime göre)", max(0.0, -delay))
+        handler_start = time.perf_counter()
+        await main.analyze_news_on_arrival(item)
+        recorder.record("akış işleyicisi (filtre + kuyruğa alma)", time.perf_counter() - handler_start)
+    dispatched = time.monotonic() - start
+    if main.analysis_queue is not None:
+        await main.analysis_queue.join()
+    await main.telegram.drain()
+    elapsed = time.monotonic() - start
+    sampler_task.cancel()
+    for task in main.worker_tasks:
+        task.cancel()
+    return dispatched, elapsed
+
+
+def run_replay(args):
+    recorder = LatencyRecorder()
+    workdir = tempfile.mkdtemp(prefix="benchmark_replay_")
+    corpus = load_corpus(args.index_size + args.limit, synthetic=args.synthetic)
+    history, live = corpus.iloc[:-args.limit], corpus.iloc[-args.limit:]
+    print(f"Geçici klasör: {workdir} | geçmiş (indeks): {len(history)} haber | replay: {len(live)} haber")
+
+    main, stand_in, prices = prepare_live_environment(workdir, args, recorder)
+    write_knowledge_base(history, config.KNOWLEDGE_BASE_CSV)
+
+    setup_start = time.perf_counter()
+    with quiet(not args.verbose):
+        main.runtime.start()
+        prices.start()
+        if not args.cold_start:
+            main.runtime.index_ready.wait()
+    print(f"Kurulum (indeks oluşturma dahil): {time.perf_counter() - setup_start:.1f} sn | "
+          f"en yüksek RSS: {peak_rss_mb():.0f} MB")
+    if main.runtime.error:
+        print(f"HATA: Başlangıç başarısız: {main.runtime.error}")
+        return None
+    if main.runtime.embeddings is not None:
+        main.runtime.embeddings.embed_documents = recorder.wrap("embedding (canlı haber)", main.runtime.embeddings.embed_documents)
+
+    items = [news_item(row) for row in live.to_dict("records")]
+    schedule = arrival_schedule(live['timestamp'].tolist(), rate=args.rate, speedup=args.speedup, max_gap=args.max_gap)
+    sampler = DepthSampler({
+        "analiz kuyruğu": lambda: main.analysis_queue.qsize() if main.analysis_queue is not None else 0,
+        "telegram kuyruğu": main.telegram.pending,
+        "write-behind tamponu": main.live_writer.pending,
+    })
+    mode = f"sabit {args.rate} haber/sn" if args.rate else f"kayıtlı aralıklar x{args.speedup:g} (en fazla {args.max_gap:g} sn)"
+    print(f"Replay başlıyor: {len(items)} haber, {mode}, {config.ANALYSIS_WORKERS} analiz işçisi...")
+
+    with quiet(not args.verbose):
+        dispatched, elapsed = asyncio.run(replay(main, items, schedule, recorder, sampler))
+        main.live_writer.flush()
+    for latency in main.telegram._latencies:
+        recorder.record("telegram teslimatı (kuyruk -> gönderim)", latency)
+    prices.stop()
+    stand_in.stop()
+
+    counters = main.prefilter.counters
+    analyzed = len(recorder.samples.get("işçi süresi (haber başına)", []))
+    result = {
+        "items": len(items), "dispatch_seconds": dispatched, "elapsed_seconds": elapsed,
+        "throughput_per_second": len(items) / elapsed if elapsed else 0.0,
+        "analyzed": analyzed, "alarms": len(recorder.samples.get("alarm hazırlama (fiyat + çeviri)", [])),
+        "llm_requests": len(recorder.samples.get("llm (model isteği)", [])),
+        "cache_hit_rate": main.analysis_cache.hit_rate(),
+        "prefilter": dict(counters), "stages": recorder.summary(), "queues": sampler.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"\n--- REPLAY SONUÇLARI ---")
+    print(f"{len(items)} haber {elapsed:.2f} sn içinde işlendi (gönderim {dispatched:.2f} sn) -> "
+          f"{result['throughput_per_second']:.1f} haber/sn")
+    print(f"Analiz edilen: {analyzed} | LLM çağrısı: {result['llm_requests']} | alarm: {result['alarms']} | "
+          f"ön filtre: {main.prefilter.stats_line()}")
+    print(main.analysis_cache.stats_line())
+    print(main.telegram.stats_line())
+    print(main.translator.stats_line())
+    print("Aşama gecikmeleri:")
+    print(recorder.report())
+    print("Kuyruk doluluğu:")
+    for name, s in result["queues"].items():
+        print(f"  {name:<40} max {s['max']:>5} | ortalama {s['mean']:>7.2f} | p95 {s['p95']:>7.1f}")
+    print(f"En yüksek RSS: {result['peak_rss_mb']:.0f} MB")
+    return result
+
+
+# --- Çok süreçli replay (sharded_main) ---
+def configure_shard_process(workdir, args):
+    """
+    run_sharded'ın her süreçte (akış okuyucu dahil) ilk çağırdığı kurulum. Süreçler aynı mmap deposunu
+    paylaşır; Telegram ayarları ortam değişkenleriyle alt süreçlere geçer.
+    """
+    import multiprocessing
+    if not args.verbose and multiprocessing.parent_process() is not None:
+        # Alt süreçlerin haber başına çıktıları (quiet() sadece bu süreci susturur).
+        sys.stdout = open(os.devnull, "w")
+    main, _ = configure_fakes(workdir, args)
+    config.VECTOR_BACKEND = "mmap"
+    config.MMAP_STORE_DIR = os.path.join(workdir, "vector_mmap")
+    config.METRICS_PORT = None
+    from news_filter import NewsPrefilter
+    from telegram_delivery import TelegramDelivery
+    # Aynı okuyucu süreçte art arda yapılan çalıştırmalar birbirinin kuyruklarını ve sayaçlarını görmesin.
+    main.prefilter = NewsPrefilter()
+    main.telegram = TelegramDelivery()
+
+
+class ShardReplayStream:
+    """run_sharded'a Alpaca akışı yerine verilir: haberleri takvime göre okuyucunun işleyicisine oynatır."""
+
+    def __init__(self, router, items, schedule):
+        self.router = router
+        self.items = items
+        self.schedule = schedule
+        self.handler = None
+        self.dispatched = self.analyzed = self.elapsed = 0.0
+
+    def subscribe_news(self, handler, *symbols):
+        self.handler = handler
+
+    def run(self):
+        # Süreçlerin açılışı ve indeks yüklemesi ölçüme girmez (tek süreçli replay'deki kurulum gibi).
+        self.router.wait_ready(config.SHARD_INDEX_LOAD_TIMEOUT_SECONDS)
+        asyncio.run(self._replay())
+
+    async def _replay(self):
+        start = time.monotonic()
+        for item, offset in zip(self.items, self.schedule):
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.handler(item)
+        self.dispatched = time.monotonic() - start
+        while self.router.in_flight():
+            await asyncio.sleep(0.02)
+        self.analyzed = time.monotonic() - start
+        await self.router.main.telegram.drain()
+        self.elapsed = time.monotonic() - start
+
+
+def run_sharded_replay(args):
+    """
+    Aynı haberleri `--processes` ile verilen her analiz süreci sayısında sharded_main üzerinden oynatır ve
+    iş hacminin süreç sayısıyla nasıl ölçeklendiğini raporlar. Her çalıştırma kendi geçici klasöründe,
+    aynı geçmişten oluşturulan mmap deposuyla başlar. İş hacmi analizlerin bitişine göre hesaplanır;
+    Telegram'ın chat başına hız sınırı süreç sayısından bağımsız olduğu için teslimat süresi ayrıca verilir.
+    """
+    import functools
+    import sharded_main
+    counts = [int(n) for n in str(args.processes).split(",")]
+    corpus = load_corpus(args.index_size + args.limit, synthetic=args.synthetic)
+    history, live = corpus.iloc[:-args.limit], corpus.iloc[-args.limit:]
+    items = [news_item(row) for row in live.to_dict("records")]
+    schedule = arrival_schedule(live['timestamp'].tolist(), rate=args.rate, speedup=args.speedup, max_gap=args.max_gap)
+    stand_in = start_telegram_stand_in(args)
+    print(f"Geçmiş (indeks): {len(history)} haber | replay: {len(items)} haber | CPU çekirdeği: {os.cpu_count()} | "
+          f"süreç başına {config.ANALYSIS_WORKERS} analiz işçisi")
+
+    results = []
+    for count in counts:
+        workdir = tempfile.mkdtemp(prefix=f"benchmark_sharded_{count}_")
+        write_knowledge_base(history, os.path.join(workdir, "knowledge_base.csv"))
+        streams = []
+
+        def stream_factory(router):
+            streams.append(ShardReplayStream(router, items, schedule))
+            return streams[-1]
+
+        setup = functools.partial(configure_shard_process, workdir, args)
+        with quiet(not args.verbose):
+            sharded_main.run_sharded(count, child_setup=setup, stream_factory=stream_factory)
+        stream = streams[0]
+        row = {"processes": count, "items": len(items), "dispatch_seconds": stream.dispatched,
+               "analysis_seconds": stream.analyzed, "elapsed_seconds": stream.elapsed,
+               "analyzed": sum(stream.router.routed), "held": stream.router.held,
+               "throughput_per_second": len(items) / stream.analyzed if stream.analyzed else 0.0}
+        row["speedup"] = row["throughput_per_second"] / results[0]["throughput_per_second"] if results else 1.0
+        results.append(row)
+        print(f"{count:>3} süreç | analiz {row['analysis_seconds']:7.2f} sn (gönderim {row['dispatch_seconds']:.2f} sn, "
+              f"Telegram dahil {row['elapsed_seconds']:.2f} sn) | {row['throughput_per_second']:6.1f} haber/sn | "
+              f"x{row['speedup']:.2f} | analiz edilen: {row['analyzed']} | sıra için bekletilen: {row['held']}")
+    stand_in.stop()
+    return {"sharded": results}
+
+
+# --- Yeniden oluşturma modu ---
+def run_rebuild(args):
+    """
+    `update_and_build_databases` süresini farklı arşiv boyutlarında ölçer. Her boyut için boş bir klasörde:
+    1. `size` haber ham veri olarak verilip veritabanı sıfırdan oluşturulur (full_rebuild=True),
+    2. arşivin `incremental_ratio` oranında yeni haber eklenip artımlı güncelleme çalıştırılır.
+    """
+    from chromadb.api.client import SharedSystemClient
+    os.environ.setdefault(config.GEMINI_API_KEY_ENV, "benchmark")
+    import update_database
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    extra = max(1, int(max(sizes) * args.incremental_ratio))
+    corpus = load_corpus(max(sizes) + extra, synthetic=args.synthetic)
+    config.EMBEDDING_REQUESTS_PER_MINUTE = args.requests_per_minute
+    results = []
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix=f"benchmark_rebuild_{size}_")
+        config.KNOWLEDGE_BASE_FORMAT = "csv"
+        config.KNOWLEDGE_BASE_CSV = os.path.join(workdir, "knowledge_base.csv")
+        config.CHROMA_DB_PATH = update_database.CHROMA_DB_PATH = os.path.join(workdir, "chroma_db")
+        update_database.RAW_DATA_CSV = os.path.join(workdir, "temp_raw_news.csv")
+        update_database.LIVE_BUFFER_CSV = os.path.join(workdir, "live_buffer.csv")
+        cache_path = os.path.join(workdir, "embedding_cache.sqlite")
+        fakes = []
+
+        def create_embeddings(api_key=None):
+            embeddings = make_embeddings(args.embed_latency, cache_path=cache_path)
+            fakes.append(embeddings.embeddings)
+            return embeddings
+
+        update_database.create_embeddings = create_embeddings
+        base = corpus.iloc[:size]
+        added = corpus.iloc[size:size + max(1, int(size * args.incremental_ratio))]
+        row = {"size": size}
+        for phase, df, full_rebuild in (("full_rebuild", base, True), ("incremental", added, False)):
+            df.to_csv(update_database.RAW_DATA_CSV, index=False)
+            start = time.perf_counter()
+            with quiet(not args.verbose):
+                update_database.update_and_build_databases(full_rebuild=full_rebuild)
+            row[f"{phase}_seconds"] = time.perf_counter() - start
+            row[f"{phase}_embedded"] = fakes[-1].texts if fakes else 0
+            row[f"{phase}_rows"] = len(df)
+        row["peak_rss_mb"] = peak_rss_mb()
+        results.append(row)
+        print(f"{size:>8} haber | sıfırdan: {row['full_rebuild_seconds']:7.1f} sn "
+              f"({size / row['full_rebuild_seconds']:7.0f} haber/sn) | "
+              f"artımlı (+{row['incremental_rows']}): {row['incremental_seconds']:6.1f} sn, "
+              f"{row['incremental_embedded']} embed | en yüksek RSS: {row['peak_rss_mb']:.0f} MB")
+        if not args.keep:
+            import shutil
+            shutil.rmtree(workdir, ignore_errors=True)
+            SharedSystemClient.clear_system_cache()
+    return {"rebuild": results}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Canlı analiz hattı ve veritabanı yeniden oluşturma için çevrimdışı benchmark.")
+    parser.add_argument("--synthetic", action="store_true", help="Arşiv yerine sentetik haberler kullan.")
+    parser.add_argument("--embed-latency", type=float, default=0.15, help="Embedding isteği başına ortalama gecikme (sn).")
+    parser.add_argument("--requests-per-minute", type=float, default=1_000_000,
+                        help="Embedding hız sınırı; varsayılan kotayı devre dışı bırakır (kod performansı ölçülür).")
+    parser.add_argument("--json", help="Sonuçları bu dosyaya JSON olarak yaz (çalıştırmaları karşılaştırmak için).")
+    parser.add_argument("--verbose", action="store_true", help="Canlı sistemin haber başına çıktılarını gösterir.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    replay_parser = sub.add_parser("replay", help="Arşivdeki haberleri canlı işleyiciye yeniden oynatır.")
+    replay_parser.add_argument("--limit", type=int, default=300, help="Oynatılacak (en yeni) haber sayısı.")
+    replay_parser.add_argument("--index-size", type=int, default=5000, help="Vektör veritabanına konacak önceki haber sayısı.")
+    replay_parser.add_argument("--rate", type=float, help="Sabit hız (haber/sn). Verilmezse kayıtlı varış aralıkları kullanılır.")
+    replay_parser.add_argument("--speedup", type=float, default=60.0, help="Kayıtlı varış aralıklarının hızlandırma katsayısı.")
+    replay_parser.add_argument("--max-gap", type=float, default=5.0, help="İki haber arasında beklenecek en uzun süre (sn).")
+    replay_parser.add_argument("--cold-start", action="store_true",
+                               help="İndeksin hazır olmasını beklemeden başla (bağlamsız başlangıç modunu ölçer).")
+    replay_parser.add_argument("--llm-latency", type=float, default=1.5)
+    replay_parser.add_argument("--translate-latency", type=float, default=0.3)
+    replay_parser.add_argument("--price-latency", type=float, default=0.05)
+    replay_parser.add_argument("--price-poll", type=float, default=config.PRICE_POLL_SECONDS)
+    replay_parser.add_argument("--telegram-latency", type=float, default=0.08)
+    replay_parser.add_argument("--chats", type=int, default=1, help="Alarm gönderilecek taklit chat sayısı.")
+    replay_parser.add_argument("--no-streaming", action="store_true",
+                               help="LLM cevabını akış yerine tek parça bekle (config.LLM_STREAMING = False).")
+    replay_parser.add_argument("--alarm-ratio", type=float, default=0.15, help="Taklit LLM'in alarm üreten rapor oranı.")
+    replay_parser.add_argument("--processes",
+                               help="Virgülle ayrılmış analiz süreci sayıları (ör. 1,2,4). Verilirse replay sharded_main "
+                                    "ile çok süreçli çalışır ve süreç sayısına göre ölçeklenme raporlanır.")
+
+    rebuild_parser = sub.add_parser("rebuild", help="update_and_build_databases süresini farklı arşiv boyutlarında ölçer.")
+    rebuild_parser.add_argument("--sizes", default="1000,5000,20000", help="Virgülle ayrılmış arşiv boyutları.")
+    rebuild_parser.add_argument("--incremental-ratio", type=float, default=0.01,
+                                help="Artımlı güncelleme ölçümünde eklenecek yeni haber oranı.")
+    rebuild_parser.add_argument("--keep", action="store_true", help="Geçici klasörleri silme.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.mode == "replay":
+        result = run_sharded_replay(args) if args.processes else run_replay(args)
+    else:
+        result = run_rebuild(args)
+    if args.json and result is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Sonuçlar '{args.json}' dosyasına yazıldı.")
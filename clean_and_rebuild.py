@@ -1,15 +1,17 @@
 # clean_and_rebuild.py
 
 
-import pandas as pd
 import os
 import shutil
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.docstore.document import Document
-from tqdm import tqdm
+from chromadb.api.client import SharedSystemClient
 import config
+import knowledge_store
+from document_builder import iter_knowledge_base_documents
+from embedding_cache import create_embeddings
+from embedding_scheduler import EmbeddingScheduler
+from news_compaction import compact_knowledge_base
+from vector_partitions import open_store
 
 # .env dosyasını yükle
 load_dotenv()
@@ -23,7 +25,7 @@ CHROMA_DB_PATH = config.CHROMA_DB_PATH
 def clean_and_rebuild_all():
     """
     Tüm veritabanını temizler ve yeniden inşa eder.
-    1. knowledge_base.csv'deki mükerrer kayıtları siler.
+    1. knowledge_base.csv'deki mükerrer kayıtları siler ve yakın kopya haberleri tek kayda indirir.
     2. Eski chroma_db klasörünü siler.
     3. Temiz CSV'den yeni bir chroma_db oluşturur.
     """
@@ -31,43 +33,51 @@ def clean_and_rebuild_all():
     print("VERİTABANI TEMİZLEME VE YENİDEN OLUŞTURMA SÜRECİ")
     print("="*50)
 
-    # --- 1. ADIM: KNOWLEDGE_BASE.CSV'Yİ TEMİZLE ---
-    print(f"\n--- Adım 1: '{KNOWLEDGE_BASE_CSV}' temizleniyor... ---")
+    # --- 1. ADIM: ANA ARŞİVİ TEMİZLE ---
+    print(f"\n--- Adım 1: Ana arşiv ({config.KNOWLEDGE_BASE_FORMAT}) temizleniyor... ---")
     try:
-        df = pd.read_csv(KNOWLEDGE_BASE_CSV)
-        initial_rows = len(df)
-        print(f"Başlangıçtaki satır sayısı: {initial_rows}")
+        def drop_duplicate_news(df):
+            # --- HATA DÜZELTME ---
+            # 'knowledge_base.csv' dosyasında 'title' sütunu yok, 'headline' var.
+            return df.drop_duplicates(subset=['timestamp', 'headline'], keep='first')
 
-        # --- HATA DÜZELTME ---
-        # 'knowledge_base.csv' dosyasında 'title' sütunu yok, 'headline' var.
-        df.drop_duplicates(subset=['timestamp', 'headline'], keep='first', inplace=True)
-        
-        # Tarihe göre yeniden sırala (isteğe bağlı ama düzenli tutar)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.sort_values(by='timestamp', ascending=False, inplace=True)
-        
-        final_rows = len(df)
+        # Aynı zaman damgasına sahip kayıtlar aynı ay bölümüne düştüğü için temizlik bölüm bölüm yapılır;
+        # sadece mükerrer kayıt bulunan bölümler yeniden yazılır. CSV formatında dosya eskisi gibi sıralanıp yazılır.
+        initial_rows, final_rows = knowledge_store.map_partitions(drop_duplicate_news)
         removed_rows = initial_rows - final_rows
 
-        # Temizlenmiş veriyi aynı dosyanın üzerine yaz
-        df.to_csv(KNOWLEDGE_BASE_CSV, index=False, encoding='utf-8-sig')
-        
+        print(f"Başlangıçtaki satır sayısı: {initial_rows}")
         print(f"Bitişteki satır sayısı: {final_rows}")
-        print(f"✅ {removed_rows} adet mükerrer kayıt silindi. '{KNOWLEDGE_BASE_CSV}' başarıyla temizlendi.")
+        print(f"✅ {removed_rows} adet mükerrer kayıt silindi. Ana arşiv başarıyla temizlendi.")
 
     except FileNotFoundError:
-        print(f"HATA: '{KNOWLEDGE_BASE_CSV}' dosyası bulunamadı. İşlem durduruldu.")
+        print(f"HATA: Ana arşiv ('{KNOWLEDGE_BASE_CSV}') bulunamadı. İşlem durduruldu.")
         return
     except Exception as e:
         print(f"CSV temizlenirken bir hata oluştu: {e}")
         return
 
+    # Farklı kaynaklarda biraz değiştirilerek yeniden yayınlanan aynı hikayeler tek kayda indirilir;
+    # böylece hem embed edilecek döküman sayısı azalır hem de retriever aynı hikayenin kopyalarıyla dolmaz.
+    if config.COMPACTION_ENABLED:
+        print("\n--- Adım 1b: Yakın kopya haberler birleştiriliyor (MinHash/LSH)... ---")
+        try:
+            report = compact_knowledge_base()
+            print(f"✅ {report['removed']} yakın kopya kayıt birleştirildi (sıkıştırma oranı %{report['ratio'] * 100:.1f}).")
+        except Exception as e:
+            print(f"Yakın kopyalar birleştirilirken bir hata oluştu: {e}")
+            return
+
     # --- 2. ADIM: ESKİ CHROMA_DB'Yİ SİL ---
-    print(f"\n--- Adım 2: Eski '{CHROMA_DB_PATH}' klasörü siliniyor... ---")
-    if os.path.exists(CHROMA_DB_PATH):
+    # mmap deposu kullanılıyorsa (config.VECTOR_BACKEND) silinip yeniden oluşturulan odur.
+    store_dir = config.MMAP_STORE_DIR if config.VECTOR_BACKEND == "mmap" else CHROMA_DB_PATH
+    print(f"\n--- Adım 2: Eski '{store_dir}' klasörü siliniyor... ---")
+    if os.path.exists(store_dir):
         try:
-            shutil.rmtree(CHROMA_DB_PATH)
-            print(f"✅ '{CHROMA_DB_PATH}' klasörü başarıyla silindi.")
+            shutil.rmtree(store_dir)
+            # Aynı süreçte açılmış eski Chroma istemcileri silinen klasöre yazmaya çalışmasın.
+            SharedSystemClient.clear_system_cache()
+            print(f"✅ '{store_dir}' klasörü başarıyla silindi.")
         except Exception as e:
             print(f"Klasör silinirken bir hata oluştu: {e}")
             return
@@ -78,35 +88,19 @@ def clean_and_rebuild_all():
     print(f"\n--- Adım 3: Temiz veriden yeni bir vektör veritabanı oluşturuluyor... ---")
     print("Bu işlem veri miktarına göre biraz zaman alabilir.")
     try:
-        # Temizlenmiş CSV'yi yeniden oku
-        df_clean = pd.read_csv(KNOWLEDGE_BASE_CSV)
-        
-        # Verileri LangChain Document formatına çevir
-        documents = [
-            Document(
-                page_content=row['rag_content'],
-                metadata={'source': row.get('source', 'N/A'), 
-                          'title': row.get('headline', 'N/A'), # HATA DÜZELTME: 'title' yerine 'headline' kullanılmalı
-                          'publish_date': row.get('timestamp', 'N/A')}
-            ) 
-            for index, row in tqdm(df_clean.iterrows(), total=df_clean.shape[0], desc="Dökümanlar işleniyor")
-        ]
-
-        # Vektör oluşturucu (embedding model)
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        # Vektör oluşturucu (embedding model). Önbellekli olduğu için, daha önce embed edilmiş
+        # haberler için API'ye tekrar gidilmez; temizlik sonrası yeniden oluşturma neredeyse bedavadır.
+        embeddings = create_embeddings()
         
-        # Sıfırdan veritabanı oluştur
-        db = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=CHROMA_DB_PATH
-        )
-        # --- KOD SAĞLAMLAŞTIRMA ---
-        # Veritabanının diske tam olarak yazıldığından emin olmak için persist() metodunu çağırıyoruz.
-        print("Veritabanı diske kaydediliyor...")
-        db.persist()
+        # Sıfırdan veritabanı oluştur: parçalar paralel ve kota sınırına uyarak embed edilir.
+        # Temizlenmiş arşiv parça parça okunur ve dökümanlar paketler halinde doğrudan zamanlayıcıya akar;
+        # tüm arşiv hiçbir zaman tek bir liste olarak belleğe alınmaz.
+        db = open_store(embeddings, persist_directory=CHROMA_DB_PATH)
+        EmbeddingScheduler(embeddings).embed_and_store_stream(db, iter_knowledge_base_documents())
+        # chromadb>=0.4 verileri otomatik olarak diske yazar, ayrıca persist() çağırmaya gerek yok.
         db = None # Belleği serbest bırak
-        print(f"\n✅ Yeni ve temiz vektör veritabanı '{CHROMA_DB_PATH}' klasöründe başarıyla oluşturuldu!")
+        embeddings.print_stats()
+        print(f"\n✅ Yeni ve temiz vektör veritabanı '{store_dir}' klasöründe başarıyla oluşturuldu!")
 
     except Exception as e:
         print(f"Yeni veritabanı oluşturulurken bir hata oluştu: {e}")
@@ -118,5 +112,4 @@ def clean_and_rebuild_all():
 
 
 if __name__ == '__main__':
-    # Gerekli kütüphaneyi yüklemek için: pip install tqdm
     clean_and_rebuild_all()
\ No newline at end of file
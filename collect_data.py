@@ -1,10 +1,13 @@
 
-import pandas as pd
-from datetime import datetime
-import time
+import csv
+import json
+from datetime import datetime, timedelta, timezone
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import os
 from dotenv import load_dotenv
 import config
+from rate_limiter import TokenBucket
 from alpaca.data.historical import NewsClient
 from alpaca.data.requests import NewsRequest
 
@@ -16,95 +19,237 @@ SECRET_KEY = os.getenv("ALPACA_SECRET_KEY")
 news_client = NewsClient(API_KEY, SECRET_KEY)
 
 CSV_FILENAME = config.RAW_NEWS_CSV
+CHECKPOINT_FILE = config.BACKFILL_CHECKPOINT_FILE
+RAW_COLUMNS = ["id", "timestamp", "headline", "summary", "source", "symbols"]
 # Ayarları artık merkezi config dosyasından alıyoruz. Bu, tutarlılığı sağlar ve hataları önler.
 BASLANGIC_TARIHI = config.ARCHIVE_START_DATE
 SEMBOLLER_LISTESI = config.SYMBOLS_TO_TRACK
 SEMBOLLER_STRING = ",".join(SEMBOLLER_LISTESI)
+# Alpaca haber API'sinin izin verdiği en büyük sayfa boyutu.
+SAYFA_LIMITI = config.ALPACA_NEWS_PAGE_LIMIT
+# Yoğun pencereler bu süreden daha küçük parçalara bölünmez; bu noktadan sonra sayfa sayfa ilerlenir.
+MIN_PENCERE = timedelta(hours=config.BACKFILL_MIN_WINDOW_HOURS)
+MAX_RETRIES = 5
+# Tüm işçilerin paylaştığı hız sınırlayıcı (sabit time.sleep yerine).
+rate_limiter = TokenBucket.per_minute(config.ALPACA_REQUESTS_PER_MINUTE, capacity=config.BACKFILL_MAX_WORKERS)
 # --- AYARLAR SONU ---
 
-def collect_historical_news():
-    print("Alpaca Arşivleme Script'i Başlatıldı...")
-    
-    if os.path.exists(CSV_FILENAME):
+def _haber_to_dict(haber):
+    return {
+        "id": haber.id,
+        "timestamp": haber.created_at,
+        "headline": haber.headline,
+        "summary": haber.summary,
+        "source": haber.source,
+        "symbols": haber.symbols
+    }
+
+def _get_news_page(start, end, page_token=None):
+    """Tek bir haber sayfasını, ortak hız sınırlayıcıya uyarak ve 429 hatalarında tekrar deneyerek çeker."""
+    for attempt in range(MAX_RETRIES + 1):
+        rate_limiter.acquire()
         try:
-            df_existing = pd.read_csv(CSV_FILENAME)
-            cekilen_haber_idleri = set(df_existing['id']) if 'id' in df_existing.columns else set()
-            print(f"Mevcut arşivde {len(df_existing)} haber bulundu.")
-        except pd.errors.EmptyDataError:
-            df_existing = pd.DataFrame()
-            cekilen_haber_idleri = set()
-            print("Mevcut arşiv dosyası boş.")
-    else:
-        df_existing = pd.DataFrame()
-        cekilen_haber_idleri = set()
-
-    tarih_araligi = pd.date_range(start=BASLANGIC_TARIHI, end=datetime.now(), freq='D')
-    all_news_data = []
-
-    print(f"{len(tarih_araligi)} gün için veri taranacak. Bu işlem uzun sürebilir...")
-
-    for gun in reversed(tarih_araligi):
-        print(f"\nİşlenen Tarih: {gun.date()}")
-        page_token = None
-
-        while True:
+            request_params = NewsRequest(
+                symbols=SEMBOLLER_STRING,
+                start=start,
+                end=end,
+                limit=SAYFA_LIMITI,
+                page_token=page_token
+            )
+            return news_client.get_news(request_params)
+        except Exception as e:
+            if "429" not in str(e) or attempt == MAX_RETRIES:
+                raise
+            bekleme = 2 ** attempt
+            print(f"  -> Alpaca hız sınırına takıldı, {bekleme} sn bekleniyor...")
+            rate_limiter.penalize(bekleme)
+
+def fetch_window(start, end):
+    """
+    Bir tarih penceresini çeker. İlk sayfa pencerenin tamamını kapsıyorsa (sakin günler) tek istekle biter.
+    Pencere yoğunsa ve hâlâ bölünebilecek kadar genişse ikiye bölünür; alt pencereler diğer işçilere dağıtılır.
+    En küçük pencereye inildiğinde sayfa sayfa ilerlenir.
+    Dönüş: (haber sözlükleri listesi, işlenmesi gereken yeni pencereler listesi)
+    """
+    # --- KRİTİK DÜZELTME: DOĞRU VERİ ERİŞİM YOLU ---
+    # alpaca-py kütüphanesi haber listesini doğrudan .news özelliği altında döndürür.
+    news_page = _get_news_page(start, end)
+    haberler = [_haber_to_dict(h) for h in news_page.news] if news_page and news_page.news else []
+
+    if not (news_page and news_page.next_page_token):
+        return haberler, []
+
+    if end - start > MIN_PENCERE:
+        # İlk sayfadaki haberleri de tutuyoruz; alt pencerelerde tekrar gelenler ID ile elenir.
+        orta = start + (end - start) / 2
+        return haberler, [(orta, end), (start, orta)]
+
+    page_token = news_page.next_page_token
+    while page_token:
+        news_page = _get_news_page(start, end, page_token)
+        if news_page and news_page.news:
+            haberler.extend(_haber_to_dict(h) for h in news_page.news)
+        page_token = news_page.next_page_token if news_page else None
+    return haberler, []
+
+# --- KONTROL NOKTASI (CHECKPOINT) YARDIMCILARI ---
+def load_checkpoint():
+    """Daha önce tamamlanmış pencereleri okur ve birleştirilmiş [(başlangıç, bitiş)] listesi döndürür."""
+    if not os.path.exists(CHECKPOINT_FILE):
+        return []
+    araliklar = []
+    with open(CHECKPOINT_FILE, encoding='utf-8') as f:
+        for satir in f:
             try:
-                request_params = NewsRequest(
-                    symbols=SEMBOLLER_STRING,
-                    start=gun.strftime("%Y-%m-%d"),
-                    end=(gun + pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
-                    limit=50,
-                    page_token=page_token
-                )
-
-                news_page = news_client.get_news(request_params)
-                
-                # --- KRİTİK DÜZELTME: DOĞRU VERİ ERİŞİM YOLU ---
-                # alpaca-py kütüphanesi haber listesini doğrudan .news özelliği altında döndürür.
-                if news_page and news_page.news:
-                    haber_listesi = news_page.news
-                    found_in_page = 0
-                    for haber in haber_listesi:
-                        if haber.id not in cekilen_haber_idleri:
-                            all_news_data.append({
-                                "id": haber.id,
-                                "timestamp": haber.created_at,
-                                "headline": haber.headline,
-                                "summary": haber.summary,
-                                "source": haber.source,
-                                "symbols": haber.symbols
-                            })
-                            cekilen_haber_idleri.add(haber.id)
-                            found_in_page += 1
-                    
-                    if found_in_page > 0:
-                        print(f"  -> Sayfadan {found_in_page} yeni haber bulundu.")
-
-                if news_page and news_page.next_page_token:
-                    page_token = news_page.next_page_token
-                    time.sleep(1) # Alpaca API limitlerine takılmamak için kısa bir bekleme
-                else:
-                    break
-            
-            except Exception as e:
-                print(f"  -> HATA: {gun.date()} tarihinde veri çekilirken bir sorun oluştu: {e}")
-                break
-
-    if not all_news_data:
-        print("\nArşive eklenecek yeni haber bulunamadı.")
+                kayit = json.loads(satir)
+                araliklar.append((datetime.fromisoformat(kayit["start"]), datetime.fromisoformat(kayit["end"])))
+            except (ValueError, KeyError):
+                # Çökme anında yarım yazılmış son satır olabilir; atlanır.
+                continue
+    return merge_intervals(araliklar)
+
+def merge_intervals(araliklar):
+    """Çakışan veya bitişik aralikları birleştirir. Checkpoint'in boyutu böylece küçük kalır."""
+    birlesik = []
+    for bas, son in sorted(araliklar):
+        if birlesik and bas <= birlesik[-1][1]:
+            birlesik[-1] = (birlesik[-1][0], max(birlesik[-1][1], son))
+        else:
+            birlesik.append((bas, son))
+    return birlesik
+
+def remaining_intervals(baslangic, bitis, tamamlananlar):
+    """[baslangic, bitis) aralığından tamamlanmış pencereler çıkarıldığında kalan boşlukları döndürür."""
+    kalan = []
+    imlec = baslangic
+    for bas, son in tamamlananlar:
+        if son <= imlec or bas >= bitis:
+            continue
+        if bas > imlec:
+            kalan.append((imlec, bas))
+        imlec = max(imlec, son)
+    if imlec < bitis:
+        kalan.append((imlec, bitis))
+    return kalan
+
+def compact_checkpoint(tamamlananlar):
+    """Checkpoint dosyasını birleştirilmiş araliklarla atomik olarak yeniden yazar."""
+    gecici = CHECKPOINT_FILE + ".tmp"
+    with open(gecici, 'w', encoding='utf-8') as f:
+        for bas, son in merge_intervals(tamamlananlar):
+            f.write(json.dumps({"start": bas.isoformat(), "end": son.isoformat()}) + "\n")
+    os.replace(gecici, CHECKPOINT_FILE)
+
+def collect_historical_news(max_workers=None, reset_checkpoint=False, on_news=None):
+    """
+    ARCHIVE_START_DATE'ten bugüne kadar olan haberleri paralel olarak çeker.
+    Tarih aralığı pencerelere bölünür ve bir işçi havuzu farklı pencereleri aynı anda çeker;
+    tüm işçiler Alpaca kotasına göre ayarlanmış tek bir token bucket'ı paylaşır.
+
+    Her tamamlanan pencerenin haberleri hemen RAW_NEWS_CSV'nin sonuna eklenir ve pencere
+    checkpoint dosyasına yazılır. Script yarıda kesilirse bir sonraki çalıştırma sadece
+    tamamlanmamış pencereleri çeker. Bellekte sadece işlenmekte olan pencerelerin haberleri tutulur.
+    Dosyadaki olası mükerrer kayıtlar (pencere sınırları, yarım kalan pencereler) update_database'de ID ile elenir.
+    `on_news` verilirse her pencerenin yeni haberleri diske yazıldıktan sonra bu fonksiyona liste olarak verilir
+    (update_pipeline bu sayede haberleri toplama bitmeden işlemeye başlar).
+    """
+    print("Alpaca Arşivleme Script'i Başlatıldı...")
+    max_workers = max_workers or config.BACKFILL_MAX_WORKERS
+
+    if reset_checkpoint and os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+    tamamlananlar = load_checkpoint()
+    # Checkpoint dosyası zamanla çok sayıda küçük pencere biriktirir; başlarken sıkıştırıyoruz.
+    if tamamlananlar:
+        compact_checkpoint(tamamlananlar)
+
+    baslangic = datetime.fromisoformat(BASLANGIC_TARIHI).replace(tzinfo=timezone.utc)
+    bitis = datetime.now(timezone.utc)
+    # Başlangıç pencereleri: checkpoint'te olmayan boşluklar, en yeniden en eskiye doğru,
+    # en fazla BACKFILL_WINDOW_DAYS günlük dilimler halinde.
+    pencereler = []
+    for bosluk_basi, bosluk_sonu in reversed(remaining_intervals(baslangic, bitis, tamamlananlar)):
+        pencere_sonu = bosluk_sonu
+        while pencere_sonu > bosluk_basi:
+            pencere_basi = max(bosluk_basi, pencere_sonu - timedelta(days=config.BACKFILL_WINDOW_DAYS))
+            pencereler.append((pencere_basi, pencere_sonu))
+            pencere_sonu = pencere_basi
+
+    if not pencereler:
+        print("Tüm tarih aralığı daha önce çekilmiş. Yeni pencere yok.")
         return
+    if tamamlananlar:
+        print(f"Checkpoint bulundu: {len(tamamlananlar)} tamamlanmış aralık atlanacak.")
+    print(f"{len(pencereler)} pencere {max_workers} işçiyle taranacak...")
+
+    # Mükerrer kontrolü her kök pencere için ayrı tutulur ve pencere bitince silinir;
+    # bir pencere ile alt pencereleri aynı haberleri döndürebilir, farklı kök pencereler döndürmez.
+    kok_idleri = {}
+    kok_bekleyen = {}
+    bekleyen = deque((pencere, pencere) for pencere in pencereler)
+    calisan = {}
+    tamamlanan_pencere = 0
+    toplam_yeni = 0
+
+    yeni_dosya = not os.path.exists(CSV_FILENAME) or os.path.getsize(CSV_FILENAME) == 0
+    with open(CSV_FILENAME, 'a', newline='', encoding='utf-8-sig') as csv_file, \
+            open(CHECKPOINT_FILE, 'a', encoding='utf-8') as checkpoint_file, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        writer = csv.DictWriter(csv_file, fieldnames=RAW_COLUMNS)
+        if yeni_dosya:
+            writer.writeheader()
+
+        while bekleyen or calisan:
+            while bekleyen and len(calisan) < max_workers * 2:
+                pencere, kok = bekleyen.popleft()
+                kok_idleri.setdefault(kok, set())
+                kok_bekleyen.setdefault(kok, 1)
+                calisan[executor.submit(fetch_window, *pencere)] = (pencere, kok)
+            bitenler, _ = wait(calisan, return_when=FIRST_COMPLETED)
+            for future in bitenler:
+                (pencere_basi, pencere_sonu), kok = calisan.pop(future)
+                try:
+                    haberler, alt_pencereler = future.result()
+                except Exception as e:
+                    print(f"  -> HATA: {pencere_basi:%Y-%m-%d %H:%M} - {pencere_sonu:%Y-%m-%d %H:%M} aralığında veri çekilirken bir sorun oluştu: {e}")
+                    haberler, alt_pencereler = [], None
 
-    print(f"\nToplam {len(all_news_data)} yeni haber toplandı.")
-
-    df_new = pd.DataFrame(all_news_data)
-    df_combined = pd.concat([df_existing, df_new]).drop_duplicates(subset=['id'], ignore_index=True)
-    
-    df_combined['timestamp'] = pd.to_datetime(df_combined['timestamp'])
-    df_combined.sort_values(by='timestamp', ascending=False, inplace=True)
-    
-    df_combined.to_csv(CSV_FILENAME, index=False, encoding='utf-8-sig')
-    print(f"\nİşlem tamamlandı. Arşivdeki toplam haber sayısı: {len(df_combined)}")
-    print(f"Veriler '{CSV_FILENAME}' dosyasına kaydedildi.")
+                yeni_haberler = []
+                gorulenler = kok_idleri[kok]
+                for haber in haberler:
+                    if haber["id"] not in gorulenler:
+                        writer.writerow(haber)
+                        gorulenler.add(haber["id"])
+                        yeni_haberler.append(haber)
+                found_in_window = len(yeni_haberler)
+                # Önce veri diske yazılır, sonra checkpoint; çökme olursa en kötü ihtimalle mükerrer kayıt oluşur, kayıp olmaz.
+                csv_file.flush()
+                if on_news is not None and yeni_haberler:
+                    on_news(yeni_haberler)
+
+                if alt_pencereler == []:
+                    checkpoint_file.write(json.dumps({"start": pencere_basi.isoformat(), "end": pencere_sonu.isoformat()}) + "\n")
+                    checkpoint_file.flush()
+                    tamamlanan_pencere += 1
+                elif alt_pencereler:
+                    # Bölünen pencerelerin yarıları sıranın önüne alınır; böylece tarama kabaca yeniden eskiye ilerler.
+                    bekleyen.extendleft((alt, kok) for alt in reversed(alt_pencereler))
+                    kok_bekleyen[kok] += len(alt_pencereler)
+
+                kok_bekleyen[kok] -= 1
+                if kok_bekleyen[kok] == 0:
+                    del kok_bekleyen[kok], kok_idleri[kok]
+
+                toplam_yeni += found_in_window
+                if found_in_window > 0:
+                    print(f"  -> {pencere_basi:%Y-%m-%d %H:%M} - {pencere_sonu:%Y-%m-%d %H:%M}: {found_in_window} yeni haber bulundu.")
+
+    print(f"\n{tamamlanan_pencere} pencere tamamlandı.")
+    if toplam_yeni == 0:
+        print("\nArşive eklenecek yeni haber bulunamadı.")
+        return
+    print(f"\nİşlem tamamlandı. Toplam {toplam_yeni} yeni haber toplandı.")
+    print(f"Veriler '{CSV_FILENAME}' dosyasına eklendi.")
 
 if __name__ == '__main__':
     collect_historical_news()
\ No newline at end of file
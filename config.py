@@ -13,16 +13,33 @@ if not os.path.exists(DATA_DIR):
 # --- VERİ TOPLAMA AYARLARI ---
 # Sunucuda ilk veritabanı oluşturulurken, geçmiş haberleri çekmeye bu tarihten başla.
 ARCHIVE_START_DATE = "2020-01-01" 
+# Alpaca haber API'sinin izin verdiği en büyük sayfa boyutu.
+ALPACA_NEWS_PAGE_LIMIT = 50
+# Alpaca veri API'si kotası (ücretsiz plan: dakikada 200 istek).
+ALPACA_REQUESTS_PER_MINUTE = 200
+# Geçmiş veri çekerken aynı anda çalışan işçi sayısı.
+BACKFILL_MAX_WORKERS = 4
+# Tarama bu genişlikteki pencerelerle başlar; sakin günler tek istekte biter.
+BACKFILL_WINDOW_DAYS = 7
+# Yoğun pencereler en fazla bu genişliğe (saat) kadar bölünür.
+BACKFILL_MIN_WINDOW_HOURS = 3
 
 
 # --- DOSYA YOLLARI ---
 # Tüm dosya yollarını, yukarıdaki DATA_DIR'a göre otomatik olarak ayarlıyoruz.
 KNOWLEDGE_BASE_CSV = os.path.join(DATA_DIR, "knowledge_base.csv")
+# Ana arşivin aylık bölümlere ayrılmış Parquet deposu (KNOWLEDGE_BASE_FORMAT = "parquet" iken kullanılır)
+KNOWLEDGE_BASE_DIR = os.path.join(DATA_DIR, "knowledge_base")
+# Ana arşivin saklama formatı: "csv" (tek dosya) veya "parquet" (aylık bölümler).
+# Parquet'e geçmeden önce bir kez `python knowledge_store.py migrate` çalıştırılmalı.
+KNOWLEDGE_BASE_FORMAT = "csv"
 CHROMA_DB_PATH = os.path.join(DATA_DIR, "chroma_db")
 # Canlı akıştan gelen haberlerin geçici olarak biriktirileceği dosya
 LIVE_BUFFER_CSV = os.path.join(DATA_DIR, "live_buffer.csv")
 # Geçmiş verileri çekerken kullanılacak geçici dosya
 RAW_NEWS_CSV = os.path.join(DATA_DIR, "temp_raw_news.csv")
+# Geçmiş veri çekiminde tamamlanan tarih pencerelerinin kaydı (yarıda kalan çekim buradan devam eder)
+BACKFILL_CHECKPOINT_FILE = os.path.join(DATA_DIR, "backfill_checkpoint.jsonl")
 
 
 LLM_MODEL = "models/gemini-2.5-flash"
@@ -38,20 +55,251 @@ SYMBOLS_TO_TRACK = [
     'SPY', 'QQQ'
 ]
 
+# --- CANLI ANALİZ AYARLARI ---
+# Canlı akıştan gelen haberleri aynı anda analiz eden işçi sayısı.
+ANALYSIS_WORKERS = 4
+# Analiz bekleyen en fazla haber sayısı. Kuyruk dolunca akış işleyicisi yer açılmasını bekler.
+ANALYSIS_QUEUE_MAXSIZE = 200
+# Canlı haberler bu kadar birikince ya da ilk haberin üzerinden bu kadar saniye geçince toplu yazılır.
+WRITE_BEHIND_MAX_ITEMS = 25
+WRITE_BEHIND_MAX_SECONDS = 10
+
+# --- ÇOK SÜREÇLİ (SHARD) MOD AYARLARI ---
+# `python sharded_main.py` ile: tek akış okuyucu süreç haberleri varlığa göre bu kadar analiz sürecine dağıtır,
+# vektör veritabanına tek bir yazıcı süreç yazar. Aynı varlığın haberleri sırayla işlenir.
+# Çok süreçli mod ya bir Chroma sunucusu (CHROMA_SERVER_HOST) ya da mmap deposu (VECTOR_BACKEND = "mmap") ister;
+# yerel Chroma klasörü bir süreç yazarken başka süreçlerden okunamaz, bu durumda sharded_main hemen durur.
+# None ise CPU çekirdeği sayısı kadar analiz süreci açılır.
+SHARD_PROCESSES = None
+# Her analiz sürecinin giriş kuyruğu kapasitesi. Kuyruk dolunca akış okuyucu yer açılmasını bekler.
+SHARD_QUEUE_MAXSIZE = 200
+# Yazıcı süreç, analiz süreçleri sıcak indekslerini yükleyene kadar (en fazla bu kadar saniye) veritabanına yazmaz.
+# benchmark.py'nin çok süreçli replay'i de ölçüme başlamadan en fazla bu kadar bekler.
+SHARD_INDEX_LOAD_TIMEOUT_SECONDS = 300
+# Dolu ise canlı sistem vektör veritabanına bu Chroma sunucusu üzerinden erişir
+# (ör. `chroma run --path data/chroma_db --port 8000`); tüm süreçler aynı güncel koleksiyonu görür.
+# None ise tek süreçli mod yerel disk klasörünü kullanır; çok süreçli mod ise mmap deposu olmadan başlamaz
+# (mmap deposunda analiz süreçleri açılıştaki görüntüyü okur, yeni haberler onlara yazıcı sürecin gönderdiği
+# sıcak indeks güncellemeleriyle ulaşır).
+CHROMA_SERVER_HOST = None
+CHROMA_SERVER_PORT = 8000
+
+# --- ANALİZ ÖNBELLEĞİ (YAKIN KOPYA HABERLER) ---
+# Bir analiz sonucu bu kadar saniye boyunca aynı hikayenin kopyaları için yeniden kullanılır.
+ANALYSIS_CACHE_TTL_SECONDS = 1800
+ANALYSIS_CACHE_MAX_ENTRIES = 2000
+# İki başlık, tahmini Jaccard benzerliği (MinHash) bu eşiği geçerse aynı hikaye sayılır.
+# Eşik yüksek tutulur: "Fed cuts rates" / "Fed hikes rates" gibi zıt başlıklar ~0.6 benzerlik verir.
+ANALYSIS_CACHE_SIMILARITY = 0.75
+# MinHash imzasındaki permütasyon sayısı.
+MINHASH_NUM_PERM = 128
+# True ise alarm üretmiş bir hikayenin kopyaları için alarm tekrar gönderilir.
+ANALYSIS_CACHE_REALERT = False
+# MinHash eşleşmesi bulunamazsa, haberin embedding'i ile kosinüs benzerliği bu eşiği geçen kayıtlar da kopya sayılır.
+ANALYSIS_CACHE_EMBEDDING_SIMILARITY = 0.97
+
+# --- SICAK (BELLEK İÇİ) İNDEKS AYARLARI ---
+# Canlı analizde son HOT_INDEX_DAYS günün vektörleri bellekte tutulur ve önce orada aranır.
+HOT_INDEX_ENABLED = True
+HOT_INDEX_DAYS = 30
+# Yakınlık puanının yarılanma süresi (saat) ve skordaki ağırlığı (0 = sadece benzerlik).
+HOT_INDEX_HALF_LIFE_HOURS = 72
+HOT_INDEX_RECENCY_WEIGHT = 0.15
+# Bu kosinüs benzerliğinin altındaki sıcak indeks sonuçları sayılmaz; eksik kalanlar tüm koleksiyondan tamamlanır.
+HOT_INDEX_MIN_SIMILARITY = 0.65
+# Retriever'ın analiz için döndürdüğü döküman sayısı.
+RETRIEVER_K = 10
+
+# --- VEKTÖR VERİTABANI BÖLÜMLEME AYARLARI ---
+# Vektörler yayın dönemine göre ayrı Chroma koleksiyonlarına yazılır: "month" (news_2024-05), "quarter"
+# (news_2024-Q2) veya "year" (news_2024). None ise tek koleksiyon kullanılır. Bölümlemeden önce oluşturulmuş
+# veritabanı `python vector_partitions.py migrate` ile taşınana kadar eskisi gibi tek koleksiyonla çalışır.
+VECTOR_PARTITIONING = "month"
+# Zaman filtresiz (canlı) aramalar sadece en yeni bu kadar döneme (sıcak katman) gönderilir.
+VECTOR_HOT_PARTITIONS = 3
+# True ise sıcak katman RETRIEVER_K'dan az sonuç verdiğinde eski (soğuk) bölümler de yeniden eskiye aranır.
+VECTOR_WIDEN_TO_COLD = False
+# Bir sorgunun gönderildiği bölümler bu kadar iş parçacığıyla paralel aranır.
+VECTOR_FANOUT_WORKERS = 4
+# Saklama politikası: en yeni bu kadar dönem dışındaki bölümler float16 sıkıştırılmış dosyalara arşivlenip
+# veritabanından çıkarılır (`python vector_partitions.py retention`). None ise tüm bölümler tutulur.
+VECTOR_RETENTION_PARTITIONS = None
+VECTOR_ARCHIVE_DIR = os.path.join(DATA_DIR, "vector_archive")
+
+# --- KOMPAKT (MMAP) VEKTÖR DEPOSU AYARLARI ---
+# "chroma" (varsayılan) veya "mmap". mmap deposu vektörleri kuantize edip diskte düz bir dizide tutar ve bellek
+# eşlemeli açar; metinler ve metadata yan SQLite tablosundadır. Küçük sunucularda bellek ve diski azaltır.
+# Mevcut Chroma vektörlerini yeniden embed etmeden aktarmak: `python mmap_store.py import`,
+# Chroma'ya karşı recall raporu: `python mmap_store.py report`.
+VECTOR_BACKEND = "chroma"
+MMAP_STORE_DIR = os.path.join(DATA_DIR, "vector_mmap")
+# "float16" (boyut başına 2 bayt) veya "int8" (1 bayt + satır başına ölçek). Depo ilk yazmada bu tiple sabitlenir.
+MMAP_STORE_DTYPE = "float16"
+
+# --- ÖN FİLTRE (TRİAJ) AYARLARI ---
+# Anahtar kelimeler başlıktaki kelimelerle birebir eşleşir; "*" ile biten anahtarlar kelime kökü gibi davranır
+# ("plung*" -> plunge, plunges, plunged, plunging). Boşluk içeren anahtarlar başlıkta alt metin olarak aranır.
+# Takip edilen sembolü olmayan haberler ancak bu makro/jeopolitik anahtar kelimelerden birini içeriyorsa
+# değerlendirilir. Buradaki her anahtarın TRIAGE_KEYWORD_WEIGHTS içinde de pozitif ağırlığı olmalıdır
+# (`python news_filter.py` kontrol eder).
+TRIAGE_MACRO_KEYWORDS = [
+    "cpi", "ppi", "inflation", "fomc", "fed", "federal reserve", "powell", "rate cut", "rate hike",
+    "interest rate", "nonfarm", "payroll*", "jobs report", "unemployment", "gdp", "recession*",
+    "treasur*", "yield*", "tariff*", "war", "wars", "sanction*", "missile*", "invasion", "invad*", "attack*",
+    "strike*", "struck", "airstrike*", "nuclear", "ceasefire", "sec", "etf*",
+]
+# Başlıktaki anahtar kelimelerin triaj puanına katkısı. Negatif ağırlıklar alarm üretmesi
+# beklenmeyen gürültü haberlerini (fiyat tahmini, piyasa özeti vb.) aşağı çeker.
+TRIAGE_KEYWORD_WEIGHTS = {
+    # Makro veri ve para politikası
+    "cpi": 3, "ppi": 2, "inflation": 2, "fomc": 3, "fed": 2, "federal reserve": 3, "powell": 2,
+    "rate cut": 3, "rate hike": 3, "interest rate": 2, "nonfarm": 3, "payroll*": 3, "jobs report": 3,
+    "unemployment": 2, "gdp": 2, "recession*": 2, "treasur*": 1, "yield*": 1, "tariff*": 2,
+    # Jeopolitik risk
+    "war": 3, "wars": 3, "sanction*": 2, "missile*": 3, "invasion": 3, "invad*": 3, "attack*": 2,
+    "strike*": 2, "struck": 2, "airstrike*": 3, "nuclear": 2, "ceasefire": 2,
+    # Katalizör olaylar
+    "etf*": 3, "sec": 2, "approv*": 2, "reject*": 2, "lawsuit*": 2, "hack*": 3, "exploit*": 3,
+    "bankrupt*": 3, "acqui*": 2, "listing*": 1, "delist*": 2, "halving": 2, "mainnet": 2, "upgrade*": 1,
+    "ban": 2, "bans": 2, "banned": 2, "regulat*": 2, "blackrock": 2, "microstrategy": 1, "reserve": 1,
+    "trump": 1,
+    # Fiyat hareketi ve piyasa stresi: takip edilen varlık bonusuyla birlikte tek başına eşiği geçer.
+    # Düzensiz geçmiş zaman çekimleri (fell, sank) kökle yakalanmadığı için ayrıca yazılır.
+    "plung*": 2, "crash*": 2, "tumbl*": 2, "slump*": 2, "sell-off*": 2, "selloff*": 2, "surg*": 2,
+    "soar*": 2, "rall*": 2, "spik*": 2, "skyrocket*": 2, "jump*": 2, "fall*": 2, "fell": 2, "drop*": 2,
+    "sink*": 2, "sank": 2, "sunk": 2, "slid*": 2, "dump*": 2, "liquidat*": 2, "collaps*": 3, "insolven*": 3,
+    "depeg*": 3, "all-time high": 3, "all time high": 3, "record high": 3, "outflow*": 1, "inflow*": 1,
+    # Gürültü
+    "price prediction": -3, "price analysis": -2, "top gainers": -3, "top losers": -3, "how to": -3,
+    "what is": -2, "technical analysis": -2, "could": -1, "might": -1, "why": -1, "week ahead": -2,
+}
+# Kaynak ağırlıkları (kaynak adı küçük harfle eşleştirilir).
+TRIAGE_SOURCE_WEIGHTS = {"benzinga": 0}
+# Takip edilen bir varlıkla ilgili haberlere eklenen puan.
+TRIAGE_ASSET_BONUS = 1
+# Takip edilen varlıkla ilgili başlık yüzde ya da dolar tutarı içeriyorsa ("falls 8%", "below $50,000")
+# eklenen puan; varlık bonusuyla birlikte eşiği geçer, gürültü kelimeleri yine aşağı çekebilir.
+TRIAGE_NUMERIC_MOVE_BONUS = 2
+# Bu puanın altında kalan haberler LLM'e gönderilmez.
+TRIAGE_MIN_SCORE = 2
+# Ön filtre istatistikleri her bu kadar haberde bir yazdırılır.
+FILTER_STATS_EVERY = 50
+
+# --- FİYAT SERVİSİ AYARLARI ---
+# Binance'te olmayan, fiyatı Alpaca'dan alınan varlıklar.
+PRICE_EQUITY_ASSETS = ['SPY', 'QQQ']
+# Kripto varlıkların Binance'te eşleştirildiği para birimi (BTC -> BTCUSDT).
+PRICE_QUOTE_CURRENCY = "USDT"
+# Fiyatların arka planda güncellenme aralığı (saniye).
+PRICE_POLL_SECONDS = 5
+# Bu süreden eski fiyatlar bayat sayılır ve alarmlarda gösterilmez.
+PRICE_STALE_SECONDS = 60
+
+# --- ÇEVİRİ AYARLARI ---
+# Çevrilen başlıklar (normalleştirilmiş İngilizce metin anahtarıyla) burada kalıcı olarak saklanır.
+TRANSLATION_CACHE_PATH = os.path.join(DATA_DIR, "translation_cache.sqlite")
+# Bellekte tutulan en fazla çeviri sayısı.
+TRANSLATION_LRU_SIZE = 2000
+# Aynı anda gelen alarm başlıkları bu kadar saniye biriktirilip tek istekte çevrilir.
+TRANSLATION_BATCH_WINDOW_SECONDS = 0.2
+# True ise alarm önce İngilizce başlıkla hemen gönderilir, Türkçe çeviri ayrı bir mesajla arkadan gelir.
+TRANSLATION_OFF_CRITICAL_PATH = False
+
+# --- TELEGRAM TESLİMAT AYARLARI ---
+TELEGRAM_API_BASE = "https://api.telegram.org"
+# Telegram'ın yayımladığı sınırlar: bot başına saniyede ~30 mesaj, aynı chat'e saniyede ~1 mesaj.
+TELEGRAM_GLOBAL_PER_SECOND = 30
+TELEGRAM_PER_CHAT_PER_SECOND = 1
+# Farklı chat'lere aynı anda uçuşta olabilecek en fazla istek ve havuzdaki bağlantı sayısı.
+# (Her chat'in kendi kuyruğu ve tek işçisi vardır; aynı chat'e mesajlar sırayla gider.)
+TELEGRAM_SENDER_WORKERS = 4
+TELEGRAM_POOL_SIZE = 8
+# Chat başına giden kuyruğun en fazla mesaj sayısı.
+TELEGRAM_QUEUE_MAXSIZE = 500
+TELEGRAM_MAX_RETRIES = 5
+TELEGRAM_REQUEST_TIMEOUT = 10
+# Kapanışta kuyrukta kalan mesajlar en fazla bu kadar saniye boyunca senkron gönderilmeye çalışılır.
+TELEGRAM_SHUTDOWN_TIMEOUT_SECONDS = 30
+
+# --- METRİK VE PROFİL AYARLARI ---
+# Aşama süreleri, sayaçlar ve önbellek isabet oranları bu adreste Prometheus formatında yayınlanır (/metrics).
+# METRICS_PORT = None yapılırsa HTTP uç noktası açılmaz.
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+# Aşama süresi histogramlarının üst sınırları (saniye).
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Dolu ise her analiz edilen haber için (aşama süreleriyle) ve periyodik olarak tüm metrikler için
+# JSON satırları bu dosyaya yazılır ("-" standart çıktı demektir). None ise JSON log kapalıdır.
+METRICS_JSON_LOG_PATH = None
+METRICS_JSON_SNAPSHOT_SECONDS = 60
+# İsteğe bağlı örnekleyici profiler (/profile/start, /profile/stop): yığınlar bu aralıkla örneklenir.
+PROFILER_SAMPLE_INTERVAL_SECONDS = 0.005
+# Unutulan bir profil oturumu bu süre sonunda kendiliğinden durur.
+PROFILER_MAX_SECONDS = 300
+
 # --- ALARM AYARLARI ---
 CONFIDENCE_THRESHOLD = 7
 IMPACT_THRESHOLD = 7
+# LLM cevabı parça parça (streaming) okunur; Direction/Impact/Confidence göründükleri anda değerlendirilir.
+LLM_STREAMING = True
+# Skorlar alarm kriterlerinin karşılanamayacağını gösterdiği anda üretim durdurulur (süre ve çıktı token'ı tasarrufu).
+LLM_EARLY_STOP = True
+# Skorlar alarm kriterlerini karşıladığı anda alarm, analiz cümlesi beklenmeden gönderilir; yorum ayrı mesajla gelir.
+LLM_EARLY_ALARM = True
 
 # --- MODEL AYARLARI ---
 EMBEDDING_MODEL = "models/embedding-001"
 
+# --- EMBEDDING ÖNBELLEĞİ ---
+# Daha önce hesaplanmış vektörler (model, metin özeti) anahtarıyla burada saklanır.
+EMBEDDING_CACHE_PATH = os.path.join(DATA_DIR, "embedding_cache.sqlite")
+# Önbellekte tutulacak en fazla vektör sayısı. Aşılınca en eski kullanılanlar silinir.
+EMBEDDING_CACHE_MAX_ENTRIES = 300000
+
+# --- EMBEDDING ZAMANLAYICI AYARLARI ---
+# Tek bir embed isteğine giden metin sayısı (Gemini bir istekte en fazla 100 metin kabul eder).
+EMBEDDING_BATCH_SIZE = 100
+# Aynı anda embed edilen parça (batch) sayısı.
+EMBEDDING_MAX_CONCURRENCY = 4
+# Gemini embedding kotası (dakikadaki istek sayısı). Kotamıza göre ayarlanmalı.
+EMBEDDING_REQUESTS_PER_MINUTE = 150
+# Kota hatası (429) alan bir parçanın en fazla kaç kez tekrar deneneceği.
+EMBEDDING_MAX_RETRIES = 6
+# Embed edilen vektörler Chroma'ya bu büyüklükteki bloklar halinde yazılır.
+CHROMA_WRITE_BATCH_SIZE = 1000
+# Yeniden oluşturma sırasında arşiv bu kadar satırlık parçalar halinde okunur.
+KNOWLEDGE_BASE_CHUNK_SIZE = 20000
+# Döküman üretici bu büyüklükteki paketleri embed zamanlayıcısına verir.
+DOCUMENT_BATCH_SIZE = 2000
+
+# --- YAKIN KOPYA SIKIŞTIRMA AYARLARI (clean_and_rebuild) ---
+# Farklı kaynaklarda başlığı/özeti biraz değiştirilerek yeniden yayınlanan haberler tek kayda indirilir.
+COMPACTION_ENABLED = True
+# Başlık + özet shingle kümelerinin tahmini Jaccard benzerliği bu eşiği geçen haberler aynı hikaye sayılır.
+COMPACTION_SIMILARITY = 0.8
+COMPACTION_NUM_PERM = 64
+# Sadece bu kadar saat arayla yayınlanmış kopyalar birleştirilir (düzenli tekrar eden şablon başlıklar ayrı kalır).
+COMPACTION_WINDOW_HOURS = 72
+# Aynı LSH kovasındaki her haber, zaman sırasına göre kendinden sonraki en fazla bu kadar haberle karşılaştırılır.
+COMPACTION_MAX_NEIGHBORS = 16
+
+# --- GÜNCELLEME HATTI (PIPELINE) AYARLARI ---
+# True ise run_update.py toplama -> temizleme -> embed + yazma aşamalarını eşzamanlı çalıştırır;
+# çekilen sayfalar ham CSV'nin tamamı yazılmasını beklemeden embed edilir. False ise aşamalar sırayla çalışır.
+UPDATE_PIPELINE_ENABLED = True
+# Aşamalar arasındaki kuyrukların kapasitesi (parça sayısı). Kuyruk dolunca önceki aşama bekler.
+UPDATE_PIPELINE_QUEUE_SIZE = 8
+# Temizleme aşaması kuyrukta biriken parçaları en fazla bu kadar habere kadar birleştirip tek seferde işler.
+UPDATE_PIPELINE_CLEAN_BATCH = 2000
+
 # --- API ANAHTARLARI İSİMLERİ ---
 # .env dosyasındaki anahtar isimleri
 GEMINI_API_KEY_ENV = "GEMINI_API_KEY"
 ALPACA_API_KEY_ENV = "ALPACA_API_KEY"
 ALPACA_SECRET_KEY_ENV = "ALPACA_SECRET_KEY"
 TELEGRAM_BOT_TOKEN_ENV = "TELEGRAM_BOT_TOKEN"
-TELEGRAM_CHAT_ID_ENV = "TELEGRAM_CHAT_ID"
+TELEGRAM_CHAT_ID_ENV = "TELEGRAM_CHAT_ID"  # Birden fazla chat için virgülle ayrılmış liste
+TELEGRAM_API_BASE_ENV = "TELEGRAM_API_BASE"  # Yerel taklit sunucu ile test için (ör. http://127.0.0.1:8081)
 
 SYSTEM_PROMPT = """
 You are an elite quantitative financial analyst. Your primary goal is to analyze the 'USER INPUT' and provide a structured, actionable signal by filtering it through your Decision Protocol.
@@ -0,0 +1,119 @@
+# document_builder.py
+
+import html
+import hashlib
+import pandas as pd
+from langchain.docstore.document import Document
+import config
+import knowledge_store
+
+# Dökümanları üretmek için arşivden okunması yeterli sütunlar.
+DOCUMENT_COLUMNS = ['id', 'timestamp', 'headline', 'source', 'rag_content']
+EMPTY_CONTENT = "Content not available"
+
+
+def normalize_news_id(news_id):
+    """Alpaca haber ID'sini ChromaDB'de anahtar olarak kullanılacak string'e çevirir (1234.0 -> '1234')."""
+    try:
+        return str(int(news_id))
+    except (TypeError, ValueError):
+        return str(news_id)
+
+
+def compute_content_hash(text):
+    """`rag_content` metninin içerik özetini (SHA-256) döndürür. İçerik değişirse özet de değişir."""
+    return hashlib.sha256(str(text).encode('utf-8')).hexdigest()
+
+
+def build_rag_content(df):
+    """
+    Başlık ve özetten RAG metnini vektörel olarak üretir.
+    Özet 5 kelimeden uzunsa "Headline: ... Summary: ..." formatı, değilse sadece başlık kullanılır.
+    """
+    headline = df['headline'].astype(str)
+    summary = df['summary']
+    has_summary = summary.notna() & (summary.astype(str).str.split().str.len() > 5)
+    combined = "Headline: " + headline + ". Summary: " + summary.astype(str)
+    return combined.where(has_summary, headline)
+
+
+def prepare_live_frame(items):
+    """
+    Canlı akıştan gelen haber sözlüklerini arşivle aynı şekilde işler (HTML temizliği ve `rag_content`).
+    Canlı yolda embed edilen metin ile Chroma'ya yazılan metnin birebir aynı olmasını sağlar.
+    """
+    df = pd.DataFrame(items)
+    df['headline'] = df['headline'].map(lambda x: html.unescape(x) if isinstance(x, str) else x)
+    df['summary'] = df['summary'].map(lambda x: html.unescape(x) if isinstance(x, str) else x)
+    df['rag_content'] = build_rag_content(df)
+    return df
+
+
+def live_document_text(news_dict):
+    """Tek bir canlı haberin Chroma'ya yazılacak (ve embed edilecek) metnini döndürür."""
+    return page_contents(prepare_live_frame([news_dict])).iloc[0]
+
+
+def normalize_ids(ids):
+    """`normalize_news_id`'nin vektörel karşılığı."""
+    numeric = pd.to_numeric(ids, errors='coerce')
+    as_int = numeric.dropna().astype('int64').astype(str)
+    return as_int.reindex(ids.index).fillna(ids.astype(str))
+
+
+def publish_timestamps(timestamps):
+    """Tarih sütununu UTC epoch saniyesine çevirir; okunamayan tarihler 0 olur."""
+    parsed = pd.to_datetime(timestamps, utc=True, errors='coerce', format='mixed')
+    epoch = (parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+    return epoch.fillna(0).astype('int64')
+
+
+def page_contents(df):
+    """Boş içerik durumunda çökmemesi için varsayılan metinle doldurulmuş `rag_content` sütunu."""
+    return df['rag_content'].astype(object).where(df['rag_content'].notna(), EMPTY_CONTENT).astype(str)
+
+
+def build_documents(df):
+    """
+    Bir DataFrame parçasından (dökümanlar, ID'ler) üretir. Metadata sütunları satır satır değil,
+    pandas işlemleriyle bir kerede hazırlanır. Her vektör Alpaca haber ID'si ile anahtarlanır;
+    içerik özeti metadata'da tutulur. Metadata değerleri string veya tam sayı olduğu için Chroma'ya doğrudan yazılabilir.
+    """
+    if df.empty:
+        return [], []
+    contents = page_contents(df)
+    ids = normalize_ids(df['id'])
+    metadata = pd.DataFrame({
+        'news_id': ids,
+        'content_hash': contents.map(compute_content_hash),
+        'source': df['source'].astype(object).where(df['source'].notna(), 'N/A').astype(str) if 'source' in df else 'N/A',
+        'title': df['headline'].astype(object).where(df['headline'].notna(), 'N/A').astype(str) if 'headline' in df else 'N/A',
+        # Metadata'da tarih gibi karmaşık nesneler sorun çıkarabildiği için string'e çeviriyoruz.
+        'publish_date': df['timestamp'].astype(str) if 'timestamp' in df else 'N/A',
+        # Zaman aralığı filtreleri ($gte/$lt) ve yakınlık skorlaması için sayısal (epoch saniye) tarih.
+        'publish_ts': publish_timestamps(df['timestamp']) if 'timestamp' in df else 0,
+    }, index=df.index)
+    documents = [
+        Document(page_content=content, metadata=meta)
+        for content, meta in zip(contents.tolist(), metadata.to_dict('records'))
+    ]
+    return documents, ids.tolist()
+
+
+def iter_document_batches(chunks, batch_size=None):
+    """
+    DataFrame parçalarını, en fazla `batch_size` dökümanlık (dökümanlar, ID'ler) paketlerine çevirir.
+    Her seferinde sadece bir parça bellekte tutulur; böylece arşiv büyüdükçe bellek kullanımı artmaz.
+    """
+    batch_size = batch_size or config.DOCUMENT_BATCH_SIZE
+    for df in chunks:
+        for start in range(0, len(df), batch_size):
+            documents, ids = build_documents(df.iloc[start:start + batch_size])
+            if documents:
+                yield documents, ids
+
+
+def iter_knowledge_base_documents(batch_size=None, chunksize=None):
+    """Ana arşivi parça parça okuyup doğrudan döküman paketleri halinde üretir."""
+    chunks = knowledge_store.iter_knowledge_base(columns=DOCUMENT_COLUMNS, chunksize=chunksize)
+    return iter_document_batches(chunks, batch_size)
@@ -0,0 +1,147 @@
+# embedding_cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+import config
+
+
+def text_hash(text):
+    """Embed edilecek metnin SHA-256 özetini döndürür. Önbellek anahtarının metin kısmıdır."""
+    return hashlib.sha256(str(text).encode('utf-8')).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Herhangi bir LangChain embedding nesnesini diskteki (SQLite) içerik adresli bir önbellekle sarar.
+    Anahtar (embedding modeli, metin özeti) ikilisidir; aynı metin bir daha asla API'ye gönderilmez.
+    Önbellek `max_entries` ile sınırlıdır; sınır aşılınca en uzun süredir kullanılmayan kayıtlar silinir.
+    """
+
+    def __init__(self, embeddings, model_name, cache_path=None, max_entries=None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = cache_path or config.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries or config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Aynı nesne farklı thread'lerden (ör. paralel embed işlemleri) kullanılabilir.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # --- Önbellek işlemleri ---
+    def _lookup(self, model_key, hashes):
+        """Verilen özetler için önbellekte bulunan vektörleri {özet: vektör} olarak döndürür."""
+        found = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        with self._lock:
+            # SQLite'ın parametre limitine takılmamak için parçalar halinde sorgula.
+            for i in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model_key, *chunk]
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = array('f', blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model_key, h) for h in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, model_key, items):
+        """Yeni hesaplanan (özet, vektör) çiftlerini önbelleğe yazar ve gerekirse eski kayıtları atar."""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model_key, h, array('f', vector).tobytes(), now) for h, vector in items]
+            )
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                # Her seferinde tek tek silmemek için sınırın %10 altına kadar temizle.
+                to_evict = self._size - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (to_evict,)
+                )
+                self._size -= to_evict
+                self.evictions += to_evict
+            self._conn.commit()
+
+    def _embed_with_cache(self, model_key, texts, embed_fn):
+        hashes = [text_hash(t) for t in texts]
+        cached = self._lookup(model_key, hashes)
+
+        # Önbellekte olmayan metinleri (tekrarlananları bir kez) API'ye gönder.
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        miss_count = sum(1 for h in hashes if h not in cached)
+        with self._lock:
+            self.hits += len(hashes) - miss_count
+            self.misses += miss_count
+
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            computed = list(zip(missing.keys(), vectors))
+            self._store(model_key, computed)
+            cached.update(computed)
+        return [cached[h] for h in hashes]
+
+    # --- LangChain Embeddings arayüzü ---
+    def embed_documents(self, texts):
+        return self._embed_with_cache(f"{self.model_name}:document", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        # Sorgu ve döküman vektörleri farklı görev tipleriyle üretildiği için ayrı anahtarlanır.
+        return self._embed_with_cache(f"{self.model_name}:query", [text], lambda t: [self.embeddings.embed_query(t[0])])[0]
+
+    def stats(self):
+        """Önbellek isabet/ıskalama sayaçlarını döndürür."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": self._size,
+            "evictions": self.evictions,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"Embedding önbelleği: {s['hits']} isabet, {s['misses']} ıskalama "
+              f"(isabet oranı: %{s['hit_rate'] * 100:.1f}), {s['entries']} kayıt, {s['evictions']} atılan kayıt.")
+
+
+def create_embeddings(api_key=None):
+    """
+    Projedeki tüm yolların (güncelleme, yeniden oluşturma, canlı analiz) kullandığı,
+    önbellekli Gemini embedding nesnesini oluşturur.
+    """
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    api_key = api_key or os.getenv(config.GEMINI_API_KEY_ENV)
+    embeddings = GoogleGenerativeAIEmbeddings(model=config.EMBEDDING_MODEL, google_api_key=api_key)
+    return CachedEmbeddings(embeddings, config.EMBEDDING_MODEL)
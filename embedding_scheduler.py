@@ -0,0 +1,150 @@
+# embedding_scheduler.py
+
+import math
+import time
+import uuid
+import random
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from tqdm import tqdm
+import config
+from rate_limiter import TokenBucket
+
+
+def is_quota_error(error):
+    """Hatanın Gemini kota/hız sınırı (HTTP 429, ResourceExhausted) kaynaklı olup olmadığını anlar."""
+    text = f"{type(error).__name__} {error}".lower()
+    return any(key in text for key in ("resourceexhausted", "429", "quota", "rate limit", "too many requests"))
+
+
+def upsert_precomputed(vector_store, ids, texts, vectors, metadatas):
+    """
+    Vektörü önceden hesaplanmış dökümanları, embedding fonksiyonunu tekrar çağırmadan Chroma'ya yazar.
+    langchain_chroma bunun için herkese açık bir metod sunmadığından alttaki koleksiyonu doğrudan kullanır;
+    bölümlü veritabanında (vector_partitions) kayıtlar yayın tarihlerine göre kendi bölümlerine yazılır.
+    """
+    # Chroma boş metadata sözlüklerini kabul etmediği için None'a çeviriyoruz.
+    metadatas = [m or None for m in metadatas]
+    if hasattr(vector_store, "upsert_vectors"):
+        vector_store.upsert_vectors(ids, vectors, texts, metadatas)
+        return
+    vector_store._collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+
+
+def update_metadatas(vector_store, ids, metadatas):
+    """Vektörlere dokunmadan sadece metadata'yı günceller (tek koleksiyonlu veya bölümlü veritabanı)."""
+    if hasattr(vector_store, "update_metadatas"):
+        vector_store.update_metadatas(ids, metadatas)
+    else:
+        vector_store._collection.update(ids=ids, metadatas=metadatas)
+
+
+class EmbeddingScheduler:
+    """
+    Dökümanları yapılandırılabilir parçalara (batch) böler, birden fazla parçayı aynı anda embed eder
+    ve Gemini kotasına göre ayarlanmış bir token bucket ile istek hızını sınırlar.
+    Kota hatası alan parçalar üstel geri çekilme (backoff) ile tekrar denenir; tamamlanan parçalar
+    biriktirilerek Chroma'ya bloklar halinde yazılır. Chroma'ya yazma işini tek bir thread (çağıran) yapar.
+    """
+
+    def __init__(self, embeddings, batch_size=None, max_concurrency=None, requests_per_minute=None,
+                 write_batch_size=None, max_retries=None, limiter=None):
+        self.embeddings = embeddings
+        self.batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        self.max_concurrency = max_concurrency or config.EMBEDDING_MAX_CONCURRENCY
+        self.write_batch_size = write_batch_size or config.CHROMA_WRITE_BATCH_SIZE
+        self.max_retries = max_retries if max_retries is not None else config.EMBEDDING_MAX_RETRIES
+        self.limiter = limiter or TokenBucket.per_minute(
+            requests_per_minute or config.EMBEDDING_REQUESTS_PER_MINUTE,
+            capacity=self.max_concurrency
+        )
+        self.retries = 0
+
+    def _embed_batch(self, texts):
+        """Tek bir parçayı, hız sınırına uyarak ve kota hatalarında tekrar deneyerek embed eder."""
+        # Gemini bir istekte en fazla 100 metin kabul ettiği için parça kaç isteğe denk geliyorsa o kadar jeton harcanır.
+        tokens = max(1, math.ceil(len(texts) / 100))
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_quota_error(e) or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                print(f"  -> Kota sınırına takıldı, {delay:.1f} sn sonra tekrar denenecek ({attempt + 1}/{self.max_retries})...")
+                # Kovayı boşaltarak diğer işçilerin de yavaşlamasını sağla.
+                self.limiter.penalize(delay)
+                time.sleep(delay)
+
+    def embed_and_store(self, vector_store, documents, ids=None, desc="Dökümanlar Embed Ediliyor"):
+        """Bellekteki bir döküman listesini paralel embed edip Chroma'ya yazar. Yazılan döküman sayısını döndürür."""
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+        return self.embed_and_store_stream(vector_store, [(documents, ids)], total=len(documents), desc=desc)
+
+    def _split(self, document_batches):
+        """Gelen (dökümanlar, ID'ler) paketlerini embed parçası büyüklüğüne böler."""
+        for documents, ids in document_batches:
+            for i in range(0, len(documents), self.batch_size):
+                yield documents[i:i + self.batch_size], ids[i:i + self.batch_size]
+
+    def embed_and_store_stream(self, vector_store, document_batches, total=None, desc="Dökümanlar Embed Ediliyor"):
+        """
+        (dökümanlar, ID'ler) paketleri üreten bir akışı paralel embed edip Chroma'ya yazar.
+        Akış tembel okunur ve aynı anda bellekte en fazla `2 * max_concurrency` parça tutulur;
+        böylece arşiv ne kadar büyük olursa olsun bellek sabit kalır. Yazılan döküman sayısını döndürür.
+        """
+        pending_write = {"ids": [], "texts": [], "vectors": [], "metadatas": []}
+        written = 0
+
+        def flush():
+            nonlocal written
+            if not pending_write["ids"]:
+                return
+            upsert_precomputed(vector_store, pending_write["ids"], pending_write["texts"],
+                               pending_write["vectors"], pending_write["metadatas"])
+            written += len(pending_write["ids"])
+            for values in pending_write.values():
+                values.clear()
+
+        start = time.time()
+        batch_iter = self._split(document_batches)
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor, \
+                tqdm(total=total, desc=desc) as progress:
+
+            def submit_next():
+                batch = next(batch_iter, None)
+                if batch is None:
+                    return False
+                docs, batch_ids = batch
+                future = executor.submit(self._embed_batch, [d.page_content for d in docs])
+                in_flight[future] = (docs, batch_ids)
+                return True
+
+            # Kuyruğu doldur: işçi sayısının iki katı kadar parça hazırda beklesin.
+            for _ in range(self.max_concurrency * 2):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    docs, batch_ids = in_flight.pop(future)
+                    vectors = future.result()
+                    pending_write["ids"].extend(batch_ids)
+                    pending_write["texts"].extend(d.page_content for d in docs)
+                    pending_write["vectors"].extend(vectors)
+                    pending_write["metadatas"].extend(d.metadata for d in docs)
+                    progress.update(len(docs))
+                    if len(pending_write["ids"]) >= self.write_batch_size:
+                        flush()
+                    submit_next()
+            flush()
+
+        elapsed = time.time() - start
+        rate = written / elapsed if elapsed > 0 else 0.0
+        print(f"{written} döküman {elapsed:.1f} sn içinde embed edilip yazıldı "
+              f"({rate:.1f} döküman/sn, {self.retries} tekrar deneme).")
+        return written
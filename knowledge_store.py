@@ -0,0 +1,279 @@
+# knowledge_store.py
+
+import os
+import ast
+import sys
+import glob
+import numpy as np
+import pandas as pd
+import config
+
+# Ana arşivin sütunları ve tipleri. Parquet deposunda bu tiplerle saklanır.
+KB_COLUMNS = ["id", "timestamp", "headline", "summary", "source", "symbols", "rag_content"]
+PARTITION_PREFIX = "month="
+
+
+def parse_symbols(value):
+    """
+    Sembol alanını listeye çevirir. Arşivde iki format birlikte bulunur:
+    geçmiş verilerde "['BTCUSD', 'ETHUSD']", canlı akıştan gelenlerde "BTCUSD,ETHUSD".
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(s) for s in value]
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    text = str(value).strip()
+    if not text or text.lower() == 'nan':
+        return []
+    if text.startswith('['):
+        try:
+            return [str(s) for s in ast.literal_eval(text)]
+        except (ValueError, SyntaxError):
+            text = text.strip('[]')
+    return [s.strip().strip("'\"") for s in text.split(',') if s.strip().strip("'\"")]
+
+
+def normalize_frame(df):
+    """Sütun tiplerini depo şemasına getirir: int64 id, UTC timestamp, liste halinde semboller."""
+    df = df.copy()
+    for column in KB_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df = df[KB_COLUMNS + [c for c in df.columns if c not in KB_COLUMNS]]
+    df = df.dropna(subset=['id'])
+    df['id'] = pd.to_numeric(df['id'], errors='coerce')
+    df = df.dropna(subset=['id'])
+    df['id'] = df['id'].astype('int64')
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True, errors='coerce', format='mixed')
+    df['symbols'] = df['symbols'].map(parse_symbols)
+    for column in ("headline", "summary", "source", "rag_content"):
+        df[column] = df[column].astype('string')
+    return df
+
+
+def to_csv_frame(df):
+    """Depo DataFrame'ini eski CSV formatına (virgülle ayrılmış semboller) çevirir."""
+    df = df.copy()
+    if 'symbols' in df.columns:
+        df['symbols'] = df['symbols'].map(lambda s: ",".join(s) if isinstance(s, (list, tuple, np.ndarray)) else s)
+    return df
+
+
+# --- PARQUET DEPOSU ---
+def _partition_key(timestamp):
+    return timestamp.strftime("%Y-%m")
+
+
+def _partition_path(key):
+    return os.path.join(config.KNOWLEDGE_BASE_DIR, f"{PARTITION_PREFIX}{key}", "part.parquet")
+
+
+def list_partitions():
+    """Depodaki ay bölümlerini (YYYY-MM) yeniden eskiye sıralı döndürür."""
+    pattern = os.path.join(config.KNOWLEDGE_BASE_DIR, f"{PARTITION_PREFIX}*", "part.parquet")
+    keys = [os.path.basename(os.path.dirname(p))[len(PARTITION_PREFIX):] for p in glob.glob(pattern)]
+    return sorted(keys, reverse=True)
+
+
+def _read_partition(key, columns=None, filters=None):
+    return pd.read_parquet(_partition_path(key), columns=columns, filters=filters)
+
+
+def _write_partition(key, df):
+    """Bir ay bölümünü atomik olarak yazar (önce geçici dosya, sonra yer değiştirme)."""
+    path = _partition_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = df.sort_values(by='timestamp', ascending=False)
+    tmp_path = path + ".tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+def _selected_partitions(start=None, end=None):
+    """Verilen zaman aralığıyla kesişen bölümleri döndürür; diğerleri hiç açılmaz."""
+    keys = list_partitions()
+    if start is not None:
+        keys = [k for k in keys if k >= _partition_key(_utc(start))]
+    if end is not None:
+        keys = [k for k in keys if k <= _partition_key(_utc(end))]
+    return keys
+
+
+def iter_partitions(columns=None, start=None, end=None):
+    """Bölümleri yeniden eskiye doğru tek tek okur; tüm arşivi belleğe almadan işlemek için kullanılır."""
+    filters = []
+    if start is not None:
+        filters.append(('timestamp', '>=', _utc(start)))
+    if end is not None:
+        filters.append(('timestamp', '<', _utc(end)))
+    read_columns = columns
+    if columns is not None and filters and 'timestamp' not in columns:
+        read_columns = list(columns) + ['timestamp']
+    for key in _selected_partitions(start, end):
+        df = _read_partition(key, columns=read_columns, filters=filters or None)
+        if columns is not None:
+            df = df[list(columns)]
+        yield key, df
+
+
+# --- ORTAK ARAYÜZ (CSV veya Parquet) ---
+def use_parquet():
+    return config.KNOWLEDGE_BASE_FORMAT == "parquet"
+
+
+def read_knowledge_base(columns=None, start=None, end=None):
+    """
+    Ana arşivi okur. Parquet deposunda sadece istenen sütunlar ve zaman aralığına düşen
+    ay bölümleri okunur. Arşiv yoksa FileNotFoundError fırlatır (eski pd.read_csv davranışı gibi).
+    """
+    if not use_parquet():
+        time_filter = start is not None or end is not None
+        usecols = columns
+        if columns is not None and time_filter and 'timestamp' not in columns:
+            usecols = list(columns) + ['timestamp']
+        df = pd.read_csv(config.KNOWLEDGE_BASE_CSV, usecols=usecols)
+        if time_filter:
+            timestamps = pd.to_datetime(df['timestamp'], utc=True, format='mixed')
+            mask = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= timestamps >= _utc(start)
+            if end is not None:
+                mask &= timestamps < _utc(end)
+            df = df[mask]
+        return df[list(columns)] if columns is not None else df
+
+    if not list_partitions():
+        raise FileNotFoundError(config.KNOWLEDGE_BASE_DIR)
+    frames = [df for _, df in iter_partitions(columns=columns, start=start, end=end)]
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns or KB_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_knowledge_base(columns=None, chunksize=None):
+    """
+    Ana arşivi en fazla `chunksize` satırlık parçalar halinde okur (yeniden eskiye).
+    Tüm arşivi belleğe almadan işlemek isteyen yollar (yeniden oluşturma, eşitleme) bunu kullanır.
+    """
+    chunksize = chunksize or config.KNOWLEDGE_BASE_CHUNK_SIZE
+    if not use_parquet():
+        yield from pd.read_csv(config.KNOWLEDGE_BASE_CSV, usecols=columns, chunksize=chunksize)
+        return
+
+    if not list_partitions():
+        raise FileNotFoundError(config.KNOWLEDGE_BASE_DIR)
+    for _, df in iter_partitions(columns=columns):
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def knowledge_base_exists():
+    if use_parquet():
+        return bool(list_partitions())
+    return os.path.exists(config.KNOWLEDGE_BASE_CSV)
+
+
+def upsert_news(df_new):
+    """
+    Yeni/güncellenmiş haberleri arşive yazar (aynı ID'li kayıtlarda yenisi kazanır).
+    Parquet deposunda sadece yeni haberlerin düştüğü ay bölümleri yeniden yazılır.
+    Güncellenen toplam/bölüm bilgisini döndürür.
+    """
+    if not use_parquet():
+        try:
+            df_existing_kb = pd.read_csv(config.KNOWLEDGE_BASE_CSV)
+        except FileNotFoundError:
+            df_existing_kb = pd.DataFrame()
+        df_combined = pd.concat([df_existing_kb, df_new], ignore_index=True)
+        df_combined.drop_duplicates(subset=['id'], keep='last', inplace=True)
+        df_combined['timestamp'] = pd.to_datetime(df_combined['timestamp'])
+        df_combined.sort_values(by='timestamp', ascending=False, inplace=True)
+        df_combined.to_csv(config.KNOWLEDGE_BASE_CSV, index=False, encoding='utf-8-sig')
+        return {"rows": len(df_new), "partitions": ["csv"]}
+
+    df_new = normalize_frame(df_new).dropna(subset=['timestamp'])
+    df_new = df_new.drop_duplicates(subset=['id'], keep='last')
+    # Alpaca bir haberin created_at değerini değiştirmediği için aynı ID hep aynı aya düşer;
+    # bu yüzden sadece yeni haberlerin ayları okunup yeniden yazılır, diğer bölümlere dokunulmaz.
+    touched = []
+    for key, df_month in df_new.groupby(df_new['timestamp'].map(_partition_key)):
+        if os.path.exists(_partition_path(key)):
+            df_month = pd.concat([_read_partition(key), df_month], ignore_index=True)
+            df_month = df_month.drop_duplicates(subset=['id'], keep='last')
+        _write_partition(key, df_month)
+        touched.append(key)
+    return {"rows": len(df_new), "partitions": sorted(set(touched), reverse=True)}
+
+
+def map_partitions(func):
+    """
+    Her bölüme `func(df) -> df` uygular ve sadece satır sayısı değişen bölümleri yeniden yazar; satır sayısı
+    aynı kalıp değerleri değişen bölümler için `func` sonucun `attrs["modified"]` alanını True yapmalıdır.
+    CSV arşivinde tüm dosyaya bir kez uygulanır. (önceki satır sayısı, sonraki satır sayısı) döndürür.
+    """
+    if not use_parquet():
+        df = pd.read_csv(config.KNOWLEDGE_BASE_CSV)
+        before = len(df)
+        df = func(df)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df.sort_values(by='timestamp', ascending=False, inplace=True)
+        df.to_csv(config.KNOWLEDGE_BASE_CSV, index=False, encoding='utf-8-sig')
+        return before, len(df)
+
+    if not list_partitions():
+        raise FileNotFoundError(config.KNOWLEDGE_BASE_DIR)
+    before = after = 0
+    for key, df in iter_partitions():
+        result = func(df)
+        before += len(df)
+        after += len(result)
+        if len(result) != len(df) or result.attrs.get("modified"):
+            _write_partition(key, result)
+    return before, after
+
+
+# --- GEÇİŞ VE DIŞA AKTARMA ---
+def migrate_from_csv(csv_path=None, chunksize=50000):
+    """Mevcut knowledge_base.csv dosyasını parça parça okuyup aylık Parquet deposuna aktarır."""
+    csv_path = csv_path or config.KNOWLEDGE_BASE_CSV
+    print(f"'{csv_path}' dosyası Parquet deposuna ('{config.KNOWLEDGE_BASE_DIR}') aktarılıyor...")
+    previous_format = config.KNOWLEDGE_BASE_FORMAT
+    config.KNOWLEDGE_BASE_FORMAT = "parquet"
+    try:
+        total = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            result = upsert_news(chunk)
+            total += result["rows"]
+            print(f"  -> {total} haber aktarıldı (güncellenen bölümler: {len(result['partitions'])}).")
+    finally:
+        config.KNOWLEDGE_BASE_FORMAT = previous_format
+    print(f"✅ Geçiş tamamlandı. {len(list_partitions())} aylık bölüm oluşturuldu.")
+
+
+def export_csv(csv_path=None):
+    """Parquet deposunu, diğer araçlarla uyumluluk için eski formatta tek bir CSV dosyasına aktarır."""
+    csv_path = csv_path or config.KNOWLEDGE_BASE_CSV
+    header = True
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        # Bölümler zaten yeniden eskiye sıralı; her biri kendi içinde de sıralı yazıldığı için dosya da sıralı olur.
+        for _, df in iter_partitions():
+            to_csv_frame(df).to_csv(f, index=False, header=header)
+            header = False
+    print(f"✅ Arşiv '{csv_path}' dosyasına CSV olarak aktarıldı.")
+
+
+if __name__ == '__main__':
+    # Kullanım: python knowledge_store.py migrate | export
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        migrate_from_csv()
+    elif command == "export":
+        export_csv()
+    else:
+        print("Kullanım: python knowledge_store.py [migrate|export]")
@@ -1,27 +1,33 @@
 # main_controller.py (config.py ile tam uyumlu, nihai versiyon)
 
+import time
+# Başlangıç süre dökümü bu andan itibaren ölçülür.
+STARTUP_ORIGIN = time.perf_counter()
 import os
 import html
 import logging
 import asyncio
-import pandas as pd
 from dotenv import load_dotenv
 
 from alpaca.data.live.news import NewsDataStream
-from langchain.docstore.document import Document
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_chroma import Chroma
 
 # Kendi dosyalarımızdan importlar
+# langchain, chromadb ve Gemini istemcileri burada değil, arka plandaki başlangıç thread'inde yüklenir.
 from analysis_engine import (
-    initialize_analyst_components, 
+    get_gemini_api_key,
     parse_analyst_report, 
-    send_telegram_message, 
-    get_btc_price,
-    translate_to_turkish
+    get_asset_price,
+    ReportStreamParser
 ) 
 import config # Artık tüm ayarlar için config.py'yi kullanıyoruz
+from startup import AnalystRuntime, StartupTimer
+from news_filter import NewsPrefilter
+from write_behind import WriteBehindBuffer
+from price_service import get_price_service
+from translation_service import get_translation_service
+from telegram_delivery import get_telegram_delivery
+from analysis_cache import AnalysisCache
+from metrics import get_metrics, start_metrics_server
 
 # .env dosyasını yükle
 load_dotenv()
@@ -36,112 +42,391 @@ IMPACT_THRESHOLD = config.IMPACT_THRESHOLD
 SYMBOL_WATCHLIST = config.SYMBOLS_TO_TRACK # Doğru değişken adını kullanıyoruz
 
 # --- 2. RAG SİSTEMİ KURULUMU ---
-# Temel RAG bileşenlerini yüklüyoruz.
-llm, retriever, vector_store = initialize_analyst_components()
-# Bu betiğe özel analiz zincirini oluşturuyoruz.
-prompt = ChatPromptTemplate.from_template(config.SYSTEM_PROMPT)
-document_chain = create_stuff_documents_chain(llm, prompt)
+# LLM, analiz zinciri, vektör veritabanı ve sıcak indeks `runtime.start()` ile arka planda hazırlanır;
+# böylece haber akışına hemen abone olunur. Veritabanı hazır olana kadar haberler bağlamsız analiz edilir.
+startup_timer = StartupTimer(origin=STARTUP_ORIGIN)
+runtime = AnalystRuntime(startup_timer)
+# LLM'e gitmeden önce haberleri eleyen sembol + triaj filtresi.
+prefilter = NewsPrefilter()
+
+# Aşama süreleri ve sayaçlar; /metrics uç noktasından ve isteğe bağlı JSON log satırlarından okunur.
+metrics = get_metrics()
 
 # --- 3. ÇEVİRİ MOTORU ---
-# Bu bölüm, önceki versiyonlardaki gibi kalabilir veya eklenebilir.
-# Şimdilik ana mantığa odaklanıyoruz.
+# Tek bir çeviri istemcisi paylaşılır; çeviriler önbelleğe alınır ve aynı anda gelen alarmlar toplu çevrilir.
+translator = get_translation_service()
+# Alarmlar bağlantı havuzlu, hız sınırlı asenkron bir kuyruk üzerinden tüm chat'lere iletilir.
+telegram = get_telegram_delivery()
 
-# --- 4. ARKA PLAN GÖREVİ ---
-async def process_and_save_in_background(news_dict: dict, vs: Chroma):
-    """
-    Gelen haberi hem CSV tampon dosyasına hem de canlı ChromaDB'ye ekler.
-    """
+async def send_translation_followup(headline_en, direction_emoji):
+    """Kritik yol dışı mod: İngilizce alarm gittikten sonra Türkçe başlığı ayrı bir mesajla gönderir."""
     try:
-        print(f"   -> Arka planda veritabanı güncelleniyor (ID: {news_dict.get('id')})...")
-        
-        # 1. LangChain dökümanı oluştur
-        rag_content = f"Headline: {news_dict['headline']}. Summary: {news_dict['summary']}"
-        document = Document(
-            page_content=rag_content,
-            metadata={
-                'source': news_dict.get('source'), 
-                'title': news_dict.get('headline'), 
-                'publish_date': str(news_dict.get('timestamp')) # ChromaDB için string'e çevirmek daha güvenli
-            }
-        )
-        
-        # 2. Canlı vektör veritabanına ekle
-        vs.add_documents([document])
-        
-        # 3. CSV tampon dosyasına ekle
-        df_live = pd.DataFrame([news_dict])
-        df_live.to_csv(config.LIVE_BUFFER_CSV, mode='a', header=not os.path.exists(config.LIVE_BUFFER_CSV), index=False, encoding='utf-8-sig')
+        headline_tr = await translator.translate(headline_en)
+        if not headline_tr:
+            return
+        message = f"{direction_emoji} *Headline (TR):*\n`{headline_tr}`\n\n_EN: {headline_en}_"
+        await telegram.send(message)
     except Exception as e:
-        print(f"🚨 ARKA PLAN GÜNCELLEME HATASI: {e}")
+        print(f"UYARI: Türkçe alarm mesajı gönderilemedi. Hata: {e}")
+
+async def send_commentary_followup(headline_en, parsed_report):
+    """Erken alarm modu: skorlarla gönderilen alarmın ardından LLM'in analiz cümlesini ayrı bir mesajla gönderir."""
+    direction_emoji = "🟢" if parsed_report.get('direction', '').lower() == 'positive' else "🔴"
+    message = f"{direction_emoji} *Commentary:*\n_{parsed_report['analysis']}_\n\n_EN: {headline_en}_"
+    await telegram.send(message)
+
+# --- 4. ARKA PLAN GÖREVİ ---
+def news_to_dict(data):
+    """Alpaca haber nesnesini arşiv/tampon dosyasıyla aynı sütunlara sahip bir sözlüğe çevirir."""
+    return {"id": data.id, "timestamp": data.created_at, "headline": data.headline, "summary": data.summary, "source": data.source, "symbols": ",".join(data.symbols) if data.symbols else ""}
+
+# Canlı haberler tek tek değil, write-behind tamponunda biriktirilip toplu halde
+# hem ChromaDB'ye hem de CSV tampon dosyasına yazılır.
+# Vektör veritabanı hazır olana kadar haberler sadece CSV tamponuna yazılır (update_database sonradan ekler).
+live_writer = WriteBehindBuffer(None)
+runtime.on_index_ready(lambda vector_store, retriever: live_writer.attach(vector_store, getattr(retriever, "index", None)))
 
 # --- 5. CANLI HABER ANALİZ FONKSİYONU ---
-async def analyze_news_on_arrival(data):
+# Aynı hikayenin kısa süre içinde gelen kopyaları için önceki analiz sonucu yeniden kullanılır.
+analysis_cache = AnalysisCache()
+
+def is_alarm_report(parsed_report):
+    """Ayrıştırılmış raporun alarm kriterlerini karşılayıp karşılamadığını döndürür."""
+    if not parsed_report:
+        return False
+    return parsed_report.get('confidence', 0) >= CONFIDENCE_THRESHOLD and parsed_report.get('impact', 0) >= IMPACT_THRESHOLD and parsed_report.get('direction', '').lower() != 'neutral'
+
+def rejection_reason(parsed_report):
+    """
+    Alarm verilmeyen raporun gerekçesi. Erken durdurulan raporda sadece akış kesilmeden önce görülen alanlar
+    vardır; görülmeyen alanlar uydurulmaz, yerine "erken durduruldu" yazılır.
+    """
+    fields = (("Confidence", 'confidence', f"/{CONFIDENCE_THRESHOLD}"), ("Impact", 'impact', f"/{IMPACT_THRESHOLD}"),
+              ("Direction", 'direction', ""))
+    parts = [f"{label}: {parsed_report[key]}{suffix}" for label, key, suffix in fields if parsed_report.get(key) is not None]
+    if parsed_report.get('early_stop'):
+        parts.append("erken durduruldu")
+    return ", ".join(parts)
+
+def retrieve_by_vector(vector):
+    """
+    Haberin önceden hesaplanmış vektörüyle bağlam dökümanlarını bulur (sorgu tekrar embed edilmez).
+    Vektör veritabanı henüz hazır değilse boş bağlam döner (bağlamsız mod).
+    """
+    retriever = runtime.retriever
+    if retriever is None:
+        return []
+    if hasattr(retriever, "search_by_vector"):
+        return retriever.search_by_vector(vector)
+    return runtime.vector_store.max_marginal_relevance_search_by_vector(vector, k=config.RETRIEVER_K)
+
+async def stream_analyst_report(headline_en, context_docs, on_alarm=None):
     """
-    Haberi alır, analiz eder ve kaydetme işini arka plana atar.
+    LLM raporunu parça parça okur ve alanları geldikçe ayrıştırır. Dönüş: (rapor metni, ayrıştırılmış rapor, erken alarm görevi)
+    - Skorlar alarm kriterlerini karşılayamayacağını gösterirse (Neutral, düşük etki/güven) üretim hemen durdurulur;
+      bu durumda rapor sadece görülen alanları içerir ve `early_stop` ile işaretlenir.
+    - Skorlar kriterleri karşılarsa `on_alarm(rapor)` analiz cümlesi beklenmeden ayrı bir görev olarak başlatılır.
+      Akış bundan sonra hata verirse başlatılan alarm yine tamamlanır (iptal edilirsek o da iptal edilir).
     """
+    parser = ReportStreamParser()
+    stream = runtime.document_chain.astream({"input": headline_en, "context": context_docs})
+    start = time.monotonic()
+    verdict, alarm_task = None, None
     try:
-        # İlgililik kontrolü
-        is_relevant = any(watched_symbol in str(data.symbols) for watched_symbol in SYMBOL_WATCHLIST)
-        if not is_relevant:
-            print("not relevant")
+        async for chunk in stream:
+            if not parser.text:
+                metrics.observe("llm_first_token", time.monotonic() - start)
+            metrics.inc("llm_output_chars_total", len(chunk))
+            if verdict is not None:
+                parser.feed(chunk)
+                continue
+            verdict = parser.feed(chunk)
+            if verdict is not None:
+                metrics.observe("llm_verdict", time.monotonic() - start)
+            if verdict == "reject" and config.LLM_EARLY_STOP:
+                metrics.inc("llm_early_stops_total")
+                print(f"   -> ⏹️  Skorlar belli oldu, alarm kriterleri karşılanamaz; üretim durduruldu.")
+                break
+            if verdict == "alarm" and on_alarm is not None:
+                alarm_task = asyncio.create_task(on_alarm(parser.report()))
+    except asyncio.CancelledError:
+        if alarm_task is not None:
+            alarm_task.cancel()
+        raise
+    except Exception:
+        if alarm_task is not None:
+            # Skorlar alarmı zaten göstermişti; akışın sonradan kopması alarmı yarıda bırakmasın.
+            await asyncio.gather(alarm_task, return_exceptions=True)
+        raise
+    finally:
+        # Döngüden erken çıkıldığında akışı kapatmak Gemini isteğini de iptal eder.
+        await stream.aclose()
+    parser.finish()
+    parsed_report = parser.report() if parser.complete or verdict == "reject" else None
+    if parsed_report is not None and not parser.complete:
+        parsed_report["early_stop"] = True
+    if parsed_report is None:
+        # Rapor beklenmedik bir biçimdeyse tam metin üzerinde normal ayrıştırmaya düşülür (hata mesajı oradan basılır).
+        parsed_report = parse_analyst_report(parser.text)
+    return parser.text, parsed_report, alarm_task
 
+async def run_llm_analysis(headline_en, vector, on_alarm=None):
+    """
+    Retriever + LLM zincirini çalıştırır ve {"parsed_report", "is_alarm"} döndürür.
+    Akış modunda `on_alarm` verilirse alarm, skorlar belli olur olmaz (rapor tamamlanmadan) bu fonksiyonla gönderilir.
+    """
+    if runtime.degraded:
+        print("   -> Analiz ediliyor (bağlamsız mod: vektör veritabanı henüz hazır değil)...")
+    else:
+        print("   -> Analiz ediliyor...")
+    # LLM zincirinin asenkron sürümü kullanılıyor; böylece bir Gemini çağrısı
+    # beklenirken diğer işçiler kendi haberlerini işlemeye devam eder.
+    with metrics.timer("retrieval"):
+        context_docs = await asyncio.to_thread(retrieve_by_vector, vector)
+    metrics.inc("llm_calls_total")
+    alarm_task = None
+    with metrics.timer("llm"):
+        if config.LLM_STREAMING:
+            report_text, parsed_report, alarm_task = await stream_analyst_report(headline_en, context_docs, on_alarm)
+        else:
+            report_text = await runtime.document_chain.ainvoke({"input": headline_en, "context": context_docs})
+            parsed_report = None
+    
+    print("\n--- ANALYST REPORT ---")
+    print(report_text)
+    
+    if not config.LLM_STREAMING:
+        parsed_report = parse_analyst_report(report_text)
+    if alarm_task is not None:
+        await alarm_task
+    return {"parsed_report": parsed_report, "is_alarm": is_alarm_report(parsed_report)}
+
+async def send_alarm(headline_en, parsed_report, assets):
+    """Alarm mesajını hazırlar ve Telegram kuyruğuna koyar."""
+    # Fiyatlar arka plandaki fiyat servisinden ağ çağrısı yapılmadan okunur.
+    # Haber belirli varlıklarla ilgiliyse onların fiyatı, değilse (ör. makro haber) BTC fiyatı gösterilir.
+    price_lines = "".join(
+        f"*{asset} Price:* `{get_asset_price(asset)}`\n" for asset in (sorted(assets) or ["BTC"])
+    )
+    direction = parsed_report.get('direction', 'N/A')
+    direction_emoji = "🟢" if direction.lower() == 'positive' else "🔴"
+    
+    if config.TRANSLATION_OFF_CRITICAL_PATH:
+        # Alarm çeviri beklenmeden İngilizce gönderilir; Türkçe başlık arkadan gelir.
+        headline_tr_line = ""
+    else:
+        print("   -> Başlık Türkçe'ye çevriliyor...")
+        with metrics.timer("translation"):
+            headline_tr = await translator.translate(headline_en) or "Çeviri yapılamadı."
+        headline_tr_line = f"*Headline (TR):*\n`{headline_tr}`\n\n"
+    
+    message = (
+        f"{direction_emoji} *Signal: {direction.upper()}*\n"
+        f"{price_lines}\n"
+        f"{headline_tr_line}"
+        f"*Headline (EN):*\n`{headline_en}`\n\n"
+        f"*Scores:*\n"
+        f"Impact: *{parsed_report.get('impact')}/10* | Confidence: *{parsed_report.get('confidence')}/10*"
+    )
+    if parsed_report.get('analysis'):
+        # Erken alarm modunda analiz cümlesi henüz gelmemiştir; yorum ayrı mesajla gönderilir.
+        message += f"\n\n*Commentary:*\n_{parsed_report['analysis']}_"
+    with metrics.timer("telegram_enqueue"):
+        await telegram.send(message)
+    if config.TRANSLATION_OFF_CRITICAL_PATH:
+        await send_translation_followup(headline_en, direction_emoji)
+
+async def deliver_alarm(headline_en, parsed_report, assets, received_at):
+    """Alarmı gönderir ve alarm metriklerini kaydeder."""
+    with metrics.timer("alarm"):
+        await send_alarm(headline_en, parsed_report, assets)
+    metrics.inc("news_alarmed_total")
+    # Haberin gelişinden alarmın Telegram kuyruğuna girmesine kadar geçen süre.
+    metrics.observe("alarm_end_to_end", time.monotonic() - received_at)
+
+async def analyze_news_item(data, received_at, assets=()):
+    """
+    Haberi analiz eder ve kaydetme işini arka plana atar. Analiz işçileri tarafından çağrılır;
+    bloklayan tüm çağrılar (retriever, LLM, çeviri, fiyat, Telegram) olay döngüsünü durdurmadan çalışır.
+    """
+    trace = metrics.start_trace(news_id=data.id)
+    outcome = "failed"
+    try:
         headline_en = html.unescape(data.headline)
+        wait_seconds = time.monotonic() - received_at
+        metrics.observe("queue_wait", wait_seconds)
         print(f"\n📰 [İLGİLİ HABER GELDİ] {headline_en}")
+        print(f"   -> Kuyrukta bekleme: {wait_seconds:.2f} sn | Kuyruktaki haber: {queued_news_count()}")
         
-        # Analiz adımı
-        print("   -> Analiz ediliyor...")
-        # Not: app.py'deki initialize_analyst_assistant fonksiyonunun
-        # en güncel zincir yapısını kullandığından emin olun.
-        report_text = document_chain.invoke({"input": headline_en, "context": retriever.invoke(headline_en)})
+        # İlk haberler LLM hazırlanırken gelirse kısa süre beklenir.
+        await runtime.wait_for_llm()
+        from document_builder import live_document_text
         
-        print("\n--- ANALYST REPORT ---")
-        print(report_text)
+        # Haber bir kez embed edilir; aynı vektör kopya tespiti, bağlam arama ve veritabanına ekleme için kullanılır.
+        news_dict = news_to_dict(data)
+        with metrics.timer("embed"):
+            vector = (await asyncio.to_thread(runtime.embeddings.embed_documents, [live_document_text(news_dict)]))[0]
         
-        is_alarm = False
-        parsed_report = parse_analyst_report(report_text)
-        if parsed_report:
-            is_alarm = parsed_report.get('confidence', 0) >= CONFIDENCE_THRESHOLD and parsed_report.get('impact', 0) >= IMPACT_THRESHOLD and parsed_report.get('direction', '').lower() != 'neutral'
-        if is_alarm:
+        # Akış modunda skorlar kriterleri karşıladığı anda alarm, rapor tamamlanmadan gönderilir.
+        early_alarm_reports = []
+        async def send_early_alarm(report):
+            print(f"✅ ALARM KRİTERLERİ KARŞILANDI! (skorlar belli olur olmaz gönderiliyor)")
+            early_alarm_reports.append(report)
+            await deliver_alarm(headline_en, report, assets, received_at)
+        
+        # Aynı hikaye yakın zamanda analiz edildiyse (veya şu an ediliyorsa) LLM çağrısı atlanır.
+        result = None
+        with metrics.timer("cache_lookup"):
+            cached, match_kind, similarity = analysis_cache.lookup(headline_en, vector)
+        if cached is not None:
+            result = await analysis_cache.wait(cached)
+        if result is not None:
+            metrics.inc("analysis_cache_hits_total", kind=match_kind)
+            print(f"   -> ♻️  Önceki analiz kullanıldı ({match_kind}, benzerlik {similarity:.2f}): {cached['headline']}")
+            is_duplicate = True
+        else:
+            is_duplicate = False
+            entry_id = analysis_cache.reserve(headline_en, vector)
+            try:
+                result = await run_llm_analysis(headline_en, vector, on_alarm=send_early_alarm if config.LLM_EARLY_ALARM else None)
+            finally:
+                analysis_cache.complete(entry_id, result)
+        
+        parsed_report, is_alarm = result["parsed_report"], result["is_alarm"]
+        metrics.inc("news_analyzed_total")
+        outcome = "duplicate" if is_duplicate else "analyzed"
+        if is_alarm and is_duplicate and not config.ANALYSIS_CACHE_REALERT:
+            print(f"✅ ALARM KRİTERLERİ KARŞILANDI (kopya haber) - bu hikaye için alarm zaten gönderildi.")
+        elif is_alarm and early_alarm_reports:
+            # Alarm skorlarla birlikte zaten gönderildi; tamamlanan analiz cümlesi ayrıca iletilir.
+            if parsed_report.get('analysis'):
+                await send_commentary_followup(headline_en, parsed_report)
+            outcome = "alarmed"
+        elif is_alarm:
             print(f"✅ ALARM KRİTERLERİ KARŞILANDI!")
-            
-            print("   -> Başlık Türkçe'ye çevriliyor...")
-            headline_tr = translate_to_turkish(headline_en)
-
-            btc_price = get_btc_price()
-            direction = parsed_report.get('direction', 'N/A')
-            direction_emoji = "🟢" if direction.lower() == 'positive' else "🔴"
-            
-            message = (
-                f"{direction_emoji} *Signal: {direction.upper()}*\n"
-                f"*BTC/USDT Price:* `{btc_price}`\n\n"
-                f"*Headline (TR):*\n`{headline_tr}`\n\n"
-                f"*Headline (EN):*\n`{headline_en}`\n\n"
-                f"*Scores:*\n"
-                f"Impact: *{parsed_report.get('impact')}/10* | Confidence: *{parsed_report.get('confidence')}/10*\n\n"
-                f"*Commentary:*\n_{parsed_report.get('analysis', '')}_"
-            )
-            send_telegram_message(message)
+            await deliver_alarm(headline_en, parsed_report, assets, received_at)
+            outcome = "alarmed"
         else:
             if parsed_report:
-                reason = f"Confidence: {parsed_report.get('confidence', 0)}/{CONFIDENCE_THRESHOLD}, Impact: {parsed_report.get('impact', 0)}/{IMPACT_THRESHOLD}, Direction: {parsed_report.get('direction', 'N/A')}"
-                print(f"❌ Alarm kriterleri karşılanmadı. ({reason})")
+                print(f"❌ Alarm kriterleri karşılanmadı. ({rejection_reason(parsed_report)})")
             else:
                 print("❌ Alarm kriterleri karşılanmadı (Rapor ayrıştırılamadı).")
 
         
-        # Arka planda veritabanını güncelleme
-        news_item_dict = {"id": data.id, "timestamp": data.created_at, "headline": data.headline, "summary": data.summary, "source": data.source, "symbols": ",".join(data.symbols) if data.symbols else ""}
-        asyncio.create_task(process_and_save_in_background(news_item_dict, vector_store))
+        # Arka planda veritabanını güncelleme (hazır vektörle, tekrar embed edilmeden)
+        live_writer.add(news_dict, vector)
 
     except Exception as e:
+        outcome = "failed"
+        metrics.inc("news_failed_total")
         print(f"\n🚨 ANA ANALİZ DÖNGÜSÜ HATASI: {e}")
+    finally:
+        metrics.observe("end_to_end", time.monotonic() - received_at)
+        metrics.finish_trace(trace, outcome=outcome)
+
+# --- 6. ANALİZ KUYRUĞU VE İŞÇİ HAVUZU ---
+# Akış işleyicisi haberleri sadece bu sınırlı kuyruğa koyar; analizi ANALYSIS_WORKERS adet işçi yapar.
+# Kuyruk dolduğunda işleyici yer açılana kadar bekler (backpressure) ve haber kaybolmaz.
+analysis_queue = None
+worker_tasks = []
 
+async def analysis_worker(worker_id: int):
+    """Kuyruktan haber alıp analiz eden işçi döngüsü."""
+    while True:
+        data, received_at, assets = await analysis_queue.get()
+        try:
+            await analyze_news_item(data, received_at, assets)
+        finally:
+            analysis_queue.task_done()
 
-# --- 6. ANA UYGULAMAYI BAŞLATMA ---
+def ensure_workers_started():
+    """Kuyruğu ve işçileri, NewsDataStream'in kendi olay döngüsü içinde ilk haberde oluşturur."""
+    global analysis_queue
+    if analysis_queue is None:
+        analysis_queue = asyncio.Queue(maxsize=config.ANALYSIS_QUEUE_MAXSIZE)
+        for worker_id in range(config.ANALYSIS_WORKERS):
+            worker_tasks.append(asyncio.create_task(analysis_worker(worker_id)))
+        print(f"--- {config.ANALYSIS_WORKERS} analiz işçisi başlatıldı (kuyruk kapasitesi: {config.ANALYSIS_QUEUE_MAXSIZE}) ---")
+
+def queued_news_count():
+    return analysis_queue.qsize() if analysis_queue is not None else 0
+
+def prefilter_news(data):
+    """
+    Haberi ucuz ön filtreden geçirir ve (karar, varlıklar) döndürür. Takip listesi dışı haberler atılır,
+    triajda elenenler LLM'e gönderilmeden sadece arşive eklenir; analiz edilecek haberler için karar "pass"tır.
+    """
+    metrics.inc("news_received_total")
+    with metrics.timer("prefilter"):
+        decision, assets, score, reason = prefilter.evaluate(data.headline, data.symbols, data.source)
+    if prefilter.counters["received"] % config.FILTER_STATS_EVERY == 0:
+        print(f"📊 {prefilter.stats_line()}")
+        print(f"📊 {telegram.stats_line()}")
+        print(f"📊 {analysis_cache.stats_line()}")
+        print(f"📊 {metrics.stats_line()}")
+    if decision != "pass":
+        metrics.inc("news_dropped_total", stage=decision.replace("drop_", ""))
+    if decision == "drop_symbol":
+        # Takip listemizle ilgisiz haberler arşive de alınmaz (geçmiş veri toplama ile aynı kural).
+        return decision, assets
+    if decision == "drop_triage":
+        # İlgili ama alarm üretmesi beklenmeyen haber: LLM'e gönderilmez, sadece arşive eklenir.
+        print(f"⏭️  [TRİAJ] LLM atlandı ({reason}): {html.unescape(data.headline)}")
+        live_writer.add(news_to_dict(data))
+        return decision, assets
+    metrics.inc("news_relevant_total")
+    return decision, assets
+
+async def analyze_news_on_arrival(data):
+    """
+    NewsDataStream işleyicisi: haberi önce ucuz ön filtreden geçirir, sonra sadece analiz kuyruğuna koyar;
+    böylece websocket okuyucusu yavaş bir Gemini çağrısı yüzünden hiç durmaz.
+    """
+    decision, assets = prefilter_news(data)
+    if decision != "pass":
+        return
+    ensure_workers_started()
+    if analysis_queue.full():
+        print(f"⚠️ Analiz kuyruğu dolu ({analysis_queue.qsize()}), yer açılması bekleniyor...")
+    await analysis_queue.put((data, time.monotonic(), assets))
+
+# Anlık değerler her /metrics okumasında hesaplanır.
+metrics.gauge("analysis_queue_depth", "Analiz kuyruğunda bekleyen haber sayısı", lambda: queued_news_count())
+metrics.gauge("telegram_queue_depth", "Telegram kuyruğunda bekleyen mesaj sayısı", telegram.pending)
+metrics.gauge("write_behind_pending", "Diske/veritabanına yazılmayı bekleyen canlı haber sayısı", live_writer.pending)
+metrics.gauge("analysis_cache_hit_ratio", "Analiz önbelleği isabet oranı", analysis_cache.hit_rate)
+metrics.gauge("translation_cache_hit_ratio", "Çeviri önbelleği isabet oranı", translator.hit_rate)
+metrics.gauge("embedding_cache_hit_ratio", "Embedding önbelleği isabet oranı", lambda: runtime.embeddings.stats()["hit_rate"])
+metrics.gauge("rag_degraded", "Vektör veritabanı henüz hazır değilse 1 (bağlamsız analiz)", lambda: int(runtime.degraded))
+
+
+# --- 7. ANA UYGULAMAYI BAŞLATMA ---
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
+    startup_timer.mark("importlar ve modül kurulumu", time.perf_counter() - STARTUP_ORIGIN)
+    # API anahtarı eksikse akışa abone olmadan hemen dur.
+    get_gemini_api_key()
+    runtime.start()
+    start_metrics_server()
+    # Alarm anında fiyat çekmemek için tüm takip edilen varlıkların fiyatları arka planda güncel tutulur.
+    get_price_service().start()
     news_stream = NewsDataStream(ALPACA_API_KEY, ALPACA_SECRET_KEY)
     news_stream.subscribe_news(analyze_news_on_arrival, '*')
+    startup_timer.mark("haber akışına abone olundu")
     print(f"--- CANLI HABER ANALİZ SİSTEMİ AKTİF ---")
     print(f"İzleme Listesi: {list(SYMBOL_WATCHLIST)}")
-    news_stream.run()
+    try:
+        news_stream.run()
+    finally:
+        # Kapanışta tamponda bekleyen haberler kaybolmasın.
+        print("Kapanış: bekleyen canlı haberler diske yazılıyor...")
+        live_writer.flush()
+        # Akışın olay döngüsü kapandığı için kuyrukta kalan alarmlar senkron gönderilir.
+        if telegram.pending():
+            print(f"Kapanış: kuyruktaki {telegram.pending()} Telegram mesajı gönderiliyor...")
+            abandoned = telegram.flush_sync(config.TELEGRAM_SHUTDOWN_TIMEOUT_SECONDS)
+            if abandoned:
+                print(f"UYARI: {abandoned} Telegram mesajı {config.TELEGRAM_SHUTDOWN_TIMEOUT_SECONDS} sn içinde "
+                      f"gönderilemeden kapanıldı.")
+        print(telegram.stats_line())
+        print(metrics.stats_line())
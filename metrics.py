@@ -0,0 +1,424 @@
+# metrics.py
+
+import sys
+import json
+import time
+import bisect
+import asyncio
+import threading
+import contextvars
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import config
+
+# Sayaç adı -> açıklama. Canlı hattın her haber için geçtiği adımlar.
+COUNTERS = {
+    "news_received_total": "Akıştan gelen haber sayısı",
+    "news_relevant_total": "Ön filtreyi geçip analiz kuyruğuna giren haber sayısı",
+    "news_dropped_total": "Ön filtrede elenen haber sayısı (aşamaya göre)",
+    "news_analyzed_total": "Analizi tamamlanan haber sayısı (önbellekten gelenler dahil)",
+    "news_alarmed_total": "Alarm gönderilen haber sayısı",
+    "news_failed_total": "Analizi hata ile biten haber sayısı",
+    "llm_calls_total": "Yapılan LLM çağrısı sayısı",
+    "llm_early_stops_total": "Skorlar alarm kriterlerini karşılamadığı için erken durdurulan LLM üretimi sayısı",
+    "llm_output_chars_total": "LLM'den okunan çıktı karakteri sayısı",
+    "analysis_cache_hits_total": "Önceki analizi yeniden kullanılan haber sayısı (eşleşme türüne göre)",
+    "telegram_messages_total": "Telegram'a gönderilen mesaj sayısı (sonuca göre)",
+}
+
+# Analiz edilen haberin aşama süreleri bu context değişkeninde toplanır (JSON log satırı için).
+_trace = contextvars.ContextVar("metrics_trace", default=None)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Histogram:
+    """Prometheus uyumlu sabit kovalı histogram; yüzdelikler için son 1000 gözlemi de tutar."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=1000)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def summary(self):
+        values = list(self.recent)
+        return {"count": self.count, "sum": self.sum, "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95), "p99": _percentile(values, 99)}
+
+
+class MetricsRegistry:
+    """
+    Canlı hattın sayaçlarını, aşama süresi histogramlarını ve anlık değer (gauge) fonksiyonlarını tutar.
+    Tüm işlemler thread-safe'tir; aşamalar hem olay döngüsünden hem de `asyncio.to_thread` thread'lerinden ölçülür.
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = buckets or config.METRICS_LATENCY_BUCKETS
+        self.started_at = time.time()
+        self._counters = defaultdict(float)
+        self._stages = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._json_log = None
+        self._json_lock = threading.Lock()
+
+    # --- Kayıt ---
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, _labels(labels))] += amount
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        trace = _trace.get()
+        if trace is not None:
+            trace["stages"][stage] = round(trace["stages"].get(stage, 0.0) + seconds, 6)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        """Senkron veya asenkron fonksiyonun her çağrısını `stage` aşaması olarak ölçen dekoratör."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def timed_async(*args, **kwargs):
+                    with self.timer(stage):
+                        return await func(*args, **kwargs)
+                return timed_async
+
+            @wraps(func)
+            def timed_sync(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return timed_sync
+        return decorator
+
+    def gauge(self, name, help_text, func):
+        """Her okumada `func()` ile hesaplanan anlık değeri (kuyruk doluluğu, isabet oranı vb.) kaydeder."""
+        self._gauges[name] = (help_text, func)
+
+    # --- Haber başına iz (JSON log) ---
+    def start_trace(self, **fields):
+        """Bu görevde (ve başlattığı thread'lerde) ölçülen aşama sürelerini tek bir kayıtta toplamaya başlar."""
+        trace = {"stages": {}, **fields}
+        _trace.set(trace)
+        return trace
+
+    def finish_trace(self, trace, **fields):
+        _trace.set(None)
+        trace.update(fields)
+        self.log_json({"event": "news", **trace})
+
+    # --- Okuma ---
+    def _gauge_values(self):
+        values = {}
+        for name, (_, func) in list(self._gauges.items()):
+            try:
+                values[name] = float(func())
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self):
+        """Tüm metrikleri JSON'a çevrilebilir bir sözlük olarak döndürür."""
+        with self._lock:
+            counters = defaultdict(dict)
+            for (name, labels), value in self._counters.items():
+                counters[name][",".join(f"{k}={v}" for k, v in labels) or "total"] = value
+            stages = {stage: h.summary() for stage, h in self._stages.items()}
+        return {"uptime_seconds": round(time.time() - self.started_at, 1), "counters": dict(counters),
+                "stages": stages, "gauges": self._gauge_values()}
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            by_name = defaultdict(list)
+            for (name, labels), value in self._counters.items():
+                by_name[name].append((labels, value))
+            for name in sorted(by_name):
+                lines.append(f"# HELP {name} {COUNTERS.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(by_name[name]):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+            lines.append("# HELP news_stage_seconds Canlı hattın aşama süreleri")
+            lines.append("# TYPE news_stage_seconds histogram")
+            for stage in sorted(self._stages):
+                histogram = self._stages[stage]
+                labels = (("stage", stage),)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"news_stage_seconds_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"news_stage_seconds_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"news_stage_seconds_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"news_stage_seconds_count{_format_labels(labels)} {histogram.count}")
+
+        for name, value in sorted(self._gauge_values().items()):
+            lines.append(f"# HELP {name} {self._gauges[name][0]}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def stats_line(self):
+        """Konsol için kısa özet: en yavaş aşamaların p50/p95 süreleri."""
+        stages = self.snapshot()["stages"]
+        slowest = sorted(stages.items(), key=lambda item: item[1]["p95"], reverse=True)[:6]
+        parts = [f"{stage} p50 {s['p50'] * 1000:.0f}/p95 {s['p95'] * 1000:.0f} ms" for stage, s in slowest]
+        return "Aşama süreleri: " + (" | ".join(parts) if parts else "henüz ölçüm yok")
+
+    # --- JSON log ---
+    def log_json(self, record):
+        """`config.METRICS_JSON_LOG_PATH` ayarlıysa kaydı tek satırlık JSON olarak yazar."""
+        path = config.METRICS_JSON_LOG_PATH
+        if not path:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), **record}, ensure_ascii=False, default=str)
+        with self._json_lock:
+            if path == "-":
+                sys.stdout.write(line + "\n")
+                sys.stdout.flush()
+                return
+            if self._json_log is None:
+                self._json_log = open(path, "a", encoding="utf-8")
+            self._json_log.write(line + "\n")
+            self._json_log.flush()
+
+    def start_json_snapshots(self, interval=None):
+        """JSON log açıksa tüm metriklerin özetini periyodik olarak log'a yazan thread'i başlatır."""
+        if not config.METRICS_JSON_LOG_PATH:
+            return None
+        interval = interval or config.METRICS_JSON_SNAPSHOT_SECONDS
+
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.log_json({"event": "snapshot", **self.snapshot()})
+
+        thread = threading.Thread(target=run, name="metrics-json-log", daemon=True)
+        thread.start()
+        return thread
+
+
+# --- Örnekleyici profiler ---
+# Yığının en üstünde bunlar varsa thread boşta bekliyordur (kuyruk, olay döngüsü, soket); örnek sayılmaz.
+# ThreadPoolExecutor'ın `_worker` çerçevesi en üstteyse thread işsizdir (C seviyesinde kuyruk bekliyordur).
+_IDLE_FUNCTIONS = frozenset({"select", "poll", "wait", "_wait_for_tstate_lock", "accept", "serve_forever", "_worker"})
+
+
+class SamplingProfiler:
+    """
+    Çalışan süreçteki tüm thread'lerin Python yığınlarını `interval` aralıkla örnekleyen hafif profiler.
+    Ek bağımlılık gerektirmez ve kodu değiştirmeden açılıp kapatılabilir; boşta bekleyen thread'ler sayılmaz.
+    Sonuç: en çok örneklenen fonksiyonlar (kendi ve kapsayıcı süre) ve flamegraph için 'collapsed' yığınlar.
+    """
+
+    def __init__(self, interval=None, max_seconds=None):
+        self.interval = interval or config.PROFILER_SAMPLE_INTERVAL_SECONDS
+        self.max_seconds = max_seconds or config.PROFILER_MAX_SECONDS
+        self._stacks = Counter()
+        self._samples = 0
+        self._started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Profil isteğini bekleyen HTTP thread'i gibi ölçümün kendisine ait thread'ler.
+        self.ignored_threads = set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self._samples = 0
+            self._started_at = time.monotonic()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.report()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if time.monotonic() - self._started_at > self.max_seconds:
+                break
+            self._samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or thread_id in self.ignored_threads or frame.f_code.co_name in _IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    key = (code.co_filename, code.co_name, code.co_firstlineno)
+                    label = names.get(key)
+                    if label is None:
+                        label = names[key] = f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                self._stacks[tuple(reversed(stack))] += 1
+
+    def report(self, top=25):
+        """Profil oturumunun metin raporunu döndürür."""
+        stacks = dict(self._stacks)
+        busy = sum(stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        elapsed = (time.monotonic() - self._started_at) if self._started_at else 0.0
+        lines = [f"--- PROFİL: {elapsed:.1f} sn, {self._samples} örnekleme, {busy} meşgul thread örneği ---",
+                 f"{'kendi':>7} {'kapsayıcı':>10}  fonksiyon"]
+        for label, count in own.most_common(top):
+            lines.append(f"{count / busy * 100 if busy else 0:6.1f}% {inclusive[label] / busy * 100 if busy else 0:9.1f}%  {label}")
+        return "\n".join(lines) + "\n"
+
+    def collapsed(self):
+        """flamegraph.pl / speedscope ile açılabilecek 'collapsed stack' formatı."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self._stacks.most_common())
+
+
+# --- HTTP uç noktası ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        registry, profiler = self.server.registry, self.server.profiler
+        if url.path == "/metrics":
+            self._reply(200, registry.render_prometheus(), "text/plain; version=0.0.4")
+        elif url.path == "/metrics.json":
+            self._reply(200, json.dumps(registry.snapshot(), ensure_ascii=False, indent=2), "application/json")
+        elif url.path == "/profile/start":
+            started = profiler.start()
+            self._reply(200 if started else 409, "Profil başlatıldı.\n" if started else "Profil zaten çalışıyor.\n")
+        elif url.path == "/profile/stop":
+            profiler.stop()
+            collapsed = query.get("format", [""])[0] == "collapsed"
+            self._reply(200, profiler.collapsed() if collapsed else profiler.report())
+        elif url.path == "/profile":
+            # Tek istekle belirli bir süre profil al: /profile?seconds=10
+            seconds = min(float(query.get("seconds", ["10"])[0]), profiler.max_seconds)
+            if not profiler.start():
+                self._reply(409, "Profil zaten çalışıyor.\n")
+                return
+            profiler.ignored_threads.add(threading.get_ident())
+            try:
+                time.sleep(seconds)
+            finally:
+                profiler.ignored_threads.discard(threading.get_ident())
+            profiler.stop()
+            collapsed = query.get("format", [""])[0] == "collapsed"
+            self._reply(200, profiler.collapsed() if collapsed else profiler.report())
+        else:
+            self._reply(404, "Uç noktalar: /metrics, /metrics.json, /profile?seconds=N, /profile/start, /profile/stop\n")
+
+    def _reply(self, status, text, content_type="text/plain; charset=utf-8"):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Metrikleri ve profiler'ı yerel bir HTTP adresinde yayınlar (Prometheus scrape hedefi olarak kullanılabilir)."""
+
+    def __init__(self, registry, host=None, port=None, profiler=None):
+        self.server = ThreadingHTTPServer((host or config.METRICS_HOST, config.METRICS_PORT if port is None else port),
+                                          _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.registry = registry
+        self.server.profiler = profiler or SamplingProfiler()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+_registry = MetricsRegistry()
+_server = None
+_started = False
+
+
+def get_metrics():
+    """Uygulama genelinde paylaşılan MetricsRegistry örneğini döndürür."""
+    return _registry
+
+
+def start_metrics_server():
+    """`config.METRICS_PORT` ayarlıysa HTTP uç noktasını (bir kez) başlatır; port kullanılıyorsa uyarı verip devam eder."""
+    global _server, _started
+    if _started:
+        return _server
+    _started = True
+    if config.METRICS_PORT is not None:
+        try:
+            _server = MetricsServer(_registry).start()
+            print(f"📈 Metrikler: {_server.url}/metrics | profil: {_server.url}/profile?seconds=10")
+        except OSError as e:
+            print(f"UYARI: Metrik sunucusu başlatılamadı ({config.METRICS_HOST}:{config.METRICS_PORT}). Hata: {e}")
+    _registry.start_json_snapshots()
+    return _server
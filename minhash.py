@@ -0,0 +1,210 @@
+# minhash.py
+
+import re
+import html
+import hashlib
+import numpy as np
+
+# Evrensel hash fonksiyonları için 2^32'nin altındaki en büyük asal; a*x+b uint64'e taşmadan sığar.
+_PRIME = np.uint64(4294967291)
+_MAX_HASH = np.uint32(0xFFFFFFFF)
+_TOKEN_RE = re.compile(r"[a-z0-9$%]+(?:[.,][0-9]+)*")
+# Haber başlıklarında anlam taşımayan, yeniden yayınlarda eklenip çıkarılan kelimeler.
+_STOPWORDS = frozenset({"a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "at", "by", "with",
+                        "is", "are", "as", "from", "says", "said", "report", "reports", "update", "breaking"})
+
+
+def normalize_headline(text):
+    """Başlığı karşılaştırma için normalleştirir: HTML, büyük/küçük harf, noktalama ve gereksiz kelimeler."""
+    tokens = _TOKEN_RE.findall(html.unescape(str(text or "")).lower())
+    return " ".join(t for t in tokens if t not in _STOPWORDS)
+
+
+def shingles(text, k=2):
+    """
+    Normalleştirilmiş metnin kelimelerini ve k kelimelik parçalarını (shingle) küme olarak döndürür.
+    Tek kelimeler kelime sırası değişen kopyaları, k'lı parçalar ise sırayı yakalar.
+    """
+    tokens = normalize_headline(text).split()
+    items = set(tokens)
+    items.update(" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1))
+    return items
+
+
+def _hash_shingles(items):
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in items),
+        dtype=np.uint64, count=len(items)
+    )
+
+
+class MinHasher:
+    """
+    Metinler için MinHash imzası üretir. İki imzanın eşit bileşen oranı, metinlerin shingle
+    kümeleri arasındaki Jaccard benzerliğinin tahminidir. Tüm permütasyonlar NumPy ile tek seferde hesaplanır.
+    """
+
+    def __init__(self, num_perm=64, shingle_size=2, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        items = shingles(text, self.shingle_size)
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = _hash_shingles(list(items))
+        # (shingle sayısı, num_perm) boyutunda permütasyon matrisi; her sütunun minimumu imzayı verir.
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts, chunk_size=50000, perm_block=8):
+        """
+        Birden fazla metnin imzasını (len(texts), num_perm) boyutunda bir matris olarak döndürür; sonuç `signature`
+        ile birebir aynıdır. Tüm metinlerin shingle hash'leri tek bir dizide toplanır (her farklı shingle bir kez
+        hash'lenir) ve her permütasyon bloğunun satır minimumları `np.minimum.reduceat` ile tek seferde alınır.
+        """
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        hash_cache = {}
+        for start in range(0, len(texts), chunk_size):
+            flat, lengths = [], []
+            for text in texts[start:start + chunk_size]:
+                items = shingles(text, self.shingle_size)
+                lengths.append(len(items))
+                for item in items:
+                    value = hash_cache.get(item)
+                    if value is None:
+                        value = hash_cache[item] = int.from_bytes(
+                            hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "little")
+                    flat.append(value)
+            lengths = np.asarray(lengths)
+            block = result[start:start + len(lengths)]
+            block[:] = _MAX_HASH
+            nonempty = lengths > 0
+            if not flat:
+                continue
+            hashes = np.asarray(flat, dtype=np.uint64)
+            offsets = np.concatenate(([0], np.cumsum(lengths[nonempty])[:-1]))
+            for p in range(0, self.num_perm, perm_block):
+                permuted = (hashes[:, None] * self._a[p:p + perm_block] + self._b[p:p + perm_block]) % _PRIME
+                block[nonempty, p:p + perm_block] = np.minimum.reduceat(permuted, offsets, axis=0)
+        return result
+
+
+def estimate_jaccard(sig_a, sig_b):
+    return float(np.mean(sig_a == sig_b))
+
+
+def number_tokens(text):
+    """Normalleştirilmiş metindeki rakam içeren kelimeler. "50 baz puan" / "25 baz puan" gibi başlıkları ayırmak için."""
+    return frozenset(token for token in normalize_headline(text).split() if any(ch.isdigit() for ch in token))
+
+
+def near_duplicate_pairs(signatures, threshold, order=None, window=None, max_neighbors=16):
+    """
+    İmza matrisindeki (n, num_perm) yakın kopya çiftlerini, tüm satırları birbirleriyle karşılaştırmadan bulur.
+    İmza `lsh_params` ile bantlara bölünür; her bantta aynı kovaya düşen satırlar `order` (ör. zaman) sırasına
+    dizilir ve her satır kendinden sonraki en fazla `max_neighbors` satırla, aralarındaki `order` farkı
+    `window`'u geçmiyorsa karşılaştırılır. Tahmini Jaccard benzerliği eşiği geçen (i, j, benzerlik) dizilerini döndürür.
+    """
+    n, num_perm = signatures.shape
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    order = np.arange(n, dtype=np.float64) if order is None else np.asarray(order, dtype=np.float64)
+    bands, rows = lsh_params(num_perm, threshold)
+    left, right = [], []
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(np.dtype((np.void, 4 * rows)))
+        _, bucket = np.unique(keys.ravel(), return_inverse=True)
+        sorted_idx = np.lexsort((order, bucket))
+        sorted_bucket, sorted_order = bucket[sorted_idx], order[sorted_idx]
+        for step in range(1, min(max_neighbors, n - 1) + 1):
+            same = sorted_bucket[step:] == sorted_bucket[:-step]
+            if window is not None:
+                same &= (sorted_order[step:] - sorted_order[:-step]) <= window
+            if not same.any():
+                break
+            left.append(sorted_idx[:-step][same])
+            right.append(sorted_idx[step:][same])
+    if not left:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    left, right = np.concatenate(left), np.concatenate(right)
+    pairs = np.unique(np.stack([np.minimum(left, right), np.maximum(left, right)], axis=1), axis=0)
+    i, j = pairs[:, 0], pairs[:, 1]
+    similarity = (signatures[i] == signatures[j]).mean(axis=1)
+    keep = similarity >= threshold
+    return i[keep], j[keep], similarity[keep]
+
+
+def lsh_params(num_perm, threshold):
+    """Verilen benzerlik eşiğine en yakın (bant, satır) ikilisini seçer; eşik ≈ (1/bant)^(1/satır)."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashLSH:
+    """
+    MinHash imzaları için bantlı LSH indeksi. İmza `bands` parçaya bölünür; en az bir bandı
+    aynı olan kayıtlar aday sayılır. Böylece benzer başlıklar tüm kayıtlarla karşılaştırılmadan bulunur.
+    """
+
+    def __init__(self, num_perm=64, threshold=0.6):
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self._buckets = [dict() for _ in range(self.bands)]
+        self._signatures = {}
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def insert(self, key, signature):
+        if key in self._signatures:
+            self.remove(key)
+        self._signatures[key] = signature
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del bucket[band_key]
+
+    def candidates(self, signature):
+        found = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            found.update(bucket.get(band_key, ()))
+        return found
+
+    def query(self, signature, threshold=None):
+        """Tahmini Jaccard benzerliği eşiği geçen kayıtları (anahtar, benzerlik) olarak, en benzerden başlayarak döndürür."""
+        threshold = self.threshold if threshold is None else threshold
+        matches = []
+        for key in self.candidates(signature):
+            similarity = estimate_jaccard(signature, self._signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
@@ -0,0 +1,488 @@
+# mmap_store.py
+"""
+Küçük sunucular için kompakt, yerel vektör deposu (`config.VECTOR_BACKEND = "mmap"`).
+
+Chroma her vektörü float32 olarak ve ayrıca HNSW indeksiyle tutar; bellek ve disk arşivle doğrusal büyür.
+Bu depo vektörleri kuantize edip (float16: boyut başına 2 bayt, int8: 1 bayt + satır ölçeği) tek bir
+düz dosyada saklar ve bellek eşlemeli (np.memmap) açar: açılış neredeyse anlıktır, işletim sistemi sadece
+aramada dokunulan sayfaları belleğe alır.
+
+    vectors.bin       satır satır kuantize vektörler (sadece sona ekleme)
+    rows.bin          her satırın publish_ts, ölçek ve norm² değeri (zaman filtresi için ayrı tutulur)
+    metadata.sqlite3  satır -> ID, metin, metadata; canlı ID'ler ve silinmiş (ölü) satırlar
+
+Güncellenen bir ID için yeni satır eklenir, eskisi ölü olarak işaretlenir. Arama, L2 mesafesiyle (Chroma'nın
+varsayılanı) bloklar halinde kesin (tam tarama) yapılır; zaman filtresi önce rows.bin'e uygulanır ve sadece
+eşleşen satırların vektörleri okunur. langchain VectorStore arayüzü (similarity, MMR, `k`/`fetch_k`)
+uygulandığı için retriever'lar Chroma ile aynı şekilde çalışır.
+
+Kullanım: python mmap_store.py import    (mevcut Chroma vektörlerini yeniden embed etmeden aktarır)
+          python mmap_store.py report    (aynı korpus üzerinde Chroma'ya karşı recall raporu)
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+import config
+from vector_partitions import publish_ts_bounds
+
+VECTORS_FILE = "vectors.bin"
+ROWS_FILE = "rows.bin"
+METADATA_FILE = "metadata.sqlite3"
+ROW_DTYPE = np.dtype([('ts', '<i8'), ('scale', '<f4'), ('norm2', '<f4')])
+# Tam taramada tek seferde çarpılan satır sayısı. Küçük bloklar önbellekte kalır; 768 boyutta geçici float32
+# kopyası ~12 MB'tır (65536 satırlık blok hem ~200 MB bellek ister hem de daha yavaştır).
+_SEARCH_BLOCK = 4096
+# SQLite'ın tek sorgudaki parametre sınırının altında kalır.
+_SQL_BATCH = 900
+
+
+def store_exists(path=None):
+    """Verilen klasörde kayıt içeren bir mmap deposu var mı?"""
+    metadata_path = os.path.join(path or config.MMAP_STORE_DIR, METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        return False
+    with sqlite3.connect(metadata_path) as db:
+        try:
+            return db.execute("SELECT COUNT(*) FROM live").fetchone()[0] > 0
+        except sqlite3.Error:
+            return False
+
+
+def _batches(values):
+    values = list(values)
+    for i in range(0, len(values), _SQL_BATCH):
+        yield values[i:i + _SQL_BATCH]
+
+
+class MmapVectorStore(VectorStore):
+    """Kuantize, bellek eşlemeli vektör deposu. Bkz. modül açıklaması."""
+
+    def __init__(self, embedding_function, path=None, dtype=None):
+        self._embeddings = embedding_function
+        self.path = path or config.MMAP_STORE_DIR
+        os.makedirs(self.path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(self.path, METADATA_FILE), check_same_thread=False)
+        # Çok süreçli modda analiz süreçleri okurken yazıcı süreç ekleme yapabilir.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS rows "
+                             "(row INTEGER PRIMARY KEY, id TEXT NOT NULL, document TEXT, metadata TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS live (id TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS dead (row INTEGER PRIMARY KEY)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        settings = dict(self._db.execute("SELECT key, value FROM settings"))
+        # Depo tipi ve boyutu ilk yazmada sabitlenir; sonradan config değişse de mevcut dosya okunabilir kalır.
+        self.dtype = settings.get("dtype") or dtype or config.MMAP_STORE_DTYPE
+        if self.dtype not in ("float16", "int8"):
+            raise ValueError(f"Desteklenmeyen mmap vektör tipi: {self.dtype}")
+        self.dim = int(settings["dim"]) if "dim" in settings else None
+        # Satır sayısı SQLite'tan okunur; yarıda kalmış bir yazmanın dosya sonundaki artıkları yok sayılır.
+        self._count = self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+        self._alive = np.ones(self._count, dtype=bool)
+        dead = [row for (row,) in self._db.execute("SELECT row FROM dead")]
+        self._alive[dead] = False
+        self._vectors = self._rows = None
+        self._remap()
+
+    @property
+    def embeddings(self):
+        return self._embeddings
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _remap(self):
+        if not self._count or self.dim is None:
+            self._vectors = np.zeros((0, self.dim or 0), dtype=self.dtype)
+            self._rows = np.zeros(0, dtype=ROW_DTYPE)
+            return
+        self._vectors = np.memmap(self._file(VECTORS_FILE), dtype=self.dtype, mode='r', shape=(self._count, self.dim))
+        self._rows = np.memmap(self._file(ROWS_FILE), dtype=ROW_DTYPE, mode='r', shape=(self._count,))
+
+    def count(self):
+        return int(self._alive.sum())
+
+    # --- Yazma ---
+
+    def _quantize(self, vectors):
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    def _dequantize(self, vectors, rows):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dtype == "int8":
+            vectors *= rows['scale'][:, None]
+        return vectors
+
+    def _append(self, name, array, start):
+        path = self._file(name)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            offset = start * array.dtype.itemsize * (array.shape[1] if array.ndim > 1 else 1)
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    def _live_rows(self, ids):
+        found = {}
+        for batch in _batches(ids):
+            query = f"SELECT id, row FROM live WHERE id IN ({','.join('?' * len(batch))})"
+            found.update(self._db.execute(query, batch))
+        return found
+
+    def upsert_vectors(self, ids, vectors, texts, metadatas):
+        """Kayıtları dosyaların sonuna ekler; ID'si zaten varsa eski satır ölü olarak işaretlenir."""
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with self._db:
+                    self._db.executemany("INSERT OR REPLACE INTO settings VALUES (?, ?)",
+                                         [("dim", str(self.dim)), ("dtype", self.dtype)])
+            quantized, scales = self._quantize(vectors)
+            rows = np.zeros(len(ids), dtype=ROW_DTYPE)
+            rows['ts'] = [int((metadata or {}).get('publish_ts') or 0) for metadata in metadatas]
+            rows['scale'] = scales
+            # Mesafe, aramada okunacak (kuantize) vektörle tutarlı olsun diye norm geri çözülmüş vektörden hesaplanır.
+            rows['norm2'] = (self._dequantize(quantized, rows) ** 2).sum(axis=1)
+
+            start = self._count
+            self._append(VECTORS_FILE, quantized, start)
+            self._append(ROWS_FILE, rows, start)
+
+            new_rows = {}
+            for offset, doc_id in enumerate(ids):
+                new_rows[doc_id] = start + offset
+            replaced = set(self._live_rows(new_rows).values())
+            # Aynı pakette tekrarlanan ID'lerin sadece son satırı canlı kalır.
+            replaced.update(start + offset for offset, doc_id in enumerate(ids) if new_rows[doc_id] != start + offset)
+            with self._db:
+                self._db.executemany("INSERT INTO rows VALUES (?, ?, ?, ?)", [
+                    (start + offset, doc_id, text, json.dumps(metadata or {}, ensure_ascii=False))
+                    for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))])
+                self._db.executemany("INSERT OR REPLACE INTO live VALUES (?, ?)", new_rows.items())
+                self._db.executemany("INSERT OR IGNORE INTO dead VALUES (?)", [(row,) for row in replaced])
+
+            alive = np.ones(start + len(ids), dtype=bool)
+            alive[:start] = self._alive
+            alive[list(replaced)] = False
+            self._alive, self._count = alive, start + len(ids)
+            self._remap()
+
+    def update_metadatas(self, ids, metadatas):
+        """Vektörlere dokunmadan metadata'yı (ve zaman filtresi için publish_ts'i) yerinde günceller."""
+        with self._lock:
+            live = self._live_rows(ids)
+            updates = [(doc_id, metadata) for doc_id, metadata in zip(ids, metadatas) if doc_id in live]
+            if not updates:
+                return
+            with self._db:
+                self._db.executemany("UPDATE rows SET metadata = ? WHERE row = ?", [
+                    (json.dumps(metadata or {}, ensure_ascii=False), live[doc_id]) for doc_id, metadata in updates])
+            rows = np.memmap(self._file(ROWS_FILE), dtype=ROW_DTYPE, mode='r+', shape=(self._count,))
+            for doc_id, metadata in updates:
+                rows['ts'][live[doc_id]] = int((metadata or {}).get('publish_ts') or 0)
+            rows.flush()
+            del rows
+
+    def delete(self, ids=None, **kwargs):
+        with self._lock:
+            live = self._live_rows(ids or [])
+            if not live:
+                return
+            with self._db:
+                self._db.executemany("DELETE FROM live WHERE id = ?", [(doc_id,) for doc_id in live])
+                self._db.executemany("INSERT OR IGNORE INTO dead VALUES (?)", [(row,) for row in live.values()])
+            self._alive[list(live.values())] = False
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        self.upsert_vectors(ids, self._embeddings.embed_documents(texts), texts, metadatas)
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        store = cls(embedding, path=kwargs.get("path"))
+        store.add_texts(texts, metadatas, kwargs.get("ids"))
+        return store
+
+    # --- Okuma ---
+
+    def _snapshot(self):
+        with self._lock:
+            return self._count, self._vectors, self._rows, self._alive
+
+    @staticmethod
+    def _bounds(where):
+        start, end = publish_ts_bounds(where)
+        conditions = where.get("$and", [where]) if where else []
+        if any(set(condition) != {"publish_ts"} for condition in conditions):
+            raise ValueError(f"mmap deposu sadece publish_ts zaman filtresini destekler: {where}")
+        return start, end
+
+    def _matching(self, rows, alive, lo, hi, start, end):
+        keep = alive[lo:hi]
+        if start is not None or end is not None:
+            ts = rows['ts'][lo:hi]
+            if start is not None:
+                keep = keep & (ts >= start)
+            if end is not None:
+                keep = keep & (ts < end)
+        return keep
+
+    def _nearest(self, vector, n, where):
+        """Filtreye uyan canlı satırlardan sorguya en yakın `n` tanesi: (satırlar, L2² mesafeler)."""
+        start, end = self._bounds(where)
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm2 = float(query @ query)
+        count, vectors, rows, alive = self._snapshot()
+        found_rows, found_distances = [], []
+        for lo in range(0, count, _SEARCH_BLOCK):
+            hi = min(lo + _SEARCH_BLOCK, count)
+            keep = self._matching(rows, alive, lo, hi, start, end)
+            if keep.all():
+                index = np.arange(lo, hi)
+                block = vectors[lo:hi]
+            else:
+                index = np.flatnonzero(keep) + lo
+                if not len(index):
+                    continue
+                # Sadece eşleşen satırlar okunur; dokunulmayan sayfalar belleğe hiç alınmaz.
+                block = vectors[index]
+            block_rows = rows[index]
+            distances = block_rows['norm2'] - 2.0 * (self._dequantize(block, block_rows) @ query) + query_norm2
+            if len(distances) > n:
+                top = np.argpartition(distances, n)[:n]
+                index, distances = index[top], distances[top]
+            found_rows.append(index)
+            found_distances.append(distances)
+        if not found_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        index, distances = np.concatenate(found_rows), np.concatenate(found_distances)
+        order = np.argsort(distances, kind='stable')[:n]
+        return index[order], distances[order]
+
+    def _records(self, rows):
+        records = {}
+        with self._lock:
+            for batch in _batches(int(row) for row in rows):
+                query = f"SELECT row, id, document, metadata FROM rows WHERE row IN ({','.join('?' * len(batch))})"
+                for row, doc_id, text, metadata in self._db.execute(query, batch):
+                    records[row] = (doc_id, text, json.loads(metadata) if metadata else {})
+        return [records[int(row)] for row in rows]
+
+    def _documents(self, rows):
+        return [Document(page_content=text or "", metadata=metadata, id=doc_id)
+                for doc_id, text, metadata in self._records(rows)]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        rows, _ = self._nearest(embedding, k, filter)
+        return self._documents(rows)
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector(self._embeddings.embed_query(query), k, filter)
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, filter=None,
+                                                **kwargs):
+        rows, _ = self._nearest(embedding, fetch_k, filter)
+        if not len(rows):
+            return []
+        _, vectors, row_info, _ = self._snapshot()
+        candidates = self._dequantize(vectors[rows], row_info[rows])
+        selected = maximal_marginal_relevance(np.array(embedding, dtype=np.float32), list(candidates),
+                                              k=k, lambda_mult=lambda_mult)
+        # langchain_chroma gibi seçilenleri aday (mesafe) sırasıyla döndürür.
+        return self._documents(rows[sorted(selected)])
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(self._embeddings.embed_query(query), k, fetch_k,
+                                                            lambda_mult, filter)
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        """Chroma `get` ile aynı biçimde sonuç döndürür (embeddings geri çözülmüş float32 olarak)."""
+        include = include or ["metadatas", "documents"]
+        count, vectors, row_info, alive = self._snapshot()
+        if ids is not None:
+            with self._lock:
+                live = self._live_rows(ids)
+            rows = np.array([live[doc_id] for doc_id in ids if doc_id in live], dtype=np.int64)
+        else:
+            start, end = self._bounds(where)
+            rows = np.flatnonzero(self._matching(row_info, alive, 0, count, start, end))
+        rows = rows[(offset or 0):]
+        if limit is not None:
+            rows = rows[:limit]
+        records = self._records(rows)
+        result = {"ids": [doc_id for doc_id, _, _ in records]}
+        if "documents" in include:
+            result["documents"] = [text for _, text, _ in records]
+        if "metadatas" in include:
+            result["metadatas"] = [metadata for _, _, metadata in records]
+        if "embeddings" in include:
+            result["embeddings"] = self._dequantize(vectors[rows], row_info[rows]) if len(rows) else []
+        return result
+
+    def iter_collections(self, since=None):
+        """RecencyIndex.load için: bu depo Chroma koleksiyonu gibi `get(where, include, limit, offset)` sunar."""
+        yield self
+
+    def disk_bytes(self):
+        return sum(os.path.getsize(self._file(name)) for name in os.listdir(self.path))
+
+
+# --- Chroma'dan aktarma ve recall raporu ---
+
+def _chroma_collections(store):
+    """Tek koleksiyonlu Chroma veya bölümlü veritabanının koleksiyonları."""
+    if hasattr(store, "partitions"):
+        return [store.collection(key) for key in store.partitions()]
+    return [store._collection]
+
+
+def _iter_pages(collection, include, page_size=5000):
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def import_from_chroma(chroma_store, store):
+    """Chroma'daki vektörleri yeniden embed etmeden mmap deposuna aktarır. Aktarılan kayıt sayısını döndürür."""
+    imported = 0
+    for collection in _chroma_collections(chroma_store):
+        for page in _iter_pages(collection, ["embeddings", "documents", "metadatas"]):
+            store.upsert_vectors(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+            imported += len(page["ids"])
+            print(f"  {imported} vektör aktarıldı...")
+    return imported
+
+
+def _exact_neighbors(collections, queries, n):
+    """Float32 Chroma vektörleri üzerinde kesin (tam tarama) en yakın `n` ID; recall için referans."""
+    query_norm2 = (queries ** 2).sum(axis=1)[:, None]
+    best_ids = np.empty((len(queries), 0), dtype=object)
+    best_distances = np.empty((len(queries), 0), dtype=np.float32)
+    for collection in collections:
+        for page in _iter_pages(collection, ["embeddings"]):
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            distances = (vectors ** 2).sum(axis=1)[None, :] - 2.0 * queries @ vectors.T + query_norm2
+            ids = np.broadcast_to(np.array(page["ids"], dtype=object), distances.shape)
+            best_ids = np.concatenate([best_ids, ids], axis=1)
+            best_distances = np.concatenate([best_distances, distances], axis=1)
+            if best_distances.shape[1] > n:
+                top = np.argpartition(best_distances, n, axis=1)[:, :n]
+                best_ids = np.take_along_axis(best_ids, top, axis=1)
+                best_distances = np.take_along_axis(best_distances, top, axis=1)
+    order = np.argsort(best_distances, axis=1)
+    return np.take_along_axis(best_ids, order, axis=1)
+
+
+def recall_report(chroma_store, store, queries=200, k=None, fetch_k=20, seed=0):
+    """
+    Aynı korpus üzerinde mmap deposunu Chroma ile karşılaştırır. Sorgu olarak korpustan rastgele seçilen haberlerin
+    vektörleri kullanılır ve haberin kendisi sonuçlardan çıkarılır (leave-one-out). Referans, float32 vektörler
+    üzerinde kesin aramadır; Chroma'nın HNSW sonuçları da aynı referansla ölçülür. MMR seçimi birbirine çok
+    yakın skorlar arasında yapıldığından kuantizasyonun küçük sayısal farklarına duyarlıdır; aday kümesi aynı
+    olsa bile MMR ortak sonuç oranı benzerlik recall'undan düşük çıkar.
+    """
+    k = k or config.RETRIEVER_K
+    collections = _chroma_collections(chroma_store)
+    all_ids = store.get(include=["metadatas"])["ids"]
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(all_ids), size=min(queries, len(all_ids)), replace=False)
+    query_ids = [all_ids[i] for i in picked]
+    # Sorgular kuantize değil, Chroma'daki float32 vektörlerdir (canlıdaki embed_query çıktısı gibi).
+    exact_source = {}
+    for collection in collections:
+        found = collection.get(ids=query_ids, include=["embeddings"])
+        exact_source.update(zip(found["ids"], found["embeddings"]))
+    query_ids = [doc_id for doc_id in query_ids if doc_id in exact_source]
+    query_vectors = np.asarray([exact_source[doc_id] for doc_id in query_ids], dtype=np.float32)
+    truth = _exact_neighbors(collections, query_vectors, k + 1)
+    chroma_kwargs = {"widen": True} if hasattr(chroma_store, "partitions") else {}
+
+    def top_ids(search, vector, doc_id, **kwargs):
+        return [doc.id for doc in search(vector.tolist(), **kwargs) if doc.id != doc_id][:k]
+
+    totals = {"mmap_recall": 0.0, "chroma_recall": 0.0, "overlap": 0.0, "mmr_overlap": 0.0,
+              "mmap_seconds": 0.0, "chroma_seconds": 0.0}
+    for doc_id, vector, expected in zip(query_ids, query_vectors, truth):
+        expected = set([i for i in expected if i != doc_id][:k])
+        started = time.perf_counter()
+        mmap_ids = top_ids(store.similarity_search_by_vector, vector, doc_id, k=k + 1)
+        totals["mmap_seconds"] += time.perf_counter() - started
+        started = time.perf_counter()
+        chroma_ids = top_ids(chroma_store.similarity_search_by_vector, vector, doc_id, k=k + 1, **chroma_kwargs)
+        totals["chroma_seconds"] += time.perf_counter() - started
+        totals["mmap_recall"] += len(expected & set(mmap_ids)) / k
+        totals["chroma_recall"] += len(expected & set(chroma_ids)) / k
+        totals["overlap"] += len(set(mmap_ids) & set(chroma_ids)) / k
+        mmr_mmap = top_ids(store.max_marginal_relevance_search_by_vector, vector, doc_id, k=k, fetch_k=fetch_k)
+        mmr_chroma = top_ids(chroma_store.max_marginal_relevance_search_by_vector, vector, doc_id, k=k,
+                             fetch_k=fetch_k, **chroma_kwargs)
+        totals["mmr_overlap"] += len(set(mmr_mmap) & set(mmr_chroma)) / max(len(mmr_chroma), 1)
+
+    report = {name: value / max(len(query_ids), 1) for name, value in totals.items()}
+    report.update({"queries": len(query_ids), "k": k, "fetch_k": fetch_k, "dtype": store.dtype,
+                   "vectors": store.count(), "mmap_bytes": store.disk_bytes()})
+    return report
+
+
+def format_report(report, chroma_bytes=None):
+    lines = [
+        f"--- MMAP ({report['dtype']}) vs CHROMA RECALL RAPORU: {report['vectors']} vektör, "
+        f"{report['queries']} sorgu, k={report['k']} ---",
+        f"  recall@{report['k']} (kesin float32 aramaya göre): mmap %{report['mmap_recall'] * 100:.1f} | "
+        f"chroma %{report['chroma_recall'] * 100:.1f}",
+        f"  mmap-chroma ortak sonuç: %{report['overlap'] * 100:.1f} | MMR (fetch_k={report['fetch_k']}) ortak sonuç: "
+        f"%{report['mmr_overlap'] * 100:.1f}",
+        f"  ortalama sorgu süresi: mmap {report['mmap_seconds'] * 1000:.1f} ms | "
+        f"chroma {report['chroma_seconds'] * 1000:.1f} ms",
+    ]
+    disk = f"  disk: mmap {report['mmap_bytes'] / 1e6:.1f} MB"
+    if chroma_bytes:
+        disk += f" | chroma {chroma_bytes / 1e6:.1f} MB"
+    lines.append(disk)
+    return "\n".join(lines)
+
+
+def _directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from embedding_cache import create_embeddings
+    from vector_partitions import open_store
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    embeddings = create_embeddings(os.getenv("GEMINI_API_KEY"))
+    chroma_store = open_store(embeddings, backend="chroma")
+    started = time.perf_counter()
+    mmap_store = MmapVectorStore(embeddings)
+    print(f"mmap deposu {(time.perf_counter() - started) * 1000:.0f} ms içinde açıldı ({mmap_store.count()} vektör).")
+    if command == "import":
+        print(f"Chroma'dan toplam {import_from_chroma(chroma_store, mmap_store)} vektör aktarıldı.")
+    elif command == "report":
+        print(format_report(recall_report(chroma_store, mmap_store), _directory_bytes(config.CHROMA_DB_PATH)))
+    else:
+        sys.exit(__doc__)
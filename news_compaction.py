@@ -0,0 +1,153 @@
+# news_compaction.py
+"""
+Ana arşivdeki yakın kopya haberleri (farklı kaynaklarda başlığı, özeti veya saati biraz değiştirilerek yeniden
+yayınlanan aynı hikaye) tek kayda indirir. Kopyalar hem embedding/disk maliyeti yaratır hem de retriever'ın
+MMR ile seçtiği ilk 10 bağlam dökümanını aynı hikayenin tekrarlarıyla doldurur.
+
+1. Her haberin başlık + özet metninden MinHash imzası çıkarılır (minhash.MinHasher, toplu hesaplama).
+2. LSH bantlarıyla aday çiftler bulunur; sadece `COMPACTION_WINDOW_HOURS` içinde yayınlanmış ve
+   başlıklarındaki sayılar aynı olan çiftler kopya sayılır.
+3. Çiftler birleşim-bul (union-find) ile kümelenir. Her kümeden en erken yayınlanan haber kalır; sembolleri
+   ve kaynakları kümenin tamamının birleşimiyle güncellenir, diğerleri silinir.
+
+Kullanım: python news_compaction.py            (sadece rapor, arşive dokunmaz)
+          python news_compaction.py --apply    (arşivi sıkıştırır; ardından vektör veritabanı yeniden oluşturulmalı)
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+import config
+import knowledge_store
+from minhash import MinHasher, near_duplicate_pairs, number_tokens
+
+COMPACTION_COLUMNS = ['id', 'timestamp', 'headline', 'summary', 'source', 'symbols']
+
+
+def _cluster_roots(n, left, right):
+    """Birleşim-bul: her satır için bulunduğu kümenin en küçük satır numarasını döndürür."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(left.tolist(), right.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.fromiter((find(x) for x in range(n)), dtype=np.int64, count=n)
+
+
+def _epoch_seconds(timestamps):
+    parsed = pd.to_datetime(timestamps, utc=True, errors='coerce', format='mixed')
+    return ((parsed - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).fillna(0).to_numpy(dtype=np.float64)
+
+
+def find_duplicate_clusters(df, threshold=None, window_hours=None, num_perm=None, max_neighbors=None):
+    """
+    `headline`, `summary` ve `timestamp` sütunları olan tablodaki her satırın küme numarasını döndürür
+    (kümedeki en küçük satır konumu; kopyası olmayan satırlar kendi konumunu alır).
+    """
+    threshold = threshold or config.COMPACTION_SIMILARITY
+    window_hours = window_hours or config.COMPACTION_WINDOW_HOURS
+    num_perm = num_perm or config.COMPACTION_NUM_PERM
+    max_neighbors = max_neighbors or config.COMPACTION_MAX_NEIGHBORS
+
+    headlines = df['headline'].fillna('').astype(str)
+    texts = (headlines + ' ' + df['summary'].fillna('').astype(str)).tolist()
+    signatures = MinHasher(num_perm=num_perm).signatures(texts)
+    left, right, _ = near_duplicate_pairs(signatures, threshold, order=_epoch_seconds(df['timestamp']),
+                                          window=window_hours * 3600, max_neighbors=max_neighbors)
+
+    # "Fed 25 baz puan indirdi" / "Fed 50 baz puan indirdi" gibi sadece sayısı farklı başlıklar ayrı kalır.
+    headline_list = headlines.tolist()
+    numbers = {}
+    for row in np.union1d(left, right).tolist():
+        numbers[row] = number_tokens(headline_list[row])
+    same_numbers = np.fromiter((numbers[a] == numbers[b] for a, b in zip(left.tolist(), right.tolist())),
+                               dtype=bool, count=len(left))
+    return _cluster_roots(len(df), left[same_numbers], right[same_numbers])
+
+
+def plan_compaction(df, **kwargs):
+    """
+    Arşiv tablosu için sıkıştırma planı üretir, tabloya dokunmaz.
+    Dönüş: {"drop_ids": silinecek ID'ler, "updates": {kalan ID: (birleşik semboller, birleşik kaynak)}, "report": {...}}
+    """
+    start = time.monotonic()
+    df = df.reset_index(drop=True)
+    ids = pd.to_numeric(df['id'], errors='coerce')
+    labels = find_duplicate_clusters(df, **kwargs)
+    sizes = np.bincount(labels, minlength=len(df))
+    in_cluster = sizes[labels] > 1
+
+    members = pd.DataFrame({
+        'label': labels, 'id': ids, 'ts': _epoch_seconds(df['timestamp']),
+        'summary_length': df['summary'].fillna('').astype(str).str.len(),
+        'source': df['source'].fillna('').astype(str), 'symbols': df['symbols'],
+    })[in_cluster].dropna(subset=['id'])
+    # Kümeden en erken yayınlanan (eşitlikte özeti en uzun) haber kalır; birleşik semboller de bu sırayla dizilir.
+    members = members.sort_values(['label', 'ts', 'summary_length'], ascending=[True, True, False])
+    canonical = members.groupby('label', sort=False).head(1)
+
+    updates = {}
+    for label, group in members.groupby('label', sort=False):
+        symbols = list(dict.fromkeys(s for value in group['symbols'] for s in knowledge_store.parse_symbols(value)))
+        sources = ",".join(dict.fromkeys(s for s in group['source'] if s))
+        updates[int(group['id'].iloc[0])] = (symbols, sources)
+    drop_ids = set(members['id'].astype('int64')) - set(canonical['id'].astype('int64'))
+
+    removed = len(drop_ids)
+    report = {
+        "rows": len(df), "clusters": len(updates), "clustered_rows": int(in_cluster.sum()), "removed": removed,
+        "remaining": len(df) - removed, "ratio": removed / len(df) if len(df) else 0.0,
+        "seconds": time.monotonic() - start,
+    }
+    return {"drop_ids": drop_ids, "updates": updates, "report": report}
+
+
+def _apply_plan(plan):
+    drop_ids, updates = plan["drop_ids"], plan["updates"]
+
+    def compact(df):
+        ids = pd.to_numeric(df['id'], errors='coerce')
+        result = df[~ids.isin(drop_ids)].copy()
+        ids = ids[result.index]
+        updated = ids.isin(updates)
+        if updated.any():
+            new_values = ids[updated].astype('int64').map(updates)
+            symbols = new_values.map(lambda value: value[0])
+            if not knowledge_store.use_parquet():
+                symbols = symbols.map(",".join)
+            result.loc[updated, 'symbols'] = symbols
+            result.loc[updated, 'source'] = new_values.map(lambda value: value[1])
+            # Satır sayısı değişmese de birleşik sembol/kaynak yazılmalı (bkz. knowledge_store.map_partitions).
+            result.attrs["modified"] = True
+        return result
+
+    return compact
+
+
+def format_report(report):
+    return (f"Yakın kopya sıkıştırma: {report['rows']} haber, {report['clusters']} kopya kümesi "
+            f"({report['clustered_rows']} haber) -> {report['removed']} kayıt birleştirildi, {report['remaining']} kaldı | "
+            f"sıkıştırma oranı %{report['ratio'] * 100:.1f} | {report['seconds']:.1f} sn")
+
+
+def compact_knowledge_base(apply=True, **kwargs):
+    """Tüm arşivi okuyup yakın kopyaları bulur; `apply` ise arşivi bölüm bölüm yeniden yazar. Raporu döndürür."""
+    df = knowledge_store.read_knowledge_base(columns=COMPACTION_COLUMNS)
+    plan = plan_compaction(df, **kwargs)
+    print(format_report(plan["report"]))
+    if apply and plan["drop_ids"]:
+        before, after = knowledge_store.map_partitions(_apply_plan(plan))
+        print(f"Arşiv sıkıştırıldı: {before} -> {after} haber.")
+    return plan["report"]
+
+
+if __name__ == '__main__':
+    compact_knowledge_base(apply='--apply' in sys.argv)
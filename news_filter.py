@@ -0,0 +1,179 @@
+# news_filter.py
+
+import re
+import html
+import config
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+# "8%", "12.5 %", "$50,000", "$2B" gibi yüzde ya da dolar tutarları.
+_NUMERIC_MOVE_RE = re.compile(r"\d+(?:[.,]\d+)?\s?%|\$\s?\d")
+
+
+def canonical_symbol(symbol):
+    """'BTC/USD', 'BTCUSD' ve 'BTC' gibi yazımları tek bir varlık adına ('BTC') indirger."""
+    symbol = str(symbol).strip().upper()
+    if symbol.endswith("/USD"):
+        return symbol[:-4]
+    if symbol.endswith("USD") and len(symbol) > 3:
+        return symbol[:-3]
+    return symbol
+
+
+def build_alias_index(symbols):
+    """Takip edilen her sembol yazımını kanonik varlık adına eşleyen sözlüğü kurar (O(1) arama için)."""
+    return {str(s).strip().upper(): canonical_symbol(s) for s in symbols}
+
+
+# Başlangıçta bir kez hesaplanır: 'BTC/USD', 'BTC', 'BTCUSD' -> 'BTC', 'SPY' -> 'SPY' ...
+ALIAS_INDEX = build_alias_index(config.SYMBOLS_TO_TRACK)
+TRACKED_ASSETS = frozenset(ALIAS_INDEX.values())
+
+
+def tracked_assets(symbols):
+    """Haberin sembol listesinden takip edilen kanonik varlıkları (küme olarak) döndürür."""
+    if not symbols:
+        return set()
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    return {ALIAS_INDEX[s] for s in (str(x).strip().upper() for x in symbols) if s in ALIAS_INDEX}
+
+
+def _compile_keywords(weights):
+    """
+    Anahtarları üç gruba ayırır: tek kelimelikler küme aramasıyla, "*" ile bitenler kelime başıyla (kök),
+    çok kelimelikler alt metin aramasıyla eşleştirilir.
+    """
+    words = {k.lower(): w for k, w in weights.items() if " " not in k and not k.endswith("*")}
+    stems = {k.lower(): w for k, w in weights.items() if " " not in k and k.endswith("*")}
+    phrases = {k.lower(): w for k, w in weights.items() if " " in k}
+    return words, stems, phrases
+
+
+class NewsPrefilter:
+    """
+    LLM çağrısından önce çalışan iki aşamalı ucuz filtre.
+    1. Sembol aşaması: haberin sembolleri alias indeksinden geçirilir. Takip edilen varlık yoksa
+       haber ancak makro anahtar kelime içeriyorsa (CPI, FOMC vb.) devam eder.
+    2. Triaj aşaması: anahtar kelime ve kaynak ağırlıklarından bir puan hesaplanır; puanı
+       TRIAGE_MIN_SCORE altında kalan haberler alarm üretemeyeceği için LLM'e gönderilmez.
+    Her aşamanın elediği haber sayısı sayaçlarda tutulur.
+    """
+
+    def __init__(self):
+        self.keyword_weights = {k.lower(): w for k, w in config.TRIAGE_KEYWORD_WEIGHTS.items()}
+        self.keyword_groups = _compile_keywords(self.keyword_weights)
+        self.macro_groups = _compile_keywords({k: 1 for k in config.TRIAGE_MACRO_KEYWORDS})
+        self.source_weights = {k.lower(): v for k, v in config.TRIAGE_SOURCE_WEIGHTS.items()}
+        self.counters = {"received": 0, "dropped_symbol": 0, "dropped_triage": 0, "passed": 0}
+
+    @staticmethod
+    def _match(text, groups):
+        words, stems, phrases = groups
+        tokens = set(_WORD_RE.findall(text))
+        hits = [t for t in tokens if t in words]
+        # Bir kök, başlıkta kaç çekimi geçerse geçsin bir kez sayılır.
+        hits += [k for k in stems if any(t.startswith(k[:-1]) for t in tokens)]
+        hits += [k for k in phrases if k in text]
+        return hits
+
+    def score(self, headline, source=None, assets=()):
+        """Başlığın LLM'e gönderilmeye değer olup olmadığını gösteren triaj puanını ve eşleşen kelimeleri döndürür."""
+        text = html.unescape(str(headline or "")).lower()
+        hits = self._match(text, self.keyword_groups)
+        score = sum(self.keyword_weights[k] for k in hits)
+        score += self.source_weights.get(str(source or "").lower(), 0)
+        if assets:
+            score += config.TRIAGE_ASSET_BONUS
+            # Varlık + yüzde/dolar tutarı: hareketin yönü kelime listesinde olmasa da LLM'e gitmeli.
+            if _NUMERIC_MOVE_RE.search(text):
+                score += config.TRIAGE_NUMERIC_MOVE_BONUS
+                hits.append("%/$ hareket")
+        return score, hits
+
+    def evaluate(self, headline, symbols, source=None):
+        """
+        Haberi iki aşamadan geçirir. Dönüş: (karar, kanonik varlıklar, puan, açıklama)
+        karar: "drop_symbol", "drop_triage" veya "pass".
+        """
+        self.counters["received"] += 1
+        assets = tracked_assets(symbols)
+        text = html.unescape(str(headline or "")).lower()
+        if not assets and not self._match(text, self.macro_groups):
+            self.counters["dropped_symbol"] += 1
+            return "drop_symbol", assets, 0, "takip edilen sembol veya makro anahtar kelime yok"
+
+        score, hits = self.score(headline, source, assets)
+        if score < config.TRIAGE_MIN_SCORE:
+            self.counters["dropped_triage"] += 1
+            return "drop_triage", assets, score, f"triaj puanı {score} < {config.TRIAGE_MIN_SCORE}"
+
+        self.counters["passed"] += 1
+        return "pass", assets, score, ", ".join(hits)
+
+    def stats_line(self):
+        c = self.counters
+        return (f"Ön filtre: {c['received']} haber | sembol aşaması eledi: {c['dropped_symbol']} | "
+                f"triaj eledi: {c['dropped_triage']} | LLM'e giden: {c['passed']}")
+
+
+# Alarm üretmesi beklenen, takip edilen varlıkla ilgili ama makro/katalizör kelimesi içermeyen başlıklar.
+# Triaj ağırlıkları değiştirildiğinde `python news_filter.py` ile hepsinin LLM'e gittiği kontrol edilir.
+TRIAGE_REGRESSION_HEADLINES = [
+    ("Bitcoin plunges 15% to $60,000 as liquidations hit $2B", ["BTC/USD"]),
+    ("Ethereum crashes after major exchange collapse", ["ETH/USD"]),
+    ("Bitcoin Hits All-Time High", ["BTC/USD"]),
+    ("Solana could rally 30%", ["SOL/USD"]),
+    ("XRP soars after court ruling", ["XRP/USD"]),
+    ("Bitcoin ETF sees record outflows as price tumbles", ["BTC/USD"]),
+    ("Bitcoin falls 8%", ["BTC/USD"]),
+    ("Bitcoin drops below $50,000", ["BTC/USD"]),
+    ("Ether jumps 12% as traders pile in", ["ETH/USD"]),
+    ("Bitcoin sinks 10%", ["BTC/USD"]),
+    ("Spot Ether ETFs begin trading", ["ETH/USD"]),
+    ("Israel attacks Iran nuclear sites", []),
+    ("Missiles strike Kyiv", []),
+]
+# LLM'e gitmemesi gereken gürültü başlıkları.
+TRIAGE_NOISE_HEADLINES = [
+    ("Bitcoin price prediction: could BTC reach $100,000?", ["BTC/USD"]),
+    ("Top gainers and losers this week: SOL, XRP", ["SOL/USD", "XRP/USD"]),
+    ("How to stake Ethereum", ["ETH/USD"]),
+    ("Celebrity launches fashion line", []),
+]
+
+
+def unweighted_macro_keywords():
+    """TRIAGE_KEYWORD_WEIGHTS içinde pozitif ağırlığı olmayan makro anahtar kelimeler."""
+    weights = {k.lower(): w for k, w in config.TRIAGE_KEYWORD_WEIGHTS.items()}
+    return [k for k in config.TRIAGE_MACRO_KEYWORDS if weights.get(k.lower(), 0) <= 0]
+
+
+def check_triage(headlines=None, expect_pass=True):
+    """
+    Örnek başlıklardan beklenenin tersi karar alanları (başlık, puan, açıklama) listesi olarak döndürür:
+    `expect_pass` ise elenenler, değilse LLM'e gidenler.
+    """
+    prefilter = NewsPrefilter()
+    wrong = []
+    for headline, symbols in headlines or TRIAGE_REGRESSION_HEADLINES:
+        decision, _, score, reason = prefilter.evaluate(headline, symbols)
+        if (decision == "pass") != expect_pass:
+            wrong.append((headline, score, reason))
+    return wrong
+
+
+if __name__ == '__main__':
+    failures = 0
+    for headline, score, reason in check_triage():
+        print(f"HATA: '{headline}' elendi ({reason}).")
+        failures += 1
+    for headline, score, reason in check_triage(TRIAGE_NOISE_HEADLINES, expect_pass=False):
+        print(f"HATA: gürültü başlığı '{headline}' LLM'e gidiyor (puan {score}: {reason}).")
+        failures += 1
+    for keyword in unweighted_macro_keywords():
+        print(f"HATA: makro anahtar kelime '{keyword}' TRIAGE_KEYWORD_WEIGHTS içinde pozitif ağırlıklı değil.")
+        failures += 1
+    if failures:
+        raise SystemExit(1)
+    print(f"Triaj kontrolü: {len(TRIAGE_REGRESSION_HEADLINES)} başlığın hepsi LLM'e gidiyor, "
+          f"{len(TRIAGE_NOISE_HEADLINES)} gürültü başlığı eleniyor.")
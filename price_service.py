@@ -0,0 +1,132 @@
+# price_service.py
+
+import os
+import json
+import time
+import threading
+import config
+from news_filter import TRACKED_ASSETS
+from metrics import get_metrics
+
+metrics = get_metrics()
+
+
+class PriceService:
+    """
+    Takip edilen tüm varlıkların (BTC, ETH, SOL, XRP, BNB, SPY, QQQ) son fiyatlarını arka planda
+    tutan uzun ömürlü servis. Tek bir BinanceClient (ve hisseler için tek bir Alpaca istemcisi)
+    oluşturulur; fiyatlar PRICE_POLL_SECONDS aralıklarla tek istekte toplu olarak güncellenir.
+    Alarm kodu `get_price` ile anlık görüntüyü ağ çağrısı yapmadan O(1) okur; PRICE_STALE_SECONDS'tan
+    eski fiyatlar bayat sayılır ve kullanılmaz.
+    """
+
+    def __init__(self, assets=None, poll_seconds=None, stale_seconds=None):
+        assets = sorted(assets or TRACKED_ASSETS)
+        self.equity_assets = [a for a in assets if a in config.PRICE_EQUITY_ASSETS]
+        self.crypto_assets = [a for a in assets if a not in config.PRICE_EQUITY_ASSETS]
+        self.poll_seconds = poll_seconds or config.PRICE_POLL_SECONDS
+        self.stale_seconds = stale_seconds or config.PRICE_STALE_SECONDS
+        # varlık -> (fiyat, güncellenme zamanı). Sözlük ataması atomik olduğu için okumada kilit gerekmez.
+        self._snapshot = {}
+        self._binance = None
+        self._alpaca = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = 0
+
+    # --- İstemciler (bir kez oluşturulur, yeniden kullanılır) ---
+    def _binance_client(self):
+        if self._binance is None:
+            from binance.client import Client as BinanceClient
+            self._binance = BinanceClient()
+        return self._binance
+
+    def _alpaca_client(self):
+        if self._alpaca is None:
+            api_key = os.getenv(config.ALPACA_API_KEY_ENV)
+            secret_key = os.getenv(config.ALPACA_SECRET_KEY_ENV)
+            if not api_key or not secret_key:
+                return None
+            from alpaca.data.historical import StockHistoricalDataClient
+            self._alpaca = StockHistoricalDataClient(api_key, secret_key)
+        return self._alpaca
+
+    # --- Güncelleme ---
+    def _refresh_crypto(self):
+        if not self.crypto_assets:
+            return
+        pairs = {f"{asset}{config.PRICE_QUOTE_CURRENCY}": asset for asset in self.crypto_assets}
+        # Tüm pariteler tek bir istekte çekilir.
+        tickers = self._binance_client().get_symbol_ticker(symbols=json.dumps(list(pairs), separators=(',', ':')))
+        now = time.monotonic()
+        for ticker in tickers:
+            asset = pairs.get(ticker['symbol'])
+            if asset:
+                self._snapshot[asset] = (float(ticker['price']), now)
+
+    def _refresh_equities(self):
+        if not self.equity_assets:
+            return
+        client = self._alpaca_client()
+        if client is None:
+            return
+        from alpaca.data.requests import StockLatestTradeRequest
+        trades = client.get_stock_latest_trade(StockLatestTradeRequest(symbol_or_symbols=self.equity_assets))
+        now = time.monotonic()
+        for asset, trade in trades.items():
+            self._snapshot[asset] = (float(trade.price), now)
+
+    def refresh(self):
+        """Tüm fiyatları bir kez günceller. Bir kaynak hata verirse diğeri yine güncellenir."""
+        for refresh_fn in (self._refresh_crypto, self._refresh_equities):
+            try:
+                with metrics.timer(f"price{refresh_fn.__name__}"):
+                    refresh_fn()
+            except Exception as e:
+                self.errors += 1
+                print(f"UYARI: Fiyatlar güncellenemedi ({refresh_fn.__name__}). Hata: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """Arka plan güncelleme thread'ini başlatır (birden fazla çağrılması güvenlidir)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="price-service", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Okuma ---
+    def get_price(self, asset):
+        """Varlığın taze fiyatını döndürür; fiyat yoksa veya bayatsa None döner. Ağ çağrısı yapmaz."""
+        entry = self._snapshot.get(asset)
+        if entry is None:
+            return None
+        price, updated_at = entry
+        if time.monotonic() - updated_at > self.stale_seconds:
+            return None
+        return price
+
+    def format_price(self, asset):
+        price = self.get_price(asset)
+        return f"${price:,.2f}" if price is not None else "Price N/A"
+
+
+_service = None
+
+
+def get_price_service():
+    """Uygulama genelinde paylaşılan PriceService örneğini döndürür."""
+    global _service
+    if _service is None:
+        _service = PriceService()
+    return _service
@@ -0,0 +1,76 @@
+# rate_limiter.py
+
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket hız sınırlayıcı.
+    Saniyede `rate` jeton dolar, en fazla `capacity` jeton birikir. Her istek harcadığı kadar jeton alır;
+    jeton yoksa `acquire` yeterli jeton birikene kadar bekler. Sabit `time.sleep` yerine, API kotasına
+    tam oturan bir akış sağlar ve aynı kovayı paylaşan tüm thread/görevler kotayı birlikte tüketir.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("HATA: TokenBucket için rate pozitif olmalı.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, capacity=None):
+        """Dakikadaki istek sayısıyla tanımlanan kotalar için kısayol."""
+        return cls(requests_per_minute / 60.0, capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def _reserve(self, tokens):
+        """Jeton varsa düşer ve 0 döner; yoksa beklenmesi gereken süreyi (saniye) döndürür."""
+        tokens = min(float(tokens), self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens=1):
+        """Beklemeden jeton almayı dener. Başarılıysa True döner."""
+        return self._reserve(tokens) == 0.0
+
+    def acquire(self, tokens=1):
+        """Yeterli jeton birikene kadar thread'i bekletir. Toplam bekleme süresini döndürür."""
+        waited = 0.0
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens=1):
+        """`acquire`'ın asyncio sürümü; olay döngüsünü bloklamadan bekler."""
+        waited = 0.0
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds):
+        """
+        Sunucu açıkça beklememizi istediğinde (ör. HTTP 429 / retry_after) kovayı boşaltır,
+        böylece kovayı paylaşan diğer işçiler de o süre boyunca istek atmaz.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
@@ -0,0 +1,205 @@
+# recency_index.py
+
+import time
+import threading
+from typing import Any, List
+import numpy as np
+from langchain.docstore.document import Document
+from langchain_core.retrievers import BaseRetriever
+import config
+
+
+def publish_ts_filter(start=None, end=None):
+    """Chroma sorguları için `publish_ts` (epoch saniye) üzerinde zaman aralığı filtresi üretir."""
+    conditions = []
+    if start is not None:
+        conditions.append({"publish_ts": {"$gte": int(start)}})
+    if end is not None:
+        conditions.append({"publish_ts": {"$lt": int(end)}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+class RecencyIndex:
+    """
+    Son `days` günün vektörlerini tek, bitişik bir NumPy matrisinde tutan bellek içi indeks.
+    Arama tek bir matris-vektör çarpımıyla yapılır; kosinüs benzerliği, yarılanma süresi
+    `half_life_hours` olan bir yakınlık (recency) puanıyla harmanlanır:
+        skor = (1 - w) * benzerlik + w * 0.5 ** (yaş_saat / yarılanma)
+    Canlı eklenen haberler matrise yerinde eklenir (kapasite doldukça iki katına çıkar);
+    pencerenin dışına düşen satırlar periyodik olarak atılır.
+    """
+
+    def __init__(self, days=None, half_life_hours=None, recency_weight=None, initial_capacity=1024):
+        self.days = days or config.HOT_INDEX_DAYS
+        self.half_life_hours = half_life_hours or config.HOT_INDEX_HALF_LIFE_HOURS
+        self.recency_weight = recency_weight if recency_weight is not None else config.HOT_INDEX_RECENCY_WEIGHT
+        self._capacity = initial_capacity
+        self._matrix = None
+        self._ts = np.zeros(initial_capacity, dtype=np.int64)
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._row_by_id = {}
+        self._size = 0
+        self._lock = threading.RLock()
+        self._last_prune = time.time()
+
+    def __len__(self):
+        return self._size
+
+    def _cutoff(self, now=None):
+        return int((now or time.time()) - self.days * 86400)
+
+    # --- Yükleme ve ekleme ---
+    def load(self, vector_store, page_size=5000):
+        """Son `days` günün vektörlerini Chroma'dan sayfa sayfa okuyup indekse yükler. Yüklenen kayıt sayısını döndürür."""
+        start = time.time()
+        cutoff = self._cutoff()
+        where = publish_ts_filter(start=cutoff)
+        # Bölümlü veritabanında sadece pencereyle kesişen dönem koleksiyonları okunur.
+        if hasattr(vector_store, "iter_collections"):
+            collections = vector_store.iter_collections(since=cutoff)
+        else:
+            collections = [vector_store._collection]
+        for collection in collections:
+            offset = 0
+            while True:
+                page = collection.get(where=where, include=["embeddings", "documents", "metadatas"],
+                                      limit=page_size, offset=offset)
+                if not page['ids']:
+                    break
+                self.add(page['ids'], page['embeddings'], page['documents'], page['metadatas'])
+                offset += len(page['ids'])
+        print(f"Sıcak indeks: son {self.days} günün {self._size} vektörü {time.time() - start:.1f} sn içinde belleğe yüklendi.")
+        return self._size
+
+    def _grow(self, needed, dim):
+        if self._matrix is None:
+            self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+        if needed <= self._capacity:
+            return
+        while self._capacity < needed:
+            self._capacity *= 2
+        matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ts = np.zeros(self._capacity, dtype=np.int64)
+        ts[:self._size] = self._ts[:self._size]
+        self._matrix, self._ts = matrix, ts
+
+    def add(self, ids, vectors, texts, metadatas):
+        """Vektörleri indekse ekler; aynı ID zaten varsa o satırı yerinde günceller. Pencere dışındakiler atlanır."""
+        if len(ids) == 0:
+            return 0
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        cutoff = self._cutoff()
+        added = 0
+        with self._lock:
+            self._grow(self._size + len(ids), vectors.shape[1])
+            for doc_id, vector, text, metadata in zip(ids, vectors, texts, metadatas):
+                metadata = metadata or {}
+                ts = int(metadata.get('publish_ts') or 0)
+                if ts < cutoff:
+                    continue
+                row = self._row_by_id.get(doc_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._row_by_id[doc_id] = row
+                    self._ids.append(doc_id)
+                    self._texts.append(text)
+                    self._metadatas.append(metadata)
+                else:
+                    self._texts[row] = text
+                    self._metadatas[row] = metadata
+                self._matrix[row] = vector
+                self._ts[row] = ts
+                added += 1
+            if time.time() - self._last_prune > 3600:
+                self.prune()
+        return added
+
+    def prune(self):
+        """Pencerenin dışına düşen satırları matristen atar."""
+        with self._lock:
+            self._last_prune = time.time()
+            keep = np.flatnonzero(self._ts[:self._size] >= self._cutoff())
+            if len(keep) == self._size:
+                return 0
+            removed = self._size - len(keep)
+            self._matrix[:len(keep)] = self._matrix[keep]
+            self._ts[:len(keep)] = self._ts[keep]
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._row_by_id = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._size = len(keep)
+            return removed
+
+    # --- Arama ---
+    def search(self, query_vector, k=10, since=None, now=None):
+        """
+        Sorgu vektörüne en yakın `k` dökümanı, yakınlık puanıyla harmanlanmış skora göre döndürür.
+        Dönüş: [(Document, benzerlik, skor), ...]. `since` (epoch saniye) verilirse daha eski haberler elenir.
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        now = now or time.time()
+        with self._lock:
+            if self._size == 0:
+                return []
+            similarities = self._matrix[:self._size] @ query
+            age_hours = np.maximum(now - self._ts[:self._size], 0) / 3600.0
+            decay = np.power(0.5, age_hours / self.half_life_hours)
+            scores = (1.0 - self.recency_weight) * similarities + self.recency_weight * decay
+            if since is not None:
+                scores = np.where(self._ts[:self._size] >= since, scores, -np.inf)
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (Document(page_content=self._texts[i], metadata=self._metadatas[i]), float(similarities[i]), float(scores[i]))
+                for i in top if np.isfinite(scores[i])
+            ]
+
+
+class HotRetriever(BaseRetriever):
+    """
+    Önce sıcak indeksi arayan, yeterince benzer sonuç bulamazsa veya istenen zaman ufku indeksin
+    penceresinden uzunsa tüm Chroma koleksiyonuna (MMR) başvuran retriever.
+    `invoke(query, horizon_days=...)` ile zaman ufku sorgu başına verilebilir.
+    """
+
+    index: Any
+    vector_store: Any
+    k: int = 10
+    min_similarity: float = 0.0
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, horizon_days=None) -> List[Document]:
+        vector = self.vector_store.embeddings.embed_query(query)
+        return self.search_by_vector(vector, horizon_days=horizon_days)
+
+    def search_by_vector(self, vector, horizon_days=None):
+        since = time.time() - horizon_days * 86400 if horizon_days else None
+        if horizon_days and horizon_days > self.index.days:
+            # Uzun vadeli sorgu: sıcak indeks yetmez, tüm koleksiyon zaman filtresiyle aranır.
+            return self._full_store_search(vector, self.k, since)
+
+        hits = [doc for doc, similarity, _ in self.index.search(vector, self.k, since=since)
+                if similarity >= self.min_similarity]
+        if len(hits) >= self.k:
+            return hits
+
+        # Sıcak indekste yeterli benzer haber yoksa eksik kalanlar tüm koleksiyondan tamamlanır.
+        seen = {doc.metadata.get('news_id') for doc in hits}
+        for doc in self._full_store_search(vector, self.k, since):
+            if len(hits) >= self.k:
+                break
+            if doc.metadata.get('news_id') not in seen:
+                hits.append(doc)
+        return hits
+
+    def _full_store_search(self, vector, k, since=None):
+        where = publish_ts_filter(start=since)
+        return self.vector_store.max_marginal_relevance_search_by_vector(vector, k=k, filter=where)
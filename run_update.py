@@ -4,25 +4,37 @@
 # Diğer betiklerimizdeki ana fonksiyonları import ediyoruz
 from collect_data import collect_historical_news
 from update_database import update_and_build_databases
+import sys
 import time
+import config
 
-def main():
+def main(pipeline=None, full_rebuild=False):
     """
     Tüm veri toplama ve veritabanı oluşturma sürecini baştan sona yönetir.
+    Pipeline modunda (varsayılan: config.UPDATE_PIPELINE_ENABLED) toplama, temizleme ve embed aşamaları
+    eşzamanlı çalışır; tam yeniden oluşturma her zaman sıralı modda yapılır.
     """
+    if pipeline is None:
+        pipeline = config.UPDATE_PIPELINE_ENABLED
     start_time = time.time()
     
     print("="*50)
     print("ORKESTRA ŞEFİ: Geçmiş Veri Toplama ve Veritabanı Kurulum Süreci Başlatıldı")
     print("="*50)
     
-    # 1. Adım: Alpaca'dan geçmiş verileri topla ve geçici dosyaya yaz.
-    print("\n--- ADIM 1: Veri Toplama Başlatılıyor ---")
-    collect_historical_news()
-    
-    # 2. Adım: Toplanan verileri işle ve ana veritabanlarını oluştur/güncelle.
-    print("\n--- ADIM 2: Veritabanı Oluşturma/Güncelleme Başlatılıyor ---")
-    update_and_build_databases()
+    if pipeline and not full_rebuild:
+        # Toplanan her pencere beklemeden temizlenip embed edilir (bkz. update_pipeline.py).
+        print("\n--- Veri Toplama + Veritabanı Güncelleme (pipeline modu) Başlatılıyor ---")
+        from update_pipeline import run_pipeline
+        run_pipeline()
+    else:
+        # 1. Adım: Alpaca'dan geçmiş verileri topla ve geçici dosyaya yaz.
+        print("\n--- ADIM 1: Veri Toplama Başlatılıyor ---")
+        collect_historical_news()
+        
+        # 2. Adım: Toplanan verileri işle ve ana veritabanlarını oluştur/güncelle.
+        print("\n--- ADIM 2: Veritabanı Oluşturma/Güncelleme Başlatılıyor ---")
+        update_and_build_databases(full_rebuild=full_rebuild)
     
     end_time = time.time()
     print("\n" + "="*50)
@@ -30,4 +42,5 @@ def main():
     print("="*50)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    # python run_update.py [--sequential] [--full-rebuild]
+    main(pipeline=False if '--sequential' in sys.argv else None, full_rebuild='--full-rebuild' in sys.argv)
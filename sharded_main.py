@@ -0,0 +1,437 @@
+# sharded_main.py
+"""
+Canlı analiz sisteminin çok süreçli sürümü. Tek süreçte LLM dışındaki işler (embedding, bağlam arama,
+ayrıştırma, önbellekler) tek çekirdekle sınırlı kaldığından haberler birden fazla sürece dağıtılır:
+
+- Akış okuyucu (bu süreç): Alpaca akışını dinler, ön filtreyi uygular ve ilgili haberleri varlıklarına göre
+  (varlığı olmayan haberler başlığa göre) analiz süreçlerine dağıtır. Bir varlığın işlenmekte olan haberi
+  varken o varlığa dokunan her haber (çok varlıklı olanlar dahil) aynı sürece gider; bir haberin varlıkları
+  farklı süreçlerde işleniyorsa dağıtım, bunlar tek sürece inene kadar bekler. Telegram mesajlarını tek
+  noktadan (tek hız sınırıyla) gönderir.
+- Analiz süreçleri: main.py'deki analiz yolunu çalıştırır; bir haber, dokunduğu her varlığın kendinden önce
+  gelen haberleri bitmeden başlamaz (varlık başına geliş sırası korunur).
+  Vektör veritabanını sadece okur; yeni haberler yazıcı süreçten gelen sıcak indeks güncellemeleriyle eklenir.
+- Yazıcı süreç: veritabanına ve CSV tamponuna yazan tek süreçtir (write-behind tamponu burada çalışır).
+
+Vektör veritabanı bir Chroma sunucusu (config.CHROMA_SERVER_HOST) ya da mmap deposu (config.VECTOR_BACKEND = "mmap")
+olmalıdır; yerel Chroma klasörü bir süreç yazarken diğerlerinden okunamadığı için bu mod onunla başlamaz.
+
+Kullanım: python sharded_main.py [süreç sayısı]
+"""
+
+import os
+import sys
+import time
+import zlib
+import html
+import signal
+import asyncio
+import logging
+import threading
+import functools
+import multiprocessing
+from types import SimpleNamespace
+import config
+
+
+def ordering_keys(data, assets):
+    """
+    Haberin sırasının korunacağı anahtarlar: dokunduğu tüm varlıklar (sıralı); varlık yoksa normalleştirilmiş
+    başlık. Haber, her anahtarın kendinden önce gelen haberlerinden sonra işlenir.
+    """
+    if assets:
+        return sorted(assets)
+    from minhash import normalize_headline
+    return [normalize_headline(html.unescape(data.headline))]
+
+
+def check_shared_store():
+    """Vektör veritabanı süreçler arasında paylaşılamıyorsa (yerel Chroma klasörü) açıklamayla durur."""
+    if config.VECTOR_BACKEND == "mmap" or config.CHROMA_SERVER_HOST:
+        return
+    raise SystemExit(
+        f"HATA: Çok süreçli mod yerel Chroma klasörüyle ('{config.CHROMA_DB_PATH}') çalışmaz: Chroma, bir süreç "
+        "yazarken aynı klasörün başka süreçlerden okunmasını desteklemez. config.CHROMA_SERVER_HOST ile bir Chroma "
+        "sunucusu (ör. `chroma run --path data/chroma_db --port 8000`) ya da config.VECTOR_BACKEND = \"mmap\" "
+        "(`python mmap_store.py import`) kullanın veya tek süreçli `python main.py` ile çalıştırın.")
+
+
+def shard_for(key, shard_count):
+    # hash() süreçler arasında rastgeleleştirildiği için kararlı bir özet kullanılır.
+    return zlib.crc32(key.encode("utf-8")) % shard_count
+
+
+def portable_news(data):
+    """Alpaca haber nesnesini süreçler arasında gönderilebilecek, analiz yolunun kullandığı alanlara indirger."""
+    return SimpleNamespace(id=data.id, headline=data.headline, summary=data.summary, source=data.source,
+                           symbols=list(data.symbols or []), created_at=data.created_at)
+
+
+class ShardWriterClient:
+    """Analiz ve okuyucu süreçlerinde WriteBehindBuffer'ın yerini alır; haberleri yazıcı sürecin kuyruğuna koyar."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.sent = 0
+
+    def add(self, news_dict, vector=None):
+        self.queue.put((news_dict, list(vector) if vector is not None else None))
+        self.sent += 1
+
+    def attach(self, vector_store, hot_index=None):
+        # Veritabanına bu süreç yazmaz; bağlanacak bir şey yok.
+        pass
+
+    def pending(self):
+        return 0
+
+    def flush(self):
+        return 0
+
+
+class ShardTelegramClient:
+    """Analiz süreçlerinde Telegram teslimatının yerini alır; mesajları okuyucu sürecin gönderim kuyruğuna koyar."""
+
+    def __init__(self, outbox):
+        self.outbox = outbox
+        self.sent = 0
+
+    async def send(self, message, chat_ids=None):
+        self.outbox.put((message, chat_ids))
+        self.sent += 1
+
+    def pending(self):
+        return 0
+
+    def stats_line(self):
+        return f"Telegram: {self.sent} mesaj akış okuyucu sürece iletildi"
+
+
+class IndexBroadcast:
+    """Yazıcı süreçte sıcak indeksin yerini alır; yazılan vektörleri tüm analiz süreçlerine gönderir."""
+
+    def __init__(self, queues):
+        self.queues = queues
+        # Kapanışta analiz süreçleri kuyruğu artık okumuyor olabilir; yazıcı süreç çıkarken bunu beklemez.
+        for queue in queues:
+            queue.cancel_join_thread()
+
+    def add(self, ids, vectors, texts, metadatas):
+        vectors = [list(vector) for vector in vectors]
+        for queue in self.queues:
+            queue.put((ids, vectors, texts, metadatas))
+
+
+# --- Yazıcı süreç ---
+def _open_or_build_store():
+    import analysis_engine
+    try:
+        embeddings = analysis_engine.create_analyst_embeddings(analysis_engine.get_gemini_api_key())
+        if analysis_engine.vector_store_exists():
+            return analysis_engine.open_vector_store(embeddings)
+        return analysis_engine.build_vector_store(embeddings)
+    except FileNotFoundError:
+        print(f"HATA: '{config.KNOWLEDGE_BASE_CSV}' bulunamadı. Canlı haberler sadece CSV tamponuna yazılacak.")
+    except Exception as e:
+        print(f"\n🚨 YAZICI SÜREÇ BAŞLANGIÇ HATASI: {e}")
+    return None
+
+
+async def _drain_writer_queue(buffer, queue):
+    while True:
+        item = await asyncio.to_thread(queue.get)
+        if item is None:
+            break
+        buffer.add(*item)
+    await asyncio.to_thread(buffer.flush)
+
+
+def _child_init(child_setup):
+    # Ctrl+C tüm süreç grubuna gider; kapanışı okuyucu süreç yönetir (önce analizler, sonra yazıcı biter).
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if child_setup is not None:
+        child_setup()
+
+
+def _writer_main(queue, index_queues, store_ready, index_loaded, child_setup):
+    _child_init(child_setup)
+    from write_behind import WriteBehindBuffer
+    try:
+        vector_store = _open_or_build_store()
+    finally:
+        store_ready.set()
+    # Analiz süreçleri sıcak indekslerini yükleyene kadar yazmaya başlanmaz (haberler bu sürede kuyrukta bekler);
+    # böylece yüklemeden sonra yazılan her vektör indekse yayınla, öncekiler yüklemeyle girer.
+    deadline = time.monotonic() + config.SHARD_INDEX_LOAD_TIMEOUT_SECONDS
+    for event in index_loaded:
+        event.wait(max(0.0, deadline - time.monotonic()))
+    buffer = WriteBehindBuffer(vector_store, hot_index=IndexBroadcast(index_queues))
+    print(f"--- Yazıcı süreç hazır (pid {os.getpid()}) ---")
+    asyncio.run(_drain_writer_queue(buffer, queue))
+
+
+# --- Analiz süreçleri ---
+def _apply_index_updates(runtime, queue, index_loaded):
+    """Yazıcı sürecin gönderdiği yeni vektörleri bu sürecin sıcak indeksine ekler."""
+    while not runtime.index_ready.wait(1.0):
+        if runtime.error is not None:
+            break
+    index_loaded.set()
+    index = getattr(runtime.retriever, "index", None)
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+        if index is not None:
+            index.add(*item)
+
+
+def _forget(tails, tasks, keys, task):
+    tasks.discard(task)
+    for key in keys:
+        if tails.get(key) is task:
+            del tails[key]
+
+
+async def _serve_shard(main, inbox, acks):
+    """
+    Giriş kuyruğundaki haberleri en fazla ANALYSIS_WORKERS eşzamanlı analizle işler.
+    Bir haber, anahtarlarından (varlıklarından) herhangi birine sahip önceki haberlerin analizi bitmeden
+    başlamaz. Biten her haberin anahtarları `acks` ile akış okuyucuya bildirilir.
+    """
+    workers = asyncio.Semaphore(config.ANALYSIS_WORKERS)
+    backlog = asyncio.Semaphore(config.ANALYSIS_QUEUE_MAXSIZE)
+    tails, tasks = {}, set()
+    main.queued_news_count = lambda: len(tasks)
+
+    async def run(data, received_at, assets, keys, previous):
+        try:
+            if previous:
+                await asyncio.wait(previous)
+            async with workers:
+                await main.analyze_news_item(data, received_at, assets)
+        finally:
+            backlog.release()
+            acks.put(keys)
+
+    while True:
+        await backlog.acquire()
+        item = await asyncio.to_thread(inbox.get)
+        if item is None:
+            break
+        data, received_at, assets, keys = item
+        previous = {tails[key] for key in keys if key in tails}
+        task = asyncio.create_task(run(data, received_at, assets, keys, previous))
+        for key in keys:
+            tails[key] = task
+        tasks.add(task)
+        task.add_done_callback(functools.partial(_forget, tails, tasks, keys))
+    if tasks:
+        await asyncio.gather(*list(tasks), return_exceptions=True)
+
+
+def _analyzer_main(shard_id, inbox, acks, writer_queue, index_queue, outbox, store_ready, index_loaded, child_setup):
+    _child_init(child_setup)
+    from price_service import get_price_service
+    from metrics import start_metrics_server
+    import main
+    main.live_writer = ShardWriterClient(writer_queue)
+    main.telegram = ShardTelegramClient(outbox)
+    if config.METRICS_PORT is not None:
+        # Her analiz süreci kendi metriklerini okuyucunun portundan sonraki portlarda yayınlar.
+        config.METRICS_PORT += 1 + shard_id
+    # Veritabanını yazıcı süreç oluşturur/açar; analiz süreçleri ancak ondan sonra okumaya başlar.
+    store_ready.wait()
+    main.runtime.start()
+    start_metrics_server()
+    get_price_service().start()
+    index_updates = threading.Thread(target=_apply_index_updates, args=(main.runtime, index_queue, index_loaded),
+                                     name="index-updates", daemon=True)
+    index_updates.start()
+    print(f"--- Analiz süreci {shard_id} hazır (pid {os.getpid()}) ---")
+    asyncio.run(_serve_shard(main, inbox, acks))
+    # Süreç kapanırken kuyruğu okuyan thread yarıda kalmasın.
+    index_queue.put(None)
+    index_updates.join()
+
+
+# --- Akış okuyucu ---
+class ShardRouter:
+    """
+    Okuyucu süreçte NewsDataStream işleyicisi: ön filtre + analiz süreçlerine dağıtım + Telegram gönderimi.
+    Her anahtar (varlık) için o an hangi süreçte kaç haberinin işlendiği tutulur (`owners`); analiz süreçleri
+    biten haberleri `acks` kuyruğuyla bildirir. İşlenmekte olan anahtarlar o süreçte kalır, boşalan anahtar
+    bir sonraki haberde shard_for ile yeniden yerleştirilir.
+    """
+
+    def __init__(self, main, shard_queues, outbox, acks, index_loaded=()):
+        self.main = main
+        self.shard_queues = shard_queues
+        self.outbox = outbox
+        self.acks = acks
+        self.index_loaded = index_loaded
+        self.routed = [0] * len(shard_queues)
+        self.completed = 0
+        self.held = 0
+        self._owners = {}
+        self._owners_lock = threading.Lock()
+        self._released = None
+        self._loop = None
+        self._forwarder = threading.Thread(target=self._forward_outbox, name="telegram-outbox", daemon=True)
+        self._forwarder.start()
+        self._ack_reader = threading.Thread(target=self._read_acks, name="shard-acks", daemon=True)
+        self._ack_reader.start()
+
+    def _claim(self, keys):
+        """Anahtarların tek bir süreçte toplanabildiği süreci ayırıp döndürür; farklı süreçlerdelerse None."""
+        with self._owners_lock:
+            shards = {self._owners[key][0] for key in keys if key in self._owners}
+            if len(shards) > 1:
+                self._released.clear()
+                return None
+            shard = shards.pop() if shards else shard_for(keys[0], len(self.shard_queues))
+            for key in keys:
+                self._owners.setdefault(key, [shard, 0])[1] += 1
+            return shard
+
+    def _read_acks(self):
+        for keys in iter(self.acks.get, None):
+            with self._owners_lock:
+                self.completed += 1
+                for key in keys:
+                    owner = self._owners.get(key)
+                    if owner is not None:
+                        owner[1] -= 1
+                        if owner[1] <= 0:
+                            del self._owners[key]
+            loop = self._loop
+            if loop is not None and loop.is_running():
+                loop.call_soon_threadsafe(self._released.set)
+
+    def wait_ready(self, timeout=None):
+        """Tüm analiz süreçleri sıcak indekslerini yükleyene kadar (en fazla `timeout` saniye) bekler."""
+        deadline = time.monotonic() + (timeout or 0)
+        for event in self.index_loaded:
+            event.wait(max(0.0, deadline - time.monotonic()) if timeout else None)
+
+    def in_flight(self):
+        """Analiz süreçlerine dağıtılmış ama analizi henüz bitmemiş haber sayısı."""
+        with self._owners_lock:
+            return sum(self.routed) - self.completed
+
+    async def on_news(self, data):
+        if self._loop is None:
+            # Telegram kuyruğu ve işçileri akışın kendi olay döngüsünde çalışır.
+            self._released = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        decision, assets = self.main.prefilter_news(data)
+        if decision != "pass":
+            return
+        keys = ordering_keys(data, assets)
+        shard = self._claim(keys)
+        if shard is None:
+            # Ör. BTC haberi bir süreçte, ETH haberi başka süreçte işlenirken gelen BTC+ETH haberi: ikisinin de
+            # arkasına girebilmesi için biri bitene kadar beklenir (sonraki haberler de sırayı korumak için bekler).
+            self.held += 1
+            while shard is None:
+                await self._released.wait()
+                shard = self._claim(keys)
+        item = (portable_news(data), time.monotonic(), assets, keys)
+        queue = self.shard_queues[shard]
+        try:
+            queue.put_nowait(item)
+        except Exception:
+            print(f"⚠️ Analiz süreci {shard} kuyruğu dolu, yer açılması bekleniyor...")
+            await asyncio.to_thread(queue.put, item)
+        self.routed[shard] += 1
+
+    def _forward_outbox(self):
+        """Analiz süreçlerinin alarm mesajlarını tek Telegram teslimat kuyruğuna aktarır; akış kapandıysa senkron gönderir."""
+        for message, chat_ids in iter(self.outbox.get, None):
+            loop = self._loop
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(self.main.telegram.send(message, chat_ids), loop).result()
+            else:
+                self.main.telegram.send_sync(message, chat_ids)
+
+    def close(self):
+        self.outbox.put(None)
+        self._forwarder.join()
+        self.acks.put(None)
+        self._ack_reader.join()
+
+    def stats_line(self):
+        return ("Dağıtım: " + ", ".join(f"süreç {i}: {n}" for i, n in enumerate(self.routed))
+                + f" | süreçler arası sıra için bekletilen: {self.held}")
+
+
+def run_sharded(processes=None, child_setup=None, stream_factory=None):
+    """
+    Okuyucu, yazıcı ve analiz süreçlerini başlatır ve akış bitene kadar çalışır.
+    `child_setup` her süreçte (bu süreç dahil) ilk iş olarak çağrılır (ör. benchmark taklitleri); `stream_factory`
+    verilirse Alpaca akışı yerine `stream_factory(router)` ile oluşturulan nesnenin `subscribe_news` / `run`
+    metotları kullanılır. Vektör veritabanı süreçler arasında paylaşılamıyorsa hiçbir süreç başlatılmadan durur.
+    """
+    if child_setup is not None:
+        child_setup()
+    check_shared_store()
+    processes = processes or config.SHARD_PROCESSES or os.cpu_count() or 1
+    ctx = multiprocessing.get_context("spawn")
+    shard_queues = [ctx.Queue(maxsize=config.SHARD_QUEUE_MAXSIZE) for _ in range(processes)]
+    index_queues = [ctx.Queue() for _ in range(processes)]
+    writer_queue, outbox, acks = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    store_ready = ctx.Event()
+    index_loaded = [ctx.Event() for _ in range(processes)]
+
+    writer = ctx.Process(target=_writer_main, name="shard-writer", daemon=True,
+                         args=(writer_queue, index_queues, store_ready, index_loaded, child_setup))
+    analyzers = [ctx.Process(target=_analyzer_main, name=f"shard-analyzer-{i}", daemon=True,
+                             args=(i, shard_queues[i], acks, writer_queue, index_queues[i], outbox, store_ready,
+                                   index_loaded[i], child_setup))
+                 for i in range(processes)]
+    writer.start()
+    for process in analyzers:
+        process.start()
+
+    from metrics import start_metrics_server
+    import main
+    main.live_writer = ShardWriterClient(writer_queue)
+    router = ShardRouter(main, shard_queues, outbox, acks, index_loaded)
+    start_metrics_server()
+    if stream_factory is None:
+        from alpaca.data.live.news import NewsDataStream
+        news_stream = NewsDataStream(main.ALPACA_API_KEY, main.ALPACA_SECRET_KEY)
+    else:
+        news_stream = stream_factory(router)
+    news_stream.subscribe_news(router.on_news, '*')
+    print(f"--- CANLI HABER ANALİZ SİSTEMİ AKTİF ({processes} analiz süreci + 1 yazıcı süreç) ---")
+    print(f"İzleme Listesi: {list(config.SYMBOLS_TO_TRACK)}")
+    try:
+        news_stream.run()
+    finally:
+        print("Kapanış: analiz süreçlerinin elindeki haberler bitiriliyor...")
+        for queue in shard_queues:
+            queue.put(None)
+        for process in analyzers:
+            process.join()
+        # Analiz süreçleri bittikten sonra kalan alarm mesajları (teslimat kuyruğundakiler dahil) senkron gönderilir.
+        router.close()
+        if main.telegram.pending():
+            print(f"Kapanış: kuyruktaki {main.telegram.pending()} Telegram mesajı gönderiliyor...")
+            abandoned = main.telegram.flush_sync(config.TELEGRAM_SHUTDOWN_TIMEOUT_SECONDS)
+            if abandoned:
+                print(f"UYARI: {abandoned} Telegram mesajı {config.TELEGRAM_SHUTDOWN_TIMEOUT_SECONDS} sn içinde "
+                      f"gönderilemeden kapanıldı.")
+        print("Kapanış: bekleyen canlı haberler diske yazılıyor...")
+        writer_queue.put(None)
+        writer.join()
+        print(router.stats_line())
+        print(main.telegram.stats_line())
+        print(main.metrics.stats_line())
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    run_sharded(int(sys.argv[1]) if len(sys.argv) > 1 else None)
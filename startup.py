@@ -0,0 +1,120 @@
+# startup.py
+
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+import config
+import analysis_engine
+
+
+class StartupTimer:
+    """Başlangıç adımlarının sürelerini ve `origin` anına (ör. main.py'nin ilk satırı) göre bitiş anlarını kaydeder."""
+
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, time.perf_counter() - start)
+
+    def mark(self, name, duration=0.0):
+        with self._lock:
+            self.phases.append((name, duration, time.perf_counter() - self.origin))
+
+    def report(self, title="BAŞLANGIÇ SÜRELERİ"):
+        lines = [f"--- {title} ---"]
+        with self._lock:
+            for name, duration, at in self.phases:
+                lines.append(f"  {name:<32} {duration:7.2f} sn   (t+{at:.2f} sn)")
+        return "\n".join(lines)
+
+
+class AnalystRuntime:
+    """
+    Canlı sistemin RAG bileşenlerini arka planda hazırlayan durum nesnesi.
+    Haber akışı beklemeden abone olur; bileşenler hazırlanırken:
+    - `llm_ready` kurulana kadar analiz işçileri bekler (LLM ve embedding birkaç saniyede hazır olur),
+    - `index_ready` kurulana kadar haberler bağlamsız (degraded) modda analiz edilir.
+    Vektör veritabanı yoksa arşivden arka planda oluşturulur; bu sürede canlı haberler kaçırılmaz.
+    """
+
+    def __init__(self, timer=None):
+        self.timer = timer or StartupTimer()
+        self.llm = None
+        self.document_chain = None
+        self.embeddings = None
+        self.vector_store = None
+        self.retriever = None
+        self.llm_ready = threading.Event()
+        self.index_ready = threading.Event()
+        self.error = None
+        self._on_index_ready = []
+        self._thread = None
+
+    @property
+    def degraded(self):
+        return not self.index_ready.is_set()
+
+    def on_index_ready(self, callback):
+        """İndeks hazır olduğunda (vector_store, retriever) ile çağrılacak fonksiyonu kaydeder."""
+        self._on_index_ready.append(callback)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._bootstrap, name="analyst-bootstrap", daemon=True)
+        self._thread.start()
+        return self
+
+    def _bootstrap(self):
+        try:
+            with self.timer.phase("LLM + analiz zinciri"):
+                from langchain_core.prompts import ChatPromptTemplate
+                from langchain.chains.combine_documents import create_stuff_documents_chain
+                api_key = analysis_engine.get_gemini_api_key()
+                self.llm = analysis_engine.create_llm(api_key)
+                prompt = ChatPromptTemplate.from_template(config.SYSTEM_PROMPT)
+                self.document_chain = create_stuff_documents_chain(self.llm, prompt)
+            with self.timer.phase("embedding istemcisi"):
+                self.embeddings = analysis_engine.create_analyst_embeddings(api_key)
+                # Canlı yolda her haberde kullanılan modülleri önceden yükle.
+                import document_builder  # noqa: F401
+            self.llm_ready.set()
+
+            if analysis_engine.vector_store_exists():
+                with self.timer.phase("vektör veritabanı açılışı"):
+                    vector_store = analysis_engine.open_vector_store(self.embeddings)
+            else:
+                print("⚠️ Vektör veritabanı yok; arka planda oluşturulacak. Bu sürede haberler bağlamsız analiz edilir.")
+                with self.timer.phase("vektör veritabanı oluşturma"):
+                    vector_store = analysis_engine.build_vector_store(self.embeddings)
+            with self.timer.phase("sıcak indeks yükleme"):
+                retriever = analysis_engine.create_retriever(vector_store)
+
+            self.vector_store, self.retriever = vector_store, retriever
+            for callback in self._on_index_ready:
+                callback(vector_store, retriever)
+            self.index_ready.set()
+            self.timer.mark("sistem tam hazır")
+            print("\n✅ RAG bileşenleri hazır; haberler artık geçmiş bağlamla analiz ediliyor.")
+        except FileNotFoundError:
+            self.error = f"'{config.KNOWLEDGE_BASE_CSV}' bulunamadı"
+            print(f"HATA: {self.error}. Veri toplama ve işleme script'leri çalıştırılana kadar haberler bağlamsız analiz edilecek.")
+        except Exception as e:
+            self.error = str(e)
+            print(f"\n🚨 BAŞLANGIÇ HATASI: {e}")
+        finally:
+            # LLM kurulamasa bile bekleyen işçiler takılı kalmasın.
+            self.llm_ready.set()
+            print(self.timer.report())
+
+    async def wait_for_llm(self):
+        if not self.llm_ready.is_set():
+            await asyncio.to_thread(self.llm_ready.wait)
+        if self.document_chain is None:
+            raise RuntimeError(f"LLM başlatılamadı: {self.error}")
@@ -0,0 +1,340 @@
+# telegram_delivery.py
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import config
+from rate_limiter import TokenBucket
+from metrics import get_metrics
+
+load_dotenv()
+metrics = get_metrics()
+
+
+def parse_chat_ids(value):
+    """'123, -100456' gibi virgülle ayrılmış chat ID listesini ayrıştırır."""
+    if not value:
+        return []
+    return [c.strip() for c in str(value).split(",") if c.strip()]
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class TelegramDelivery:
+    """
+    Alarm mesajlarını Telegram'a sırayla ve hız sınırlarına uyarak ileten asenkron teslimat katmanı.
+    - Tek bir requests.Session ve bağlantı havuzu kullanılır; her mesajda yeni TLS el sıkışması yapılmaz.
+    - Her chat'in kendi sınırlı FIFO kuyruğu ve tek bir gönderim işçisi vardır: aynı chat'e giden mesajlar
+      (alarm, ardından Türkçe çeviri ve yorum mesajları) tekrar denemeler dahil sırayla teslim edilir.
+      Farklı chat'lere gönderim paraleldir; aynı anda en fazla `workers` istek uçuşta olur. İşçiler
+      Telegram'ın yayımladığı sınırlara göre ayarlanmış global ve chat başına token bucket'lardan jeton alır.
+    - 429 cevabındaki `retry_after` süresi kadar ilgili kovalar boşaltılır ve mesaj tekrar denenir;
+      ağ ve 5xx hataları üstel geri çekilme ile tekrar denenir.
+    - Aynı mesaj birden fazla chat ID'ye dağıtılabilir; teslimat gecikmesi istatistikleri tutulur.
+    """
+
+    def __init__(self, token=None, chat_ids=None, api_base=None, workers=None, max_retries=None):
+        self.token = token if token is not None else os.getenv(config.TELEGRAM_BOT_TOKEN_ENV)
+        self.chat_ids = chat_ids if chat_ids is not None else parse_chat_ids(os.getenv(config.TELEGRAM_CHAT_ID_ENV))
+        self.api_base = (api_base or os.getenv(config.TELEGRAM_API_BASE_ENV) or config.TELEGRAM_API_BASE).rstrip("/")
+        self.workers = workers or config.TELEGRAM_SENDER_WORKERS
+        self.max_retries = max_retries if max_retries is not None else config.TELEGRAM_MAX_RETRIES
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.TELEGRAM_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.global_limiter = TokenBucket(config.TELEGRAM_GLOBAL_PER_SECOND)
+        self._chat_limiters = {}
+        self._queues = {}
+        self._send_slots = None
+        self._tasks = []
+        self._latencies = deque(maxlen=1000)
+        self.stats = {"queued": 0, "delivered": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+
+    @property
+    def configured(self):
+        return bool(self.token and self.chat_ids)
+
+    def _chat_limiter(self, chat_id):
+        limiter = self._chat_limiters.get(chat_id)
+        if limiter is None:
+            limiter = self._chat_limiters[chat_id] = TokenBucket(config.TELEGRAM_PER_CHAT_PER_SECOND, capacity=1)
+        return limiter
+
+    # --- HTTP ---
+    def _post(self, chat_id, message):
+        """Tek bir sendMessage isteği atar. Dönüş: ("ok" | "retry" | "fail", bekleme süresi, açıklama)."""
+        url = f"{self.api_base}/bot{self.token}/sendMessage"
+        payload = {'chat_id': chat_id, 'text': message, 'parse_mode': 'Markdown'}
+        try:
+            response = self.session.post(url, json=payload, timeout=config.TELEGRAM_REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            return "retry", None, str(e)
+        if response.status_code == 200:
+            return "ok", None, ""
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = 1.0
+            self.stats["rate_limited"] += 1
+            return "retry", retry_after, "429 Too Many Requests"
+        if response.status_code >= 500:
+            return "retry", None, f"{response.status_code} {response.text[:200]}"
+        return "fail", None, f"{response.status_code} {response.text[:200]}"
+
+    def send_sync(self, message, chat_ids=None):
+        """Olay döngüsü olmayan yerler (tek seferlik script'ler) için senkron gönderim. Başarılı teslimat sayısını döndürür."""
+        if not self.configured:
+            print("\n>> UYARI: Telegram bilgileri eksik. Mesaj gönderilemedi.")
+            return 0
+        delivered = 0
+        for chat_id in chat_ids or self.chat_ids:
+            start = time.monotonic()
+            for attempt in range(self.max_retries + 1):
+                self.global_limiter.acquire()
+                self._chat_limiter(chat_id).acquire()
+                status, retry_after, detail = self._post(chat_id, message)
+                if status != "retry" or attempt == self.max_retries:
+                    break
+                self.stats["retries"] += 1
+                time.sleep(self._backoff(chat_id, attempt, retry_after))
+            delivered += self._record(chat_id, status, detail, start)
+        return delivered
+
+    def _backoff(self, chat_id, attempt, retry_after):
+        """
+        Tekrar denemeden önce ayrıca beklenecek süre. retry_after verilmişse chat kovası o kadar boşaltılır;
+        bekleme bir sonraki jeton alımında gerçekleşir.
+        """
+        if retry_after is not None:
+            # 429 chat'e özgüdür; sadece o chat'in kovası boşaltılır, diğer chat'lere gönderim sürer.
+            self._chat_limiter(chat_id).penalize(retry_after)
+            return 0.0
+        return min(30.0, 2 ** attempt)
+
+    def _record(self, chat_id, status, detail, start):
+        if status == "ok":
+            latency = time.monotonic() - start
+            self._latencies.append(latency)
+            self.stats["delivered"] += 1
+            metrics.observe("telegram_delivery", latency)
+            metrics.inc("telegram_messages_total", status="delivered")
+            print(f"\n>>> ALARM TELEGRAM'A BAŞARIYLA GÖNDERİLDİ <<< (chat {chat_id}, {latency:.2f} sn)")
+            return 1
+        self.stats["failed"] += 1
+        metrics.inc("telegram_messages_total", status="failed")
+        print(f"\n>> HATA: Telegram'a mesaj gönderilemedi (chat {chat_id}). {detail}")
+        return 0
+
+    # --- Asenkron kuyruk ---
+    def _chat_queue(self, chat_id):
+        """Chat'in giden kuyruğunu döndürür; ilk mesajda kuyruk ve ona bağlı tek işçi oluşturulur."""
+        if self._send_slots is None:
+            self._send_slots = asyncio.Semaphore(self.workers)
+        chat_queue = self._queues.get(chat_id)
+        if chat_queue is None:
+            chat_queue = self._queues[chat_id] = asyncio.Queue(maxsize=config.TELEGRAM_QUEUE_MAXSIZE)
+            self._tasks.append(asyncio.create_task(self._worker(chat_id, chat_queue)))
+        return chat_queue
+
+    async def send(self, message, chat_ids=None):
+        """Mesajı her hedef chat'in giden kuyruğuna koyar ve hemen döner; teslimatı işçiler yapar."""
+        if not self.configured:
+            print("\n>> UYARI: Telegram bilgileri eksik. Mesaj gönderilemedi.")
+            return
+        for chat_id in chat_ids or self.chat_ids:
+            self.stats["queued"] += 1
+            await self._chat_queue(chat_id).put((message, time.monotonic()))
+
+    async def _worker(self, chat_id, chat_queue):
+        # Chat başına tek işçi: bir mesaj (tekrar denemeleri dahil) bitmeden sıradaki gönderilmez.
+        while True:
+            message, enqueued_at = await chat_queue.get()
+            try:
+                for attempt in range(self.max_retries + 1):
+                    await self.global_limiter.acquire_async()
+                    await self._chat_limiter(chat_id).acquire_async()
+                    async with self._send_slots:
+                        status, retry_after, detail = await asyncio.to_thread(self._post, chat_id, message)
+                    if status != "retry" or attempt == self.max_retries:
+                        break
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self._backoff(chat_id, attempt, retry_after))
+                self._record(chat_id, status, detail, enqueued_at)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"\n>> HATA: Telegram mesajı gönderilirken bir sorun oluştu: {e}")
+            finally:
+                chat_queue.task_done()
+
+    async def drain(self):
+        """Kuyruklardaki tüm mesajlar teslim edilene (veya vazgeçilene) kadar bekler."""
+        for chat_queue in list(self._queues.values()):
+            await chat_queue.join()
+
+    def pending(self):
+        return sum(chat_queue.qsize() for chat_queue in self._queues.values())
+
+    def flush_sync(self, timeout=None):
+        """
+        Kapanışta, akışın olay döngüsü kapandıktan sonra kuyruklarda kalan mesajları chat başına sırayla
+        senkron gönderir. `timeout` saniye dolunca kalan mesajlardan vazgeçilir; gönderilemeyen mesaj sayısını döndürür.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        abandoned = 0
+        for chat_id, chat_queue in self._queues.items():
+            while True:
+                try:
+                    message, _ = chat_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    abandoned += 1
+                    continue
+                self.send_sync(message, [chat_id])
+        return abandoned
+
+    def latency_summary(self):
+        values = list(self._latencies)
+        return {"count": len(values), "p50": _percentile(values, 50), "p95": _percentile(values, 95),
+                "max": max(values) if values else 0.0}
+
+    def stats_line(self):
+        s, l = self.stats, self.latency_summary()
+        return (f"Telegram: {s['delivered']} teslim, {s['failed']} başarısız, {s['retries']} tekrar "
+                f"({s['rate_limited']} kez 429) | gecikme p50 {l['p50']:.2f} sn, p95 {l['p95']:.2f} sn, maks {l['max']:.2f} sn")
+
+
+_delivery = None
+
+
+def get_telegram_delivery():
+    """Uygulama genelinde paylaşılan TelegramDelivery örneğini döndürür."""
+    global _delivery
+    if _delivery is None:
+        _delivery = TelegramDelivery()
+    return _delivery
+
+
+# --- Çevrimdışı test için yerel Telegram taklidi ---
+class _StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        try:
+            chat_id = str(json.loads(body or b"{}").get("chat_id"))
+        except ValueError:
+            chat_id = None
+        if server.latency:
+            time.sleep(server.latency)
+        now = time.monotonic()
+        with server.lock:
+            server.received += 1
+            last = server.last_by_chat.get(chat_id)
+            # Gerçek API gibi aynı chat'e saniyede birden fazla mesajı 429 ile reddet.
+            # Zamanlayıcı sapmaları yüzünden tam sınırda gelen istekler için küçük bir tolerans bırakılır.
+            limited = last is not None and now - last < server.min_interval * 0.9
+            if not limited:
+                server.last_by_chat[chat_id] = now
+                server.messages.append((chat_id, body))
+        if limited:
+            retry_after = max(1, int(server.min_interval - (now - last) + 0.999))
+            self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                              "parameters": {"retry_after": retry_after}})
+        else:
+            self._reply(200, {"ok": True, "result": {"message_id": server.received}})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TelegramStandIn:
+    """
+    Bot API'nin sendMessage uç noktasını taklit eden yerel HTTP sunucusu.
+    Chat başına hız sınırını uygular ve gerçek API gibi `retry_after` içeren 429 döndürür.
+    Teslimat katmanı `api_base=stand_in.url` verilerek çevrimdışı test edilebilir.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, min_interval=None, latency=0.0):
+        self.server = ThreadingHTTPServer((host, port), _StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.received = 0
+        self.server.messages = []
+        self.server.last_by_chat = {}
+        self.server.min_interval = min_interval if min_interval is not None else 1.0 / config.TELEGRAM_PER_CHAT_PER_SECOND
+        # Her cevaptan önce beklenen süre (gerçek API'nin ağ gecikmesini taklit eder).
+        self.server.latency = latency
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def messages(self):
+        return self.server.messages
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="telegram-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+async def _demo(count, chats):
+    """Yerel taklit sunucuya bir alarm patlaması gönderip teslimat istatistiklerini yazdırır."""
+    stand_in = TelegramStandIn().start()
+    delivery = TelegramDelivery(token="TEST", chat_ids=[str(-1000 - i) for i in range(chats)], api_base=stand_in.url)
+    start = time.monotonic()
+    for i in range(count):
+        await delivery.send(f"Test alarm {i + 1}")
+    await delivery.drain()
+    print(f"{count} alarm x {chats} chat {time.monotonic() - start:.2f} sn içinde işlendi "
+          f"(sunucu {stand_in.server.received} istek aldı).")
+    print(delivery.stats_line())
+    stand_in.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Telegram teslimat katmanı için yerel taklit sunucu ve test aracı.")
+    parser.add_argument("--stand-in", action="store_true", help="Sadece yerel taklit sunucuyu çalıştır.")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--demo", type=int, default=5, help="Taklit sunucuya gönderilecek test alarmı sayısı.")
+    parser.add_argument("--chats", type=int, default=2)
+    args = parser.parse_args()
+    if args.stand_in:
+        stand_in = TelegramStandIn(port=args.port)
+        print(f"Telegram taklit sunucusu {stand_in.url} adresinde çalışıyor. "
+              f"Kullanmak için {config.TELEGRAM_API_BASE_ENV}={stand_in.url} ayarlayın.")
+        stand_in.server.serve_forever()
+    else:
+        asyncio.run(_demo(args.demo, args.chats))
@@ -0,0 +1,182 @@
+# translation_service.py
+
+import html
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+import config
+from metrics import get_metrics
+
+metrics = get_metrics()
+# Birden fazla başlık tek istekte çevrilirken aralarına konan ayraç; Google Translate satır sonlarını korur.
+BATCH_SEPARATOR = "\n"
+# Google Translate'in tek istekte kabul ettiği karakter sınırının biraz altı.
+MAX_BATCH_CHARS = 4500
+
+
+def normalize_text(text):
+    """Önbellek anahtarı için metni normalleştirir: HTML varlıkları, fazla boşluklar ve büyük/küçük harf."""
+    return " ".join(html.unescape(str(text)).split()).casefold()
+
+
+class TranslationService:
+    """
+    Alarm başlıkları için önbellekli ve toplu çeviri katmanı.
+    - Bellekte bir LRU önbellek ve diskte kalıcı bir SQLite önbellek tutar (anahtar: normalleştirilmiş İngilizce metin).
+      Aynı haber farklı kaynaklardan tekrar geldiğinde tekrar çevrilmez.
+    - Tek bir GoogleTranslator istemcisi oluşturulur ve yeniden kullanılır.
+    - Aynı anda gelen alarmların başlıkları kısa bir pencere içinde biriktirilir ve tek istekte çevrilir.
+    """
+
+    def __init__(self, cache_path=None, lru_size=None, batch_window=None):
+        self.lru_size = lru_size or config.TRANSLATION_LRU_SIZE
+        self.batch_window = batch_window if batch_window is not None else config.TRANSLATION_BATCH_WINDOW_SECONDS
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path or config.TRANSLATION_CACHE_PATH, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS translations (source TEXT PRIMARY KEY, translated TEXT NOT NULL, created_at REAL NOT NULL)")
+        self._conn.commit()
+        self._client = None
+        self._pending = []
+        self._flush_scheduled = False
+        self.stats = {"lru_hits": 0, "disk_hits": 0, "misses": 0, "requests": 0, "batched_texts": 0, "errors": 0}
+
+    def _translator(self):
+        if self._client is None:
+            from deep_translator import GoogleTranslator
+            self._client = GoogleTranslator(source='en', target='tr')
+        return self._client
+
+    # --- Önbellek ---
+    def get_cached(self, text):
+        key = normalize_text(text)
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.stats["lru_hits"] += 1
+                return self._lru[key]
+            row = self._conn.execute("SELECT translated FROM translations WHERE source = ?", (key,)).fetchone()
+            if row:
+                self.stats["disk_hits"] += 1
+                self._remember(key, row[0])
+                return row[0]
+        return None
+
+    def _remember(self, key, translated):
+        self._lru[key] = translated
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _store(self, text, translated):
+        key = normalize_text(text)
+        with self._lock:
+            self._remember(key, translated)
+            self._conn.execute("INSERT OR REPLACE INTO translations (source, translated, created_at) VALUES (?, ?, ?)",
+                               (key, translated, time.time()))
+            self._conn.commit()
+
+    # --- Çeviri ---
+    def _translate_batch(self, texts):
+        """Metinleri ayraçla birleştirip tek istekte çevirir; parça sayısı tutmazsa tek tek çevirir."""
+        client = self._translator()
+        self.stats["requests"] += 1
+        if len(texts) == 1:
+            with metrics.timer("translation_request"):
+                return [client.translate(texts[0])]
+        self.stats["batched_texts"] += len(texts)
+        with metrics.timer("translation_request"):
+            translated = client.translate(BATCH_SEPARATOR.join(texts))
+        parts = [p.strip() for p in str(translated).split(BATCH_SEPARATOR)]
+        if len(parts) == len(texts):
+            return parts
+        self.stats["requests"] += len(texts)
+        return [client.translate(t) for t in texts]
+
+    def translate_many(self, texts):
+        """Metin listesini çevirir (senkron). Önbellekte olmayanlar karakter sınırına göre gruplanıp toplu çevrilir."""
+        results = [self.get_cached(t) for t in texts]
+        missing = list(dict.fromkeys(normalize_text(t) for t, r in zip(texts, results) if r is None))
+        originals = {normalize_text(t): " ".join(html.unescape(str(t)).split()) for t in texts}
+        translated_map = {}
+        self.stats["misses"] += len(missing)
+
+        # Tek satırlık metinleri karakter sınırını aşmayacak gruplara böl.
+        groups, current, size = [], [], 0
+        for key in missing:
+            text = originals[key]
+            if current and size + len(text) + 1 > MAX_BATCH_CHARS:
+                groups.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + 1
+        if current:
+            groups.append(current)
+
+        for group in groups:
+            try:
+                for text, translated in zip(group, self._translate_batch(group)):
+                    if translated:
+                        self._store(text, translated)
+                        translated_map[normalize_text(text)] = translated
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"UYARI: Metin çevrilemedi. Hata: {e}")
+
+        return [r if r is not None else translated_map.get(normalize_text(t)) for t, r in zip(texts, results)]
+
+    def translate_sync(self, text):
+        return self.translate_many([text])[0]
+
+    async def translate(self, text):
+        """
+        Asenkron çeviri. Önbellekte yoksa istek kısa bir pencere boyunca bekletilir;
+        bu sürede gelen diğer başlıklarla birlikte tek istekte çevrilir.
+        """
+        cached = self.get_cached(text)
+        if cached is not None:
+            return cached
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.batch_window, lambda: asyncio.ensure_future(self._flush_pending()))
+        return await future
+
+    async def _flush_pending(self):
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+        if not pending:
+            return
+        texts = [text for text, _ in pending]
+        try:
+            results = await asyncio.to_thread(self.translate_many, texts)
+        except Exception as e:
+            results = [None] * len(texts)
+            print(f"UYARI: Toplu çeviri başarısız. Hata: {e}")
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    def hit_rate(self):
+        hits = self.stats["lru_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def stats_line(self):
+        s = self.stats
+        return (f"Çeviri önbelleği: {s['lru_hits']} bellek + {s['disk_hits']} disk isabeti, {s['misses']} ıskalama, "
+                f"{s['requests']} istek ({s['batched_texts']} metin toplu çevrildi)")
+
+
+_service = None
+
+
+def get_translation_service():
+    """Uygulama genelinde paylaşılan TranslationService örneğini döndürür."""
+    global _service
+    if _service is None:
+        _service = TranslationService()
+    return _service
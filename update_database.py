@@ -1,17 +1,34 @@
 # update_database.py
 
-# update_database.py dosyasının en üstüne
-from langchain_community.vectorstores.utils import filter_complex_metadata
 import pandas as pd
 import os
+import sys
 import html
 import shutil
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
-from langchain.docstore.document import Document
-from tqdm import tqdm
+from chromadb.api.client import SharedSystemClient
 import config
+import knowledge_store
+from document_builder import (
+    DOCUMENT_COLUMNS,
+    build_documents,
+    build_rag_content,
+    compute_content_hash,
+    iter_document_batches,
+    iter_knowledge_base_documents,
+    normalize_ids,
+    page_contents,
+    publish_timestamps
+)
+from embedding_cache import create_embeddings
+from embedding_scheduler import EmbeddingScheduler, update_metadatas
+from vector_partitions import (
+    PartitionedVectorStore,
+    open_store,
+    partition_key,
+    rebuild_partition,
+    retired_partition_check
+)
 
 # .env dosyasındaki API anahtarlarını yükle
 load_dotenv()
@@ -20,43 +37,164 @@ load_dotenv()
 # Ayarların hepsi merkezi config dosyamızdan geliyor
 os.environ["GOOGLE_API_KEY"] = os.getenv("GEMINI_API_KEY") # Bu satır aslında analysis_engine'da gerekli ama burada olması da zarar vermez.
 RAW_DATA_CSV = config.RAW_NEWS_CSV
-KNOWLEDGE_BASE_CSV = config.KNOWLEDGE_BASE_CSV
 CHROMA_DB_PATH = config.CHROMA_DB_PATH
 LIVE_BUFFER_CSV = config.LIVE_BUFFER_CSV
 EMBEDDING_MODEL = config.EMBEDDING_MODEL
+# ChromaDB'ye tek seferde gönderilecek en fazla döküman sayısı (Chroma'nın batch limitinin altında kalır)
+UPSERT_BATCH_SIZE = 1000
 # --- AYARLAR SONU ---
 
-def update_and_build_databases():
+def rebuild_vector_store(embeddings):
+    """ChromaDB'yi silip tüm arşivden sıfırdan oluşturur. Sadece açıkça istendiğinde kullanılır."""
+    print("\nMevcut ChromaDB (varsa) siliniyor ve temiz veriden yeniden oluşturuluyor...")
+    # mmap deposu kullanılıyorsa (config.VECTOR_BACKEND) silinip yeniden oluşturulan odur.
+    store_dir = config.MMAP_STORE_DIR if config.VECTOR_BACKEND == "mmap" else CHROMA_DB_PATH
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+        # Aynı süreçte açılmış eski Chroma istemcileri silinen klasöre yazmaya çalışmasın.
+        SharedSystemClient.clear_system_cache()
+
+    print("Arşiv parça parça okunup ChromaDB'ye ekleniyor. Bu işlem biraz sürebilir...")
+    # chromadb>=0.4 verileri otomatik olarak diske yazar, ayrıca persist() çağırmaya gerek yok.
+    db = open_store(embeddings, persist_directory=CHROMA_DB_PATH)
+    written = EmbeddingScheduler(embeddings).embed_and_store_stream(db, iter_knowledge_base_documents())
+    if not written:
+        print("Vektör veritabanına eklenecek döküman bulunamadı.")
+        return False
+    return True
+
+def rebuild_vector_partition(embeddings, key):
+    """Bölümlü vektör veritabanında sadece `key` dönemini (ör. "2024-05") arşivden yeniden oluşturur."""
+    db = open_store(embeddings, persist_directory=CHROMA_DB_PATH)
+    if not isinstance(db, PartitionedVectorStore):
+        print("HATA: Vektör veritabanı bölümlü değil; önce `python vector_partitions.py migrate` çalıştırın.")
+        return False
+    print(f"\nVektör veritabanının {key} bölümü arşivden yeniden oluşturuluyor...")
+    return rebuild_partition(db, key, embeddings) > 0
+
+def sync_vector_store(embeddings):
     """
-    Geçmiş (`temp_raw_news.csv`) ve canlı (`live_buffer.csv`) haber kaynaklarını okur,
-    işler ve hem ana CSV arşivini hem de ChromaDB vektör veritabanını günceller.
+    ChromaDB'yi arşivle artımlı olarak eşitler.
+    - Yeni ya da `rag_content` özeti değişmiş haberler embed edilip upsert edilir.
+    - Arşivde artık bulunmayan vektörler (ör. canlı akıştan ID'siz eklenenler) silinir.
+    - Bölümlü veritabanında arşivlenmiş ya da saklama süresi dolmuş dönemlerin haberleri atlanır;
+      bunlar ne yeniden embed edilir ne de silinecekler listesine girer.
+    Böylece güncelleme süresi arşivin boyutuna değil, değişen veri miktarına bağlı olur.
+    Arşiv parça parça okunur; bellekte sadece ID'ler ve içerik özetleri tutulur.
     """
-    print("\nVeritabanı oluşturma/güncelleme süreci başlatıldı...")
+    print("\nChromaDB artımlı olarak güncelleniyor...")
+    db = open_store(embeddings, persist_directory=CHROMA_DB_PATH)
+
+    existing = db.get(include=["metadatas"])
+    existing_hashes = {
+        doc_id: (metadata or {}).get('content_hash')
+        for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+    }
+    # Sayısal `publish_ts` alanı eklenmeden önce yazılmış vektörler; bunların sadece metadata'sı güncellenir.
+    missing_ts = {
+        doc_id for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+        if 'publish_ts' not in (metadata or {})
+    }
+    print(f"ChromaDB'de mevcut vektör sayısı: {len(existing_hashes)}")
+    retired = retired_partition_check(db) if isinstance(db, PartitionedVectorStore) else None
+
+    wanted_ids = set()
+    retired_ids = set()
+    metadata_updates = 0
+
+    def changed_chunks():
+        nonlocal metadata_updates
+        # Her parça için ID ve içerik özetini hesapla; sadece farklı olan satırları döküman üreticiye ver.
+        for df in knowledge_store.iter_knowledge_base(columns=DOCUMENT_COLUMNS):
+            if retired is not None:
+                keys = publish_timestamps(df['timestamp']).map(lambda ts: partition_key(ts, db.granularity))
+                retired_mask = keys.map(retired)
+                if retired_mask.any():
+                    retired_ids.update(normalize_ids(df['id'][retired_mask]))
+                    df = df[~retired_mask]
+            chunk_ids = normalize_ids(df['id'])
+            chunk_hashes = page_contents(df).map(compute_content_hash)
+            wanted_ids.update(chunk_ids)
+            changed_mask = [existing_hashes.get(doc_id) != content_hash for doc_id, content_hash in zip(chunk_ids, chunk_hashes)]
+            # İçeriği değişmemiş ama metadata'sı eski olan satırlar tekrar embed edilmeden güncellenir.
+            stale_mask = [not changed and doc_id in missing_ts for changed, doc_id in zip(changed_mask, chunk_ids)]
+            if any(stale_mask):
+                documents, ids = build_documents(df[stale_mask])
+                for i in range(0, len(ids), UPSERT_BATCH_SIZE):
+                    update_metadatas(db, ids[i:i + UPSERT_BATCH_SIZE],
+                                     [d.metadata for d in documents[i:i + UPSERT_BATCH_SIZE]])
+                metadata_updates += len(ids)
+            yield df[changed_mask]
+
+    # Yazma işlemi upsert olduğu için ID'si zaten var olan kayıtlar güncellenir.
+    written = EmbeddingScheduler(embeddings).embed_and_store_stream(
+        db, iter_document_batches(changed_chunks()), desc="Yeni/Değişmiş Dökümanlar Embed Ediliyor"
+    )
+    print(f"Arşivdeki toplam haber sayısı: {len(wanted_ids) + len(retired_ids)}")
+    if retired_ids:
+        print(f"Arşivlenmiş/saklama süresi dolmuş dönemlerdeki {len(retired_ids)} haber atlandı.")
 
-    # 1. Tüm yeni veri kaynaklarını (geçmiş ve canlı) topla
+    ids_to_delete = list(set(existing_hashes) - wanted_ids - retired_ids)
+    if ids_to_delete:
+        print(f"Arşivde bulunmayan {len(ids_to_delete)} vektör siliniyor...")
+        for i in range(0, len(ids_to_delete), UPSERT_BATCH_SIZE):
+            db.delete(ids=ids_to_delete[i:i + UPSERT_BATCH_SIZE])
+
+    print(f"Artımlı güncelleme tamamlandı. Eklenen/güncellenen: {written}, sadece metadata güncellenen: {metadata_updates}, "
+          f"silinen: {len(ids_to_delete)}")
+
+def read_update_sources():
+    """
+    İşlenmeyi bekleyen geçmiş (`temp_raw_news.csv`) ve canlı (`live_buffer.csv`) haber dosyalarını okur.
+    (DataFrame listesi, işlendikten sonra silinecek dosyalar) döndürür.
+    """
     dfs_to_process = []
     files_to_clean = []
-
-    if os.path.exists(RAW_DATA_CSV):
+    for path, label in ((RAW_DATA_CSV, "geçmiş"), (LIVE_BUFFER_CSV, "canlı")):
+        if not os.path.exists(path):
+            continue
         try:
-            df_raw = pd.read_csv(RAW_DATA_CSV)
-            if not df_raw.empty:
-                print(f"'{RAW_DATA_CSV}' dosyasından {len(df_raw)} geçmiş haber yüklendi.")
-                dfs_to_process.append(df_raw)
-                files_to_clean.append(RAW_DATA_CSV)
+            df = pd.read_csv(path)
+            if not df.empty:
+                print(f"'{path}' dosyasından {len(df)} {label} haber yüklendi.")
+                dfs_to_process.append(df)
+                files_to_clean.append(path)
         except pd.errors.EmptyDataError:
-            print(f"UYARI: '{RAW_DATA_CSV}' dosyası boş.")
-
-    if os.path.exists(LIVE_BUFFER_CSV):
+            print(f"UYARI: '{path}' dosyası boş.")
+    return dfs_to_process, files_to_clean
+
+def clean_news_frame(df):
+    """Ham haberlerde HTML karakterlerini çözer, ID'si veya başlığı olmayanları atar ve `rag_content` üretir."""
+    df = df.copy()
+    df['headline'] = df['headline'].apply(lambda x: html.unescape(x) if isinstance(x, str) else x)
+    df['summary'] = df['summary'].apply(lambda x: html.unescape(x) if isinstance(x, str) else x)
+    df.dropna(subset=['id', 'headline'], inplace=True)
+    df['symbols'] = df['symbols'].astype(str)
+    df['rag_content'] = build_rag_content(df)
+    return df
+
+def remove_processed_files(files_to_clean):
+    print("\nİşlenen geçici dosyalar temizleniyor...")
+    for file_path in files_to_clean:
         try:
-            df_live = pd.read_csv(LIVE_BUFFER_CSV)
-            if not df_live.empty:
-                print(f"'{LIVE_BUFFER_CSV}' dosyasından {len(df_live)} canlı haber yüklendi.")
-                dfs_to_process.append(df_live)
-                files_to_clean.append(LIVE_BUFFER_CSV)
-        except pd.errors.EmptyDataError:
-            print(f"UYARI: '{LIVE_BUFFER_CSV}' dosyası boş.")
+            os.remove(file_path)
+            print(f" - '{os.path.basename(file_path)}' silindi.")
+        except OSError as e:
+            print(f"HATA: '{os.path.basename(file_path)}' silinirken hata oluştu: {e}")
+
+def update_and_build_databases(full_rebuild=False):
+    """
+    Geçmiş (`temp_raw_news.csv`) ve canlı (`live_buffer.csv`) haber kaynaklarını okur,
+    işler ve hem ana CSV arşivini hem de ChromaDB vektör veritabanını günceller.
+
+    Varsayılan olarak ChromaDB artımlı güncellenir: sadece yeni veya içeriği değişmiş
+    haberler embed edilir, arşivden çıkmış haberler silinir. `full_rebuild=True`
+    verilirse veritabanı eskisi gibi silinip sıfırdan oluşturulur.
+    """
+    print("\nVeritabanı oluşturma/güncelleme süreci başlatıldı...")
 
+    # 1. Tüm yeni veri kaynaklarını (geçmiş ve canlı) topla
+    dfs_to_process, files_to_clean = read_update_sources()
     if not dfs_to_process:
         print("İşlenecek yeni haber bulunamadı. İşlem durduruluyor.")
         return
@@ -68,83 +206,36 @@ def update_and_build_databases():
 
     # 2. Veriyi temizle ve işle
     print("Veriler temizleniyor ve RAG formatına getiriliyor...")
-    df_new_raw['headline'] = df_new_raw['headline'].apply(lambda x: html.unescape(x) if isinstance(x, str) else x)
-    df_new_raw['summary'] = df_new_raw['summary'].apply(lambda x: html.unescape(x) if isinstance(x, str) else x)
-    df_new_raw.dropna(subset=['id', 'headline'], inplace=True)
-    df_new_raw['symbols'] = df_new_raw['symbols'].astype(str)
-
-    def create_rag_content(row):
-        headline = row['headline']
-        summary = row['summary']
-        if pd.notna(summary) and len(str(summary).split()) > 5:
-            return f"Headline: {headline}. Summary: {summary}"
-        return headline
-    df_new_raw['rag_content'] = df_new_raw.apply(create_rag_content, axis=1)
-
-    # 3. Ana arşivi (`knowledge_base.csv`) oluştur/güncelle
-    try:
-        df_existing_kb = pd.read_csv(KNOWLEDGE_BASE_CSV)
-    except FileNotFoundError:
-        df_existing_kb = pd.DataFrame()
-    
-    df_combined = pd.concat([df_existing_kb, df_new_raw], ignore_index=True)
-    df_combined.drop_duplicates(subset=['id'], keep='last', inplace=True)
-    df_combined['timestamp'] = pd.to_datetime(df_combined['timestamp'])
-    df_combined.sort_values(by='timestamp', ascending=False, inplace=True)
-    
-    df_combined.to_csv(KNOWLEDGE_BASE_CSV, index=False, encoding='utf-8-sig')
-    print(f"Ana arşiv '{KNOWLEDGE_BASE_CSV}' güncellendi. Toplam haber sayısı: {len(df_combined)}")
-
-    # 4. ChromaDB'yi sıfırdan oluştur
-    print("\nMevcut ChromaDB (varsa) siliniyor ve temiz veriden yeniden oluşturuluyor...")
-    if os.path.exists(CHROMA_DB_PATH):
-        shutil.rmtree(CHROMA_DB_PATH)
-
-    print("LangChain dökümanları hazırlanıyor...")
-    documents_to_embed = [
-        Document(
-            # Boş içerik durumunda çökmemesi için varsayılan bir metin sağlıyoruz.
-            page_content=str(row['rag_content']) if pd.notna(row['rag_content']) else "Content not available",
-            metadata={
-                'source': row.get('source', 'N/A'), 
-                'title': row.get('headline', 'N/A'), 
-                'publish_date': str(row.get('timestamp', 'N/A'))
-            }
-        )
-        for _, row in tqdm(df_combined.iterrows(), total=df_combined.shape[0], desc="Dökümanlar Vektöre Çevriliyor")
-    ]
-    print("Karmaşık metadata (tarih formatı gibi) temizleniyor...")
-    documents_to_embed = filter_complex_metadata(documents_to_embed)
-    if not documents_to_embed:
-        print("Vektör veritabanına eklenecek döküman bulunamadı.")
-        return
+    df_new_raw = clean_news_frame(df_new_raw)
+
+    # 3. Ana arşivi oluştur/güncelle (CSV veya aylık Parquet bölümleri, bkz. config.KNOWLEDGE_BASE_FORMAT)
+    result = knowledge_store.upsert_news(df_new_raw)
+    print(f"Ana arşiv güncellendi ({config.KNOWLEDGE_BASE_FORMAT}). Yazılan haber: {result['rows']}, "
+          f"güncellenen bölüm sayısı: {len(result['partitions'])}")
+
+    # 4. ChromaDB'yi güncelle (varsayılan: artımlı, isteğe bağlı: sıfırdan)
+    print("Embedding modeli başlatılıyor...")
+    embeddings = create_embeddings(os.getenv("GOOGLE_API_KEY"))
+
+    if full_rebuild:
+        if not rebuild_vector_store(embeddings):
+            return
+    else:
+        sync_vector_store(embeddings)
+    embeddings.print_stats()
 
-    print("Embedding modeli ve ChromaDB başlatılıyor...")
-    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=os.getenv("GOOGLE_API_KEY"))
-    
-    print(f"{len(documents_to_embed)} döküman ChromaDB'ye ekleniyor. Bu işlem biraz sürebilir...")
-    db = Chroma.from_documents(
-        documents=documents_to_embed,
-        embedding=embeddings,
-        persist_directory=CHROMA_DB_PATH
-    )
-    # --- KOD SAĞLAMLAŞTIRMA ---
-    # Veritabanının diske tam olarak yazıldığından emin olmak için persist() metodunu çağırıyoruz.
-    print("Veritabanı diske kaydediliyor...")
-    db.persist()
-    db = None # Belleği serbest bırak
-    
     # 5. İşlenen geçici dosyaları temizle
-    print("\nİşlenen geçici dosyalar temizleniyor...")
-    for file_path in files_to_clean:
-        try:
-            os.remove(file_path)
-            print(f" - '{os.path.basename(file_path)}' silindi.")
-        except OSError as e:
-            print(f"HATA: '{os.path.basename(file_path)}' silinirken hata oluştu: {e}")
+    remove_processed_files(files_to_clean)
 
-    print("ChromaDB başarıyla oluşturuldu ve veriler kalıcı olarak kaydedildi.")
+    print("ChromaDB başarıyla güncellendi ve veriler kalıcı olarak kaydedildi.")
     print("\nTüm veri işleme işlemleri tamamlandı.")
 
 if __name__ == '__main__':
-    update_and_build_databases()
\ No newline at end of file
+    if '--partition' in sys.argv:
+        # Sadece tek dönemin vektörleri yeniden oluşturulur: python update_database.py --partition 2024-05
+        embeddings = create_embeddings(os.getenv("GOOGLE_API_KEY"))
+        rebuild_vector_partition(embeddings, sys.argv[sys.argv.index('--partition') + 1])
+        embeddings.print_stats()
+    else:
+        # Tam yeniden oluşturma sadece açıkça istenirse yapılır: python update_database.py --full-rebuild
+        update_and_build_databases(full_rebuild='--full-rebuild' in sys.argv)
\ No newline at end of file
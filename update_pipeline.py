@@ -0,0 +1,243 @@
+# update_pipeline.py
+"""
+run_update.py'nin eşzamanlı (pipeline) modu. Aşamalar sırayla değil, aralarındaki sınırlı kuyruklarla aynı anda çalışır:
+
+    toplama (Alpaca sayfaları) -> temizleme (HTML, rag_content, değişiklik kontrolü) -> embed + Chroma'ya yazma
+
+Çekilen her pencere, ham CSV'nin tamamı yazılmasını beklemeden temizlenir ve embed edilir; böylece toplam süre
+aşamaların toplamına değil, en yavaş aşamanın süresine yaklaşır. Kuyruk dolunca önceki aşama bekler (backpressure),
+bu yüzden bellekte en fazla birkaç parça tutulur. Ham CSV ve checkpoint yine yazılır; işlem yarıda kalırsa
+bir sonraki update_database / run_update çalıştırması kaldığı yerden devam eder.
+"""
+
+import os
+import time
+import queue
+import threading
+import functools
+import pandas as pd
+import config
+import knowledge_store
+from document_builder import compute_content_hash, iter_document_batches, normalize_ids, page_contents
+from embedding_cache import create_embeddings
+from embedding_scheduler import EmbeddingScheduler
+from update_database import clean_news_frame, read_update_sources, remove_processed_files
+from vector_partitions import open_store
+
+# Aşamanın girdisinin bittiğini bildiren işaret.
+_DONE = object()
+
+
+class StageStats:
+    """Bir aşamanın işlediği haber sayısı ile kuyruklarda beklediği ve kendi işine harcadığı süreler."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+        # Girdi kuyruğundan bitiş işareti alındı mı (hata durumunda kuyruğun boşaltılıp boşaltılmayacağı buna bağlı).
+        self.input_done = False
+        self.started = None
+        self.finished = None
+
+    def begin(self):
+        self.started = time.monotonic()
+
+    def end(self):
+        self.finished = time.monotonic()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def busy(self):
+        """Aşamanın kuyruk beklemeleri dışında kalan, kendi işine harcadığı süre."""
+        return max(0.0, self.elapsed - self.input_wait - self.output_wait)
+
+    def line(self):
+        rate = self.items / self.busy if self.busy > 0 else 0.0
+        return (f"  {self.name:<16} {self.items:>8} haber | çalışma {self.busy:7.1f} sn ({rate:8.1f} haber/sn) | "
+                f"girdi bekleme {self.input_wait:6.1f} sn | çıktı bekleme {self.output_wait:6.1f} sn")
+
+
+def _put(stage_queue, item, stats):
+    start = time.monotonic()
+    stage_queue.put(item)
+    stats.output_wait += time.monotonic() - start
+
+
+def _get(stage_queue, stats):
+    start = time.monotonic()
+    item = stage_queue.get()
+    stats.input_wait += time.monotonic() - start
+    stats.input_done = item is _DONE
+    return item
+
+
+def _drain(stage_queue):
+    """Hata veren aşamanın girdisini boşaltır; önceki aşama dolu kuyrukta takılı kalmaz."""
+    while stage_queue.get() is not _DONE:
+        pass
+
+
+def _raw_frame(item):
+    if isinstance(item, pd.DataFrame):
+        return item
+    # Alpaca'dan gelen haber sözlükleri, ham CSV'den okunmuş gibi (string tarih ve semboller) tabloya çevrilir.
+    df = pd.DataFrame(item)
+    df['timestamp'] = df['timestamp'].astype(str)
+    return df
+
+
+def clean_stage(raw_queue, clean_queue, stats, existing_hashes, cleaned_frames, max_batch=None):
+    """
+    Ham haber parçalarını temizler ve sadece yeni/içeriği değişmiş olanları embed aşamasına verir.
+    Kuyrukta biriken küçük parçalar (sakin pencereler) `max_batch` habere kadar birleştirilip tek seferde işlenir.
+    """
+    max_batch = max_batch or config.UPDATE_PIPELINE_CLEAN_BATCH
+    done = False
+    while not done:
+        item = _get(raw_queue, stats)
+        if item is _DONE:
+            break
+        frames = [_raw_frame(item)]
+        size = len(frames[0])
+        while size < max_batch:
+            try:
+                item = raw_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                stats.input_done = done = True
+                break
+            frames.append(_raw_frame(item))
+            size += len(frames[-1])
+
+        df = pd.concat(frames, ignore_index=True).drop_duplicates(subset=['id'], keep='last')
+        df = clean_news_frame(df)
+        cleaned_frames.append(df)
+        stats.items += len(df)
+
+        # Aynı içerikle veritabanında (veya bu çalıştırmada daha önce) bulunan haberler tekrar embed edilmez.
+        ids = normalize_ids(df['id'])
+        hashes = page_contents(df).map(compute_content_hash)
+        changed = [existing_hashes.get(doc_id) != content_hash for doc_id, content_hash in zip(ids, hashes)]
+        existing_hashes.update(zip(ids, hashes))
+        if any(changed):
+            _put(clean_queue, df[changed], stats)
+    _put(clean_queue, _DONE, stats)
+
+
+def embed_stage(clean_queue, stats, vector_store, embeddings):
+    """Temizlenmiş parçaları EmbeddingScheduler ile paralel embed edip Chroma'ya bloklar halinde yazar."""
+    def frames():
+        while True:
+            df = _get(clean_queue, stats)
+            if df is _DONE:
+                return
+            yield df
+
+    stats.items = EmbeddingScheduler(embeddings).embed_and_store_stream(
+        vector_store, iter_document_batches(frames()), desc="Pipeline: Embed + Yazma"
+    )
+
+
+def _run_stage(target, stats, input_queue, output_queue, errors):
+    """Aşamayı çalıştırır; hata verirse girdisini boşaltıp sonraki aşamaya bitiş işaretini iletir."""
+    stats.begin()
+    try:
+        target()
+    except Exception as e:
+        errors.append((stats.name, e))
+        print(f"🚨 PIPELINE HATASI ({stats.name}): {e}")
+        if not stats.input_done:
+            _drain(input_queue)
+        if output_queue is not None:
+            output_queue.put(_DONE)
+    finally:
+        stats.end()
+
+
+def run_pipeline(collect=None, queue_size=None):
+    """
+    Toplama, temizleme ve embed aşamalarını eşzamanlı çalıştırır; ardından ana arşivi tek seferde günceller.
+    `collect(on_news)` haber listelerini `on_news`'a veren toplayıcıdır (varsayılan: collect_historical_news).
+    Aşama istatistiklerini (ad -> StageStats) döndürür; herhangi bir aşama hata verirse geçici dosyalar silinmez.
+    """
+    if collect is None:
+        from collect_data import collect_historical_news
+        collect = lambda on_news: collect_historical_news(on_news=on_news)
+    queue_size = queue_size or config.UPDATE_PIPELINE_QUEUE_SIZE
+    raw_queue = queue.Queue(maxsize=queue_size)
+    clean_queue = queue.Queue(maxsize=queue_size)
+    collect_stats, clean_stats, embed_stats = StageStats("toplama"), StageStats("temizleme"), StageStats("embed + yazma")
+    errors, cleaned_frames = [], []
+    start = time.monotonic()
+
+    print("Embedding modeli başlatılıyor...")
+    embeddings = create_embeddings(os.getenv("GOOGLE_API_KEY"))
+    vector_store = open_store(embeddings, persist_directory=config.CHROMA_DB_PATH)
+    existing = vector_store.get(include=["metadatas"])
+    existing_hashes = {doc_id: (metadata or {}).get('content_hash')
+                       for doc_id, metadata in zip(existing['ids'], existing['metadatas'])}
+    print(f"ChromaDB'de mevcut vektör sayısı: {len(existing_hashes)}")
+
+    threads = [
+        threading.Thread(target=_run_stage, name="pipeline-clean", args=(
+            functools.partial(clean_stage, raw_queue, clean_queue, clean_stats, existing_hashes, cleaned_frames),
+            clean_stats, raw_queue, clean_queue, errors)),
+        threading.Thread(target=_run_stage, name="pipeline-embed", args=(
+            functools.partial(embed_stage, clean_queue, embed_stats, vector_store, embeddings),
+            embed_stats, clean_queue, None, errors)),
+    ]
+    for thread in threads:
+        thread.start()
+
+    def on_news(items):
+        _put(raw_queue, items, collect_stats)
+        collect_stats.items += len(items)
+
+    files_to_clean = []
+    collect_stats.begin()
+    try:
+        # Önceki çalıştırmalardan kalan ham haberler ve canlı tampon, yeni sayfalardan önce hatta verilir.
+        dfs, files_to_clean = read_update_sources()
+        for df in dfs:
+            on_news(df)
+        collect(on_news)
+    except Exception as e:
+        errors.append((collect_stats.name, e))
+        print(f"🚨 PIPELINE HATASI ({collect_stats.name}): {e}")
+    finally:
+        raw_queue.put(_DONE)
+        collect_stats.end()
+    for thread in threads:
+        thread.join()
+    pipeline_seconds = time.monotonic() - start
+
+    stats = {s.name: s for s in (collect_stats, clean_stats, embed_stats)}
+    print("\n--- PIPELINE AŞAMA İSTATİSTİKLERİ ---")
+    for s in stats.values():
+        print(s.line())
+    slowest = max(stats.values(), key=lambda s: s.busy)
+    print(f"  Toplam süre {pipeline_seconds:.1f} sn | en yavaş aşama: {slowest.name} ({slowest.busy:.1f} sn) | "
+          f"aşamalar sırayla çalışsaydı: {sum(s.busy for s in stats.values()):.1f} sn")
+    embeddings.print_stats()
+
+    if errors:
+        print("UYARI: Pipeline hatayla bitti; geçici dosyalar silinmedi, bir sonraki güncelleme kaldığı yerden devam eder.")
+        return stats
+    if cleaned_frames:
+        result = knowledge_store.upsert_news(pd.concat(cleaned_frames, ignore_index=True))
+        print(f"Ana arşiv güncellendi ({config.KNOWLEDGE_BASE_FORMAT}). Yazılan haber: {result['rows']}, "
+              f"güncellenen bölüm sayısı: {len(result['partitions'])}")
+        # Ham CSV'ye bu çalıştırmada eklenenler de hattan geçti; dosya güvenle silinebilir.
+        files_to_clean = [f for f in (config.RAW_NEWS_CSV, *files_to_clean) if os.path.exists(f)]
+        remove_processed_files(sorted(set(files_to_clean)))
+    else:
+        print("İşlenecek yeni haber bulunamadı.")
+    return stats
@@ -0,0 +1,534 @@
+# vector_partitions.py
+"""
+Zaman bölümlü vektör veritabanı. Tek bir büyük Chroma koleksiyonu yerine her yayın dönemi (varsayılan: ay)
+ayrı bir koleksiyona yazılır: news_2024-05, news_2024-06, ... (`config.VECTOR_PARTITIONING`).
+
+- Yazma: kayıtlar metadata'daki `publish_ts` değerine göre kendi bölümüne yönlendirilir; tarihi okunamayan
+  kayıtlar "undated" bölümüne düşer.
+- Okuma: sorgu, zaman filtresiyle kesişen bölümlere paralel gönderilir (fan-out), sonuçlar mesafeye göre
+  birleştirilip MMR tek seferde uygulanır. Filtre yoksa sadece en yeni `VECTOR_HOT_PARTITIONS` bölüm
+  (sıcak katman) aranır; eski (soğuk) bölümler `widen=True` veya `VECTOR_WIDEN_TO_COLD` ile dahil edilir.
+- Saklama: en yeni `VECTOR_RETENTION_PARTITIONS` bölüm dışındakiler float16 sıkıştırılmış dosyalara
+  arşivlenip veritabanından çıkarılır; gerektiğinde geri yüklenebilir.
+- Yeniden oluşturma tek bir bölümü hedefleyebilir; diğer bölümlere dokunulmaz.
+
+Kullanım: python vector_partitions.py list              (bölümler ve kayıt sayıları)
+          python vector_partitions.py migrate           (eski tek koleksiyonu bölümlere taşır)
+          python vector_partitions.py retention         (saklama politikasını uygular)
+          python vector_partitions.py restore 2021-03   (arşivlenmiş bölümü geri yükler)
+Tek bölümü arşivden yeniden oluşturmak için: python update_database.py --partition 2024-05
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import calendar
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+import config
+
+PARTITION_PREFIX = "news_"
+UNDATED_PARTITION = "undated"
+# langchain_chroma'nın varsayılan (bölümlemeden önceki) koleksiyon adı.
+LEGACY_COLLECTION = "langchain"
+_PAGE_SIZE = 5000
+
+
+def partition_key(ts, granularity=None):
+    """Epoch saniyesinin düştüğü bölümün adını döndürür: "2024-05", "2024-Q2" veya "2024"."""
+    granularity = granularity or config.VECTOR_PARTITIONING
+    if not ts:
+        return UNDATED_PARTITION
+    moment = datetime.fromtimestamp(int(ts), tz=timezone.utc)
+    if granularity == "year":
+        return f"{moment.year}"
+    if granularity == "quarter":
+        return f"{moment.year}-Q{(moment.month - 1) // 3 + 1}"
+    return f"{moment.year}-{moment.month:02d}"
+
+
+def partition_bounds(key):
+    """Bölümün kapsadığı [başlangıç, bitiş) aralığını epoch saniye olarak döndürür."""
+    if key == UNDATED_PARTITION:
+        return 0, 1
+    year, _, rest = key.partition("-")
+    year = int(year)
+    if not rest:
+        first_month, months = 1, 12
+    elif rest.startswith("Q"):
+        first_month, months = (int(rest[1:]) - 1) * 3 + 1, 3
+    else:
+        first_month, months = int(rest), 1
+    end_year, end_month = year + (first_month - 1 + months) // 12, (first_month - 1 + months) % 12 + 1
+    return calendar.timegm((year, first_month, 1, 0, 0, 0)), calendar.timegm((end_year, end_month, 1, 0, 0, 0))
+
+
+def recent_partition_keys(count, granularity=None, now=None):
+    """`now` anını içeren bölümden geriye doğru `count` bölüm adı (var olup olmadıklarına bakılmaz)."""
+    key = partition_key(now or time.time(), granularity)
+    keys = []
+    for _ in range(count):
+        keys.append(key)
+        key = partition_key(partition_bounds(key)[0] - 1, granularity)
+    return keys
+
+
+def publish_ts_bounds(where):
+    """Chroma filtresindeki `publish_ts` aralığını (başlangıç, bitiş) döndürür; sınır yoksa None."""
+    start = end = None
+    if not where:
+        return start, end
+    for condition in where.get("$and", [where]):
+        bounds = condition.get("publish_ts")
+        if not isinstance(bounds, dict):
+            continue
+        for op in ("$gte", "$gt"):
+            if op in bounds:
+                start = bounds[op] if start is None else max(start, bounds[op])
+        for op in ("$lt", "$lte"):
+            if op in bounds:
+                end = bounds[op] if end is None else min(end, bounds[op])
+    return start, end
+
+
+def _collection_names(client):
+    # chromadb 0.6+ sadece adları, 1.x Collection nesnelerini döndürür.
+    return [getattr(c, "name", c) for c in client.list_collections()]
+
+
+class PartitionedVectorStore(VectorStore):
+    """
+    Aynı Chroma istemcisi üzerindeki dönem koleksiyonlarını tek bir vektör veritabanı gibi sunar.
+    langchain'in VectorStore arayüzünü uyguladığı için `as_retriever(search_type="mmr")` ve
+    HotRetriever'ın kullandığı `*_by_vector` aramaları tek koleksiyonlu Chroma ile aynı şekilde çalışır.
+    """
+
+    def __init__(self, embedding_function, client, granularity=None, hot_partitions=None, widen_to_cold=None,
+                 fanout_workers=None):
+        self._embeddings = embedding_function
+        self.client = client
+        self.granularity = granularity or config.VECTOR_PARTITIONING
+        self.hot_partitions = hot_partitions or config.VECTOR_HOT_PARTITIONS
+        self.widen_to_cold = widen_to_cold if widen_to_cold is not None else config.VECTOR_WIDEN_TO_COLD
+        self._collections = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=fanout_workers or config.VECTOR_FANOUT_WORKERS,
+                                            thread_name_prefix="vector-fanout")
+
+    @property
+    def embeddings(self):
+        return self._embeddings
+
+    # --- Bölümler ---
+
+    def partitions(self):
+        """Veritabanındaki bölüm adları, eskiden yeniye ("undated" en başta)."""
+        keys = [name[len(PARTITION_PREFIX):] for name in _collection_names(self.client)
+                if name.startswith(PARTITION_PREFIX)]
+        return sorted(keys, key=lambda key: (key != UNDATED_PARTITION, key))
+
+    def collection(self, key, create=False):
+        """Bölümün Chroma koleksiyonu; yoksa ve `create` kapalıysa None."""
+        with self._lock:
+            collection = self._collections.get(key)
+            if collection is None:
+                name = PARTITION_PREFIX + key
+                if create:
+                    collection = self.client.get_or_create_collection(name, embedding_function=None)
+                else:
+                    try:
+                        collection = self.client.get_collection(name, embedding_function=None)
+                    except Exception:
+                        return None
+                self._collections[key] = collection
+            return collection
+
+    def drop_partition(self, key):
+        """Bölümün koleksiyonunu siler (varsa)."""
+        with self._lock:
+            self._collections.pop(key, None)
+            if PARTITION_PREFIX + key in _collection_names(self.client):
+                self.client.delete_collection(PARTITION_PREFIX + key)
+
+    def search_partitions(self, where=None, widen=False):
+        """
+        Sorgunun gönderileceği bölümler (yeniden eskiye). Zaman filtresi varsa onunla kesişen bölümler,
+        yoksa sıcak katman; `widen` ise tüm bölümler.
+        """
+        existing = list(reversed(self.partitions()))
+        if widen:
+            return existing
+        start, end = publish_ts_bounds(where)
+        if start is None and end is None:
+            hot = set(recent_partition_keys(self.hot_partitions, self.granularity))
+            return [key for key in existing if key in hot]
+        selected = []
+        for key in existing:
+            low, high = partition_bounds(key)
+            if (start is None or high > start) and (end is None or low < end):
+                selected.append(key)
+        return selected
+
+    # --- Yazma ---
+
+    def _group(self, metadatas):
+        groups = {}
+        for row, metadata in enumerate(metadatas):
+            key = partition_key((metadata or {}).get("publish_ts"), self.granularity)
+            groups.setdefault(key, []).append(row)
+        return groups
+
+    def upsert_vectors(self, ids, vectors, texts, metadatas):
+        """Vektörü hesaplanmış kayıtları yayın tarihlerine göre kendi bölümlerine upsert eder."""
+        for key, rows in self._group(metadatas).items():
+            self.collection(key, create=True).upsert(
+                ids=[ids[i] for i in rows], embeddings=[vectors[i] for i in rows],
+                documents=[texts[i] for i in rows], metadatas=[metadatas[i] or None for i in rows])
+
+    def update_metadatas(self, ids, metadatas):
+        """Metadata'yı günceller; yayın tarihi değişip başka bölüme düşen kayıtlar vektörüyle birlikte taşınır."""
+        new_metadata = dict(zip(ids, metadatas))
+        for key in self.partitions():
+            collection = self.collection(key)
+            found = collection.get(ids=list(ids), include=["embeddings", "documents"])
+            if not found["ids"]:
+                continue
+            targets = [partition_key((new_metadata[i] or {}).get("publish_ts"), self.granularity)
+                       for i in found["ids"]]
+            stay = [i for i, target in zip(found["ids"], targets) if target == key]
+            if stay:
+                collection.update(ids=stay, metadatas=[new_metadata[i] for i in stay])
+            moved = [n for n, target in enumerate(targets) if target != key]
+            if moved:
+                moved_ids = [found["ids"][n] for n in moved]
+                self.upsert_vectors(moved_ids, [found["embeddings"][n] for n in moved],
+                                    [found["documents"][n] for n in moved], [new_metadata[i] for i in moved_ids])
+                collection.delete(ids=moved_ids)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        self.upsert_vectors(ids, self._embeddings.embed_documents(texts), texts, metadatas)
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Bölümlü veritabanı vector_partitions.open_store ile açılır.")
+
+    def delete(self, ids=None, **kwargs):
+        for key in self.partitions():
+            self.collection(key).delete(ids=ids)
+
+    def get(self, ids=None, where=None, include=None, partitions=None):
+        """Seçilen (varsayılan: tüm) bölümlerin Chroma `get` sonuçlarını tek sözlükte birleştirir."""
+        include = include or ["metadatas", "documents"]
+        merged = {"ids": [], **{field: [] for field in include}}
+        for key in partitions or self.partitions():
+            collection = self.collection(key)
+            if collection is None:
+                continue
+            page = collection.get(ids=ids, where=where, include=include)
+            merged["ids"].extend(page["ids"])
+            for field in include:
+                merged[field].extend(page[field] if page[field] is not None else [])
+        return merged
+
+    def iter_collections(self, since=None):
+        """`since` anından sonraki kayıtları içerebilecek bölümlerin koleksiyonları (yeniden eskiye)."""
+        where = {"publish_ts": {"$gte": int(since)}} if since is not None else None
+        for key in self.search_partitions(where, widen=where is None):
+            collection = self.collection(key)
+            if collection is not None:
+                yield collection
+
+    # --- Okuma ---
+
+    def _query(self, key, vector, n, where, with_embeddings):
+        collection = self.collection(key)
+        count = collection.count() if collection is not None else 0
+        if not count:
+            return []
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if with_embeddings else [])
+        result = collection.query(query_embeddings=[vector], n_results=min(n, count), where=where, include=include)
+        embeddings = result["embeddings"][0] if with_embeddings else None
+        return [
+            (distance, Document(page_content=text or "", metadata=metadata or {}, id=doc_id),
+             embeddings[i] if with_embeddings else None)
+            for i, (doc_id, text, metadata, distance) in enumerate(zip(
+                result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0]))
+        ]
+
+    def _query_many(self, keys, vector, n, where, with_embeddings):
+        if len(keys) <= 1:
+            return [row for key in keys for row in self._query(key, vector, n, where, with_embeddings)]
+        futures = [self._executor.submit(self._query, key, vector, n, where, with_embeddings) for key in keys]
+        return [row for future in futures for row in future.result()]
+
+    def _fan_out(self, vector, n, where, widen, min_results, with_embeddings=False):
+        """Bölümlere paralel sorgu atar ve en yakın `n` sonucu (mesafe, döküman, vektör) olarak döndürür."""
+        vector = [float(x) for x in vector]
+        keys = self.search_partitions(where, widen)
+        rows = self._query_many(keys, vector, n, where, with_embeddings)
+        # Zaman filtresiz canlı sorgu sıcak katmanda yeterli sonuç bulamazsa soğuk bölümler yeniden eskiye aranır.
+        if len(rows) < min_results and self.widen_to_cold and not widen and publish_ts_bounds(where) == (None, None):
+            for key in self.search_partitions(widen=True):
+                if len(rows) >= min_results:
+                    break
+                if key not in keys:
+                    rows.extend(self._query(key, vector, n, where, with_embeddings))
+        rows.sort(key=lambda row: row[0])
+        return rows[:n]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, widen=False, **kwargs):
+        return [doc for _, doc, _ in self._fan_out(embedding, k, filter, widen, k)]
+
+    def similarity_search(self, query, k=4, filter=None, widen=False, **kwargs):
+        return self.similarity_search_by_vector(self._embeddings.embed_query(query), k, filter, widen)
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, filter=None,
+                                                widen=False, **kwargs):
+        rows = self._fan_out(embedding, fetch_k, filter, widen, k, with_embeddings=True)
+        if not rows:
+            return []
+        selected = maximal_marginal_relevance(np.array(embedding, dtype=np.float32), [row[2] for row in rows],
+                                              k=k, lambda_mult=lambda_mult)
+        # langchain_chroma gibi seçilenleri aday (mesafe) sırasıyla döndürür; tek koleksiyonla sonuçlar birebir aynıdır.
+        return [rows[i][1] for i in sorted(selected)]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, filter=None, widen=False,
+                                      **kwargs):
+        return self.max_marginal_relevance_search_by_vector(self._embeddings.embed_query(query), k, fetch_k,
+                                                            lambda_mult, filter, widen)
+
+
+# --- Açma ---
+
+def _legacy_layout(client):
+    names = _collection_names(client)
+    return LEGACY_COLLECTION in names and not any(name.startswith(PARTITION_PREFIX) for name in names)
+
+
+def open_store(embeddings, client=None, persist_directory=None, backend=None):
+    """
+    Vektör veritabanını açar: `config.VECTOR_BACKEND` "mmap" ise kompakt mmap deposu (mmap_store), değilse
+    bölümleme açıksa PartitionedVectorStore, kapalıysa tek koleksiyonlu Chroma.
+    Bölümlemeden önce oluşturulmuş (tek koleksiyonlu) bir veritabanı taşınana kadar eskisi gibi kullanılır.
+    """
+    if (backend or config.VECTOR_BACKEND) == "mmap":
+        from mmap_store import MmapVectorStore
+        return MmapVectorStore(embeddings)
+    from langchain_chroma import Chroma
+    if client is None:
+        import chromadb
+        client = chromadb.PersistentClient(path=persist_directory or config.CHROMA_DB_PATH)
+    if not config.VECTOR_PARTITIONING:
+        return Chroma(client=client, embedding_function=embeddings)
+    if _legacy_layout(client):
+        print("UYARI: Vektör veritabanı tek koleksiyon düzeninde; bölümlemek için "
+              "`python vector_partitions.py migrate` çalıştırın.")
+        return Chroma(client=client, embedding_function=embeddings)
+    return PartitionedVectorStore(embeddings, client)
+
+
+def store_exists(client):
+    """İstemcide (bölümlü ya da eski düzende) kayıt içeren bir vektör koleksiyonu var mı?"""
+    for name in _collection_names(client):
+        if name == LEGACY_COLLECTION or name.startswith(PARTITION_PREFIX):
+            try:
+                if client.get_collection(name, embedding_function=None).count() > 0:
+                    return True
+            except Exception:
+                continue
+    return False
+
+
+# --- Bakım: taşıma, saklama politikası, tek bölüm yeniden oluşturma ---
+
+def _iter_pages(collection, include):
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def partition_counts(store):
+    """(bölüm, kayıt sayısı) listesi, eskiden yeniye."""
+    return [(key, store.collection(key).count()) for key in store.partitions()]
+
+
+def migrate_legacy(store):
+    """Eski tek koleksiyondaki vektörleri yeniden embed etmeden bölümlere taşır; sayılar tutarsa eskisini siler."""
+    if LEGACY_COLLECTION not in _collection_names(store.client):
+        print("Taşınacak eski koleksiyon bulunamadı.")
+        return 0
+    legacy = store.client.get_collection(LEGACY_COLLECTION, embedding_function=None)
+    total = legacy.count()
+    moved = 0
+    for page in _iter_pages(legacy, ["embeddings", "documents", "metadatas"]):
+        store.upsert_vectors(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+        moved += len(page["ids"])
+        print(f"  {moved}/{total} vektör taşındı...")
+    if sum(count for _, count in partition_counts(store)) >= total:
+        store.client.delete_collection(LEGACY_COLLECTION)
+        print(f"Eski koleksiyon silindi; {moved} vektör {len(store.partitions())} bölüme dağıtıldı.")
+    else:
+        print("UYARI: Bölümlerdeki kayıt sayısı eski koleksiyondan az; eski koleksiyon silinmedi.")
+    return moved
+
+
+def _archive_path(key, archive_dir=None):
+    return os.path.join(archive_dir or config.VECTOR_ARCHIVE_DIR, f"{PARTITION_PREFIX}{key}.npz")
+
+
+def archive_partition(store, key, archive_dir=None):
+    """
+    Bölümü float16 vektörler ve JSON metadata ile sıkıştırılmış tek bir .npz dosyasına yazar ve
+    veritabanından çıkarır. Arşivlenen kayıt sayısını döndürür.
+    """
+    collection = store.collection(key)
+    if collection is None:
+        return 0
+    ids, vectors, documents, metadatas = [], [], [], []
+    for page in _iter_pages(collection, ["embeddings", "documents", "metadatas"]):
+        ids.extend(page["ids"])
+        vectors.append(np.asarray(page["embeddings"], dtype=np.float16))
+        documents.extend(text or "" for text in page["documents"])
+        metadatas.extend(json.dumps(metadata or {}, ensure_ascii=False) for metadata in page["metadatas"])
+    if ids:
+        path = _archive_path(key, archive_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, ids=np.array(ids), embeddings=np.concatenate(vectors),
+                            documents=np.array(documents), metadatas=np.array(metadatas))
+        print(f"Bölüm {key}: {len(ids)} vektör '{path}' dosyasına arşivlendi.")
+    store.drop_partition(key)
+    return len(ids)
+
+
+def restore_partition(store, key, archive_dir=None):
+    """Arşivlenmiş bölümü veritabanına geri yükler. Yüklenen kayıt sayısını döndürür."""
+    path = _archive_path(key, archive_dir)
+    with np.load(path) as archive:
+        ids = archive["ids"].tolist()
+        vectors = archive["embeddings"].astype(np.float32)
+        documents = archive["documents"].tolist()
+        metadatas = [json.loads(m) or None for m in archive["metadatas"].tolist()]
+    collection = store.collection(key, create=True)
+    batch = config.CHROMA_WRITE_BATCH_SIZE
+    for i in range(0, len(ids), batch):
+        collection.upsert(ids=ids[i:i + batch], embeddings=vectors[i:i + batch],
+                          documents=documents[i:i + batch], metadatas=metadatas[i:i + batch])
+    print(f"Bölüm {key}: {len(ids)} vektör '{path}' dosyasından geri yüklendi.")
+    return len(ids)
+
+
+def archived_partitions(archive_dir=None):
+    """Arşiv klasöründe .npz dosyası bulunan bölüm adları."""
+    directory = archive_dir or config.VECTOR_ARCHIVE_DIR
+    if not os.path.isdir(directory):
+        return set()
+    return {name[len(PARTITION_PREFIX):-len(".npz")] for name in os.listdir(directory)
+            if name.startswith(PARTITION_PREFIX) and name.endswith(".npz")}
+
+
+def retention_cutoff(granularity=None, keep=None, now=None):
+    """Saklanan en eski dönemin başlangıcı (epoch saniye); saklama politikası kapalıysa None."""
+    keep = keep or config.VECTOR_RETENTION_PARTITIONS
+    if not keep:
+        return None
+    return partition_bounds(recent_partition_keys(keep, granularity, now)[-1])[0]
+
+
+def retired_partition_check(store, archive_dir=None, now=None):
+    """
+    Bölüm adının emekliye ayrılıp ayrılmadığını söyleyen fonksiyon döndürür: veritabanında olmayan ve
+    arşivlenmiş ya da saklama süresi dolmuş dönemler. Artımlı eşitleme bu dönemlerin haberlerini yeniden
+    embed etmez (yoksa saklama politikası bir sonraki güncellemede geri alınırdı). Geri yüklenen bölümler
+    veritabanında olduğu için yeniden eşitlenir.
+    """
+    live = set(store.partitions())
+    archived = archived_partitions(archive_dir)
+    cutoff = retention_cutoff(store.granularity, now=now)
+
+    def retired(key):
+        if key == UNDATED_PARTITION or key in live:
+            return False
+        return key in archived or (cutoff is not None and partition_bounds(key)[1] <= cutoff)
+    return retired
+
+
+def apply_retention(store, keep=None, archive_dir=None, now=None):
+    """
+    Saklama politikası: en yeni `keep` (varsayılan: config.VECTOR_RETENTION_PARTITIONS) dönem dışındaki
+    bölümleri arşivleyip veritabanından çıkarır. Tarihsiz bölüme dokunulmaz. Arşivlenen bölümleri döndürür.
+    """
+    cutoff = retention_cutoff(store.granularity, keep, now)
+    if cutoff is None:
+        print("Saklama politikası kapalı (VECTOR_RETENTION_PARTITIONS = None); tüm bölümler tutuluyor.")
+        return []
+    oldest_kept = partition_key(cutoff, store.granularity)
+    archived = []
+    for key in store.partitions():
+        if key != UNDATED_PARTITION and partition_bounds(key)[1] <= cutoff:
+            archive_partition(store, key, archive_dir)
+            archived.append(key)
+    print(f"Saklama politikası: {len(archived)} bölüm arşivlendi, en eski tutulan dönem {oldest_kept}.")
+    return archived
+
+
+def rebuild_partition(store, key, embeddings):
+    """Tek bir bölümü silip ana arşivin o döneme düşen haberlerinden yeniden oluşturur; diğer bölümlere dokunulmaz."""
+    import pandas as pd
+    import knowledge_store
+    from document_builder import DOCUMENT_COLUMNS, iter_document_batches
+    from embedding_scheduler import EmbeddingScheduler
+    if key == UNDATED_PARTITION:
+        raise ValueError("Tarihsiz bölüm dönem aralığıyla seçilemez; tüm veritabanını yeniden oluşturun.")
+    start, end = partition_bounds(key)
+    df = knowledge_store.read_knowledge_base(columns=DOCUMENT_COLUMNS, start=pd.Timestamp(start, unit='s', tz='UTC'),
+                                             end=pd.Timestamp(end, unit='s', tz='UTC'))
+    store.drop_partition(key)
+    written = EmbeddingScheduler(embeddings).embed_and_store_stream(
+        store, iter_document_batches([df]), desc=f"Bölüm {key} Embed Ediliyor")
+    print(f"Bölüm {key} yeniden oluşturuldu: {written} döküman.")
+    return written
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from embedding_cache import create_embeddings
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    import chromadb
+    if config.CHROMA_SERVER_HOST:
+        client = chromadb.HttpClient(host=config.CHROMA_SERVER_HOST, port=config.CHROMA_SERVER_PORT)
+    else:
+        client = chromadb.PersistentClient(path=config.CHROMA_DB_PATH)
+    embeddings = create_embeddings(os.getenv("GEMINI_API_KEY"))
+    store = open_store(embeddings, client=client)
+    if not isinstance(store, PartitionedVectorStore):
+        if command != "migrate":
+            sys.exit("Vektör veritabanı bölümlü değil; önce `python vector_partitions.py migrate` çalıştırın.")
+        store = PartitionedVectorStore(embeddings, client)
+    if command == "list":
+        hot = set(recent_partition_keys(store.hot_partitions, store.granularity))
+        for key, count in partition_counts(store):
+            print(f"  {key:<10} {count:>9} vektör  {'sıcak' if key in hot else 'soğuk'}")
+    elif command == "migrate":
+        migrate_legacy(store)
+    elif command == "retention":
+        apply_retention(store)
+    elif command == "restore":
+        restore_partition(store, sys.argv[2])
+    else:
+        sys.exit(__doc__)
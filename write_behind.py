@@ -0,0 +1,134 @@
+# write_behind.py
+
+import os
+import time
+import asyncio
+import threading
+import config
+
+
+class WriteBehindBuffer:
+    """
+    Canlı akıştan gelen haberleri biriktirip toplu halde yazan tampon.
+    Tampon `max_items` habere ulaştığında ya da ilk haberin üzerinden `max_seconds` geçtiğinde boşaltılır.
+    Her boşaltma tek bir toplu embed + Chroma ekleme çağrısı ve tek bir CSV ekleme işlemi yapar;
+    sıcak indeks verildiyse aynı vektörler oraya da eklenir.
+    Uygulama kapanırken `flush()` çağrılarak bekleyen haberler diske yazılır.
+    `vector_store` None ise (veritabanı henüz hazır değilken) sadece CSV tamponuna yazılır; `attach` ile sonradan bağlanır.
+    """
+
+    def __init__(self, vector_store, csv_path=None, max_items=None, max_seconds=None, hot_index=None):
+        self.vector_store = vector_store
+        self.hot_index = hot_index
+        self.csv_path = csv_path or config.LIVE_BUFFER_CSV
+        self.max_items = max_items or config.WRITE_BEHIND_MAX_ITEMS
+        self.max_seconds = max_seconds or config.WRITE_BEHIND_MAX_SECONDS
+        self._items = []
+        # _items listesine erişim ve boşaltma işlemlerinin sıralanması için ayrı kilitler.
+        self._items_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = None
+        self._task = None
+        self.stats = {"flushes": 0, "items": 0, "last_size": 0, "last_latency": 0.0, "max_latency": 0.0, "errors": 0,
+                      "reused_vectors": 0}
+
+    def add(self, news_dict, vector=None):
+        """
+        Haberi tampona ekler. Olay döngüsü içinden çağrılır; hiçbir G/Ç yapmaz.
+        Haberin embedding'i canlı yolda zaten hesaplandıysa `vector` ile verilir ve tekrar embed edilmez.
+        """
+        with self._items_lock:
+            self._items.append((news_dict, vector))
+            size = len(self._items)
+        self._ensure_started()
+        if size >= self.max_items or size == 1:
+            # Tampon dolduysa hemen boşalt; ilk haber geldiyse zamanlayıcıyı başlat.
+            self._wakeup.set()
+
+    def attach(self, vector_store, hot_index=None):
+        """Vektör veritabanı (arka planda) hazır olduğunda bağlar; sonraki boşaltmalar Chroma'ya da yazar."""
+        self.vector_store = vector_store
+        self.hot_index = hot_index
+
+    def pending(self):
+        with self._items_lock:
+            return len(self._items)
+
+    def _ensure_started(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """Arka plan boşaltma döngüsü: ilk haberden sonra en fazla `max_seconds` bekler."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self.pending() < self.max_items:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            await asyncio.to_thread(self.flush)
+
+    def _write_vectors(self, items):
+        """
+        Haberleri tek bir toplu embed + Chroma ekleme ile yazar. Dökümanlar update_database ile aynı şekilde
+        (HTML temizliği, rag_content, ID ve içerik özeti) üretilir; böylece sonraki artımlı
+        eşitleme bu haberleri değişmemiş sayar ve tekrar embed etmez.
+        """
+        from document_builder import build_documents, prepare_live_frame
+        from embedding_scheduler import upsert_precomputed
+        documents, ids = build_documents(prepare_live_frame([news for news, _ in items]))
+        texts = [d.page_content for d in documents]
+        metadatas = [d.metadata for d in documents]
+        # Sadece canlı yolda embedding'i hesaplanmamış haberler (ör. triajda elenenler) embed edilir.
+        vectors = [vector for _, vector in items]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            for i, vector in zip(missing, self.vector_store.embeddings.embed_documents([texts[i] for i in missing])):
+                vectors[i] = vector
+        self.stats["reused_vectors"] += len(items) - len(missing)
+        upsert_precomputed(self.vector_store, ids, texts, vectors, metadatas)
+        # Aynı vektörler sıcak indekse de yerinde eklenir; yeni haberler hemen aranabilir olur.
+        if self.hot_index is not None:
+            self.hot_index.add(ids, vectors, texts, metadatas)
+
+    def flush(self):
+        """Bekleyen tüm haberleri tek seferde yazar. Thread-safe; kapanışta doğrudan çağrılabilir."""
+        with self._flush_lock:
+            with self._items_lock:
+                items, self._items = self._items, []
+            if not items:
+                return 0
+
+            # pandas ve döküman üretici ağır modüller; başlangıcı yavaşlatmamak için ilk boşaltmada yüklenir.
+            import pandas as pd
+            start = time.monotonic()
+            df_live = pd.DataFrame([news for news, _ in items])
+            if self.vector_store is not None:
+                try:
+                    self._write_vectors(items)
+                except Exception as e:
+                    # Chroma'ya yazılamasa bile haberler CSV tamponuna yazılır; update_database sonradan ekler.
+                    self.stats["errors"] += 1
+                    print(f"🚨 ARKA PLAN GÜNCELLEME HATASI (ChromaDB, {len(items)} haber): {e}")
+
+            try:
+                # CSV tampon dosyasına tek seferde ekle
+                df_live.to_csv(self.csv_path, mode='a', header=not os.path.exists(self.csv_path), index=False, encoding='utf-8-sig')
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"🚨 ARKA PLAN GÜNCELLEME HATASI (CSV, {len(items)} haber): {e}")
+
+            latency = time.monotonic() - start
+            self.stats["flushes"] += 1
+            self.stats["items"] += len(items)
+            self.stats["last_size"] = len(items)
+            self.stats["last_latency"] = latency
+            self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+            print(f"   -> Tampon boşaltıldı: {len(items)} haber {latency:.2f} sn içinde yazıldı "
+                  f"(toplam {self.stats['flushes']} boşaltma, {self.stats['items']} haber, "
+                  f"{self.stats['reused_vectors']} hazır vektör).")
+            return len(items)